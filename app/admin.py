@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import Profile, Category, Product, CartItem, Order, OrderItem
+from django.db.models import Q
+
+from .models import Profile, Category, Product, CartItem, CartSummary, Order, OrderItem, SellerStats
+from .search import fts_available, search_products
 
 # --- Administration du Profil ---
 @admin.register(Profile)
@@ -41,13 +44,13 @@ class CategoryAdmin(admin.ModelAdmin):
 class ProductAdmin(admin.ModelAdmin):
     list_display = ('name', 'category', 'seller', 'price', 'discount_percentage', 'badge', 'stock', 'is_active', 'is_featured', 'rating', 'created_at')
     list_filter = ('category', 'badge', 'is_active', 'is_featured', 'created_at')
-    search_fields = ('name', 'seller__username', 'description')
+    search_fields = ('name', 'sku', 'seller__username', 'description')
     list_editable = ('price', 'discount_percentage', 'badge', 'stock', 'is_active', 'is_featured', 'rating')
     readonly_fields = ('created_at', 'updated_at')
     
     fieldsets = (
         ('Informations de base', {
-            'fields': ('seller', 'category', 'name', 'description')
+            'fields': ('seller', 'category', 'name', 'sku', 'description')
         }),
         ('Prix et réductions', {
             'fields': ('price', 'old_price', 'discount_percentage')
@@ -73,12 +76,22 @@ class ProductAdmin(admin.ModelAdmin):
             return qs
         return qs.filter(seller=request.user)
 
+    def get_search_results(self, request, queryset, search_term):
+        # Nom/description via l'index FTS5 plutôt que LIKE '%…%' sur toute la table
+        if not search_term.strip() or not fts_available():
+            return super().get_search_results(request, queryset, search_term)
+        matches = search_products(Product.objects.all(), search_term).values('pk')
+        queryset = queryset.filter(Q(pk__in=matches) | Q(seller__username__icontains=search_term))
+        return queryset, False
+
 
 # --- Administration du Panier ---
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ('user', 'product', 'quantity', 'get_total_price', 'added_at')
     list_filter = ('added_at',)
+    # Une jointure plutôt qu'une requête par ligne et par colonne
+    list_select_related = ('user', 'product')
     search_fields = ('user__username', 'product__name')
     readonly_fields = ('added_at', 'get_total_price')
     
@@ -87,6 +100,14 @@ class CartItemAdmin(admin.ModelAdmin):
     get_total_price.short_description = 'Prix total'
 
 
+# --- Résumés de panier (lecture seule, tenus à jour par app.cart) ---
+@admin.register(CartSummary)
+class CartSummaryAdmin(admin.ModelAdmin):
+    list_display = ('user', 'item_count', 'total_quantity', 'subtotal', 'updated_at')
+    search_fields = ('user__username',)
+    readonly_fields = ('user', 'item_count', 'total_quantity', 'subtotal', 'updated_at')
+
+
 # --- Inline pour les articles de commande ---
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -135,3 +156,10 @@ class OrderItemAdmin(admin.ModelAdmin):
     get_total_price.short_description = 'Total'
 
 
+# --- Statistiques vendeur (lecture seule, tenues à jour par app.sellers) ---
+@admin.register(SellerStats)
+class SellerStatsAdmin(admin.ModelAdmin):
+    list_display = ('seller', 'product_count', 'order_count', 'units_sold', 'revenue', 'last_order_at')
+    search_fields = ('seller__username',)
+    readonly_fields = ('seller', 'product_count', 'order_count', 'units_sold', 'revenue',
+                       'last_order_at', 'updated_at')
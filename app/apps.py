@@ -11,4 +11,7 @@ class AppConfig(AppConfig):
     name = 'app'
 
     def ready(self):
-        import app.signals
\ No newline at end of file
+        import app.checks
+        import app.signals
+        from app.images import resolve_placeholders
+        resolve_placeholders()
\ No newline at end of file
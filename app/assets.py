@@ -0,0 +1,200 @@
+"""
+Regroupement des CSS / JS des pages de la boutique.
+
+Les pages chargent une quinzaine de feuilles de style et autant de scripts.
+`collectstatic` (stockage BundledManifestStorage, voir STORAGES) :
+
+1. construit chaque bundle de BUNDLES en concaténant ses fichiers (CSS
+   allégé de ses commentaires et espaces) ;
+2. donne à tous les fichiers, bundles compris, un nom contenant l'empreinte
+   de leur contenu (ManifestStaticFilesStorage, url() des CSS réécrites) ;
+3. écrit à côté de chaque fichier texte haché une version gzip (et brotli
+   si le module est installé), que le serveur web envoie telle quelle.
+
+Les noms hachés changent avec le contenu : le serveur web peut les servir
+avec un cache illimité (Cache-Control: max-age=31536000, immutable).
+
+Le tag `{% asset_bundle 'storefront.css' %}` (shop_extras) insère le
+bundle construit, ou chaque fichier source en développement (DEBUG) et
+tant que collectstatic n'a pas été lancé.
+"""
+import gzip
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.templatetags.static import static
+from django.utils.html import format_html_join
+
+try:
+    import brotli
+except ImportError:  # optionnel : seulement les versions gzip
+    brotli = None
+
+_STOREFRONT_CSS = [
+    'assets/css/bootstrap.min.css',
+    'assets/css/animate.min.css',
+    'assets/css/fontawesome-all.min.css',
+    'assets/css/magnific-popup.css',
+    'assets/css/odometer.min.css',
+    'assets/css/nice-select.css',
+    'assets/css/cross2.min.css',
+    'assets/css/meanmenu.css',
+    'assets/css/swipper.css',
+    'assets/css/select2.min.css',
+    'assets/css/ui-range-slider.css',
+    'assets/css/datepicker.css',
+    'assets/css/main.css',
+]
+_STOREFRONT_JS = [
+    'assets/js/jquery.min.js',
+    'assets/js/bootstrap.bundle.min.js',
+    'assets/js/swipper-bundle.min.js',
+    'assets/js/jquery.meanmenu.min.js',
+    'assets/js/wow.min.js',
+    'assets/js/jquery.nice-select.min.js',
+    'assets/js/jquery.scrollUp.min.js',
+    'assets/js/jquery.magnific-popup.min.js',
+    'assets/js/odometer.min.js',
+    'assets/js/appear.min.js',
+    'assets/js/datepicker.min.js',
+    'assets/js/select2.min.js',
+    'assets/js/cross2.min.js',
+    'assets/js/countdown.js',
+    'assets/js/jquery-ui-slider-range.js',
+    'assets/js/back-to-top.min.js',
+    'assets/js/main.js',
+]
+
+# Un bundle par combinaison de fichiers utilisée par les pages, dans
+# l'ordre de chargement d'origine (la cascade CSS en dépend)
+BUNDLES = {
+    'storefront.css': _STOREFRONT_CSS,
+    'storefront-custom.css': _STOREFRONT_CSS + ['assets/css/custom.css'],
+    'storefront.js': _STOREFRONT_JS,
+    'shop.js': _STOREFRONT_JS + ['assets/js/shop.js'],
+}
+
+# Extensions précompressées, et taille minimale utile
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.eot', '.ttf')
+COMPRESS_MIN_SIZE = 1024
+
+# Chaînes et url() laissées intactes ; commentaires supprimés ; espaces
+# réduits, et retirés autour de { } ; ,
+_CSS_TOKEN = re.compile(
+    r'''("(?:\\.|[^"\\\n])*"|'(?:\\.|[^'\\\n])*'|url\([^)]*\))'''
+    r'''|/\*.*?\*/'''
+    r'''|\s*([{};,])\s*'''
+    r'''|\s+''',
+    re.S,
+)
+_CSS_IMPORT = re.compile(r'''@import\s*(?:url\([^)]*\)|"[^"]*"|'[^']*')[^;]*;''')
+_CSS_CHARSET = re.compile(r'@charset\s[^;]*;', re.I)
+_JS_SOURCE_MAP = re.compile(r'^//[#@] sourceMappingURL=.*$', re.M)
+
+
+def bundle_path(name):
+    """Chemin statique du bundle : à côté de ses sources (url() relatives inchangées)."""
+    kind = name.rsplit('.', 1)[1]
+    return f'assets/{kind}/bundle-{name}'
+
+
+def minify_css(text):
+    def replace(match):
+        if match.group(1):
+            return match.group(1)
+        if match.group(2):
+            return match.group(2)
+        return '' if match.group(0).startswith('/*') else ' '
+    return _CSS_TOKEN.sub(replace, text).strip()
+
+
+def build_css(sources):
+    """
+    Concatène des feuilles de style. @charset n'est permis qu'en tête et
+    @import avant toute règle : ils sont remontés en tête du bundle.
+    """
+    imports, bodies = [], []
+    for text in sources:
+        text = _CSS_CHARSET.sub('', minify_css(text))
+        imports.extend(_CSS_IMPORT.findall(text))
+        bodies.append(_CSS_IMPORT.sub('', text))
+    return '@charset "UTF-8";' + ''.join(imports) + '\n'.join(bodies) + '\n'
+
+
+def build_js(sources):
+    # « ; » entre fichiers : un fichier sans point-virgule final ne se
+    # colle pas au suivant ; les source maps ne correspondent plus au bundle
+    return '\n;\n'.join(_JS_SOURCE_MAP.sub('', text) for text in sources) + '\n'
+
+
+class BundledManifestStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage qui construit les bundles et précompresse."""
+
+    # Un fichier référencé mais absent du manifeste garde son nom d'origine
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Statiques pas encore collectés (tests, banc d'essai) : le
+            # fichier d'origine plutôt qu'une erreur au rendu de la page
+            return name
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            # url() d'un thème vers un fichier non livré (police .svg…) :
+            # laissée telle quelle plutôt que d'interrompre collectstatic
+            if content is None and not self.exists(self.clean_name(filename or name)):
+                return name
+            raise
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name, sources in BUNDLES.items():
+                path = bundle_path(name)
+                texts = []
+                for source in sources:
+                    with self.open(source) as fh:
+                        texts.append(fh.read().decode('utf-8'))
+                content = build_css(texts) if name.endswith('.css') else build_js(texts)
+                if self.exists(path):
+                    self.delete(path)
+                self.save(path, ContentFile(content.encode('utf-8')))
+                paths[path] = (self, path)
+
+        yield from super().post_process(paths, dry_run, **options)
+
+        if not dry_run:
+            for name in sorted(set(self.hashed_files.values())):
+                if name.endswith(COMPRESSIBLE):
+                    self._precompress(name)
+
+    def _precompress(self, name):
+        with self.open(name) as fh:
+            content = fh.read()
+        if len(content) < COMPRESS_MIN_SIZE:
+            return
+        # mtime=0 : fichier identique d'une construction à l'autre
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+        for suffix, compressed in variants:
+            if len(compressed) < len(content):
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self.save(name + suffix, ContentFile(compressed))
+
+
+def bundle_tags(name):
+    """<link> / <script> du bundle `name`, ou de chacun de ses fichiers s'il n'est pas construit."""
+    path = bundle_path(name)
+    built = not settings.DEBUG and path in getattr(staticfiles_storage, 'hashed_files', {})
+    paths = [path] if built else BUNDLES[name]
+    if name.endswith('.css'):
+        return format_html_join('\n', '<link rel="stylesheet" href="{}">', ((static(p),) for p in paths))
+    return format_html_join('\n', '<script src="{}"></script>', ((static(p),) for p in paths))
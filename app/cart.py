@@ -0,0 +1,293 @@
+"""
+Résumé du panier : nombre de lignes, quantité totale et sous-total.
+
+- Utilisateurs connectés : ligne CartSummary, recalculée dans la même
+  transaction que chaque écriture du panier (`refresh_user_summary`) ;
+  la lire coûte une recherche par clé primaire, jamais un parcours de CartItem.
+- Visiteurs : calculé depuis leur panier (app.guest_cart : quantités +
+  prix unitaires mémorisés à l'ajout), sans aucune requête.
+
+Un panier en base dont le dernier ajout date de plus de CART_ITEM_TTL est
+abandonné : purge_abandoned_carts le supprime par lots (commande purge_carts).
+"""
+import datetime
+import json
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Max, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .guest_cart import aget_guest_cart, get_guest_cart
+from .models import CartItem, CartSummary, Product
+
+SUMMARY_FIELDS = ['item_count', 'total_quantity', 'subtotal', 'updated_at']
+PURGE_BATCH_SIZE = 500  # paniers par transaction
+ARCHIVE_FIELDS = ('user_id', 'product_id', 'quantity', 'added_at')
+
+
+class CartLine:
+    """
+    Ligne de panier affichable, commune aux paniers en base et des visiteurs.
+
+    `id` est l'identifiant attendu par les formulaires du panier : celui du
+    CartItem en base, celui du produit pour un panier de visiteur.
+    """
+    __slots__ = ('id', 'product', 'quantity')
+
+    def __init__(self, id, product, quantity):
+        self.id = id
+        self.product = product
+        self.quantity = quantity
+
+    def get_total_price(self):
+        return self.product.price * self.quantity
+
+
+def refresh_user_summary(user):
+    """Recalcule et enregistre le résumé du panier de `user` (agrégat + upsert)."""
+    totals = CartItem.objects.filter(user=user).aggregate(
+        item_count=Count('id'),
+        total_quantity=Coalesce(Sum('quantity'), 0),
+        subtotal=Coalesce(
+            Sum(F('quantity') * F('product__price'), output_field=DecimalField(max_digits=12, decimal_places=2)),
+            Decimal('0'),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        ),
+    )
+    summary = CartSummary(user=user, **totals)
+    CartSummary.objects.bulk_create([summary], update_conflicts=True,
+                                    unique_fields=['user'], update_fields=SUMMARY_FIELDS)
+    return summary
+
+
+def add_item(user, product, quantity=1):
+    """Ajoute `quantity` × `product` au panier en base de `user`, résumé compris."""
+    with transaction.atomic():
+        cart_item, created = CartItem.objects.get_or_create(user=user, product=product,
+                                                            defaults={'quantity': quantity})
+        if not created:
+            # added_at : dernier ajout, qui fait vivre le panier (CART_ITEM_TTL)
+            cart_item.quantity = F('quantity') + quantity
+            cart_item.added_at = timezone.now()
+            cart_item.save(update_fields=['quantity', 'added_at'])
+        refresh_user_summary(user)
+
+
+def get_user_summary(user):
+    summary = CartSummary.objects.filter(user=user).first()
+    if summary is None:
+        summary = refresh_user_summary(user)
+    return summary
+
+
+async def aget_user_summary(user):
+    summary = await CartSummary.objects.filter(user=user).afirst()
+    if summary is None:
+        summary = await sync_to_async(refresh_user_summary)(user)
+    return summary
+
+
+def request_summary(request):
+    """Résumé du panier du visiteur de `request`, lu une seule fois par requête."""
+    if not hasattr(request, '_cart_summary'):
+        if request.user.is_authenticated:
+            request._cart_summary = get_user_summary(request.user)
+        else:
+            request._cart_summary = get_guest_cart(request).summary()
+    return request._cart_summary
+
+
+async def arequest_summary(request):
+    """request_summary() pour les vues asynchrones ; la version synchrone relit ensuite le même résumé."""
+    if not hasattr(request, '_cart_summary'):
+        user = await request.auser()
+        if user.is_authenticated:
+            request._cart_summary = await aget_user_summary(user)
+        else:
+            request._cart_summary = (await aget_guest_cart(request)).summary()
+    return request._cart_summary
+
+
+def invalidate_product_summaries(*product_ids):
+    """
+    Supprime les résumés des paniers contenant ces produits (prix modifié,
+    produit supprimé) : ils seront recalculés à la prochaine lecture.
+    """
+    CartSummary.objects.filter(
+        user__in=CartItem.objects.filter(product_id__in=product_ids).values('user_id')
+    ).delete()
+
+
+def merge_session_cart(user, session_cart):
+    """
+    Transfère le panier de visiteur ({id produit: quantité}) dans le panier
+    en base de `user`.
+
+    Nombre de requêtes constant quelle que soit la taille du panier : produits
+    actifs valides (1), puis dans une transaction : lignes manquantes créées
+    à quantité 0 (1), UPDATE qui ajoute les quantités en base (`quantity + n`,
+    sans lecture préalable : deux fusions concurrentes s'additionnent) (1),
+    et le résumé.
+    Renvoie le nombre de lignes transférées.
+    """
+    wanted = {}
+    for product_id, quantity in session_cart.items():
+        try:
+            product_id, quantity = int(product_id), int(quantity)
+        except (TypeError, ValueError):
+            continue
+        if quantity > 0:
+            wanted[product_id] = quantity
+    if not wanted:
+        return 0
+
+    # Lu avant la transaction : elle commence par une écriture, qui attend
+    # le verrou d'écriture au lieu d'échouer à sa promotion (SQLite)
+    valid_ids = list(Product.objects.filter(pk__in=wanted, is_active=True).values_list('pk', flat=True))
+    if not valid_ids:
+        return 0
+    with transaction.atomic():
+        CartItem.objects.bulk_create([CartItem(user=user, product_id=product_id, quantity=0)
+                                      for product_id in valid_ids], ignore_conflicts=True)
+        increment = Case(*(When(product_id=product_id, then=Value(wanted[product_id])) for product_id in valid_ids),
+                         output_field=IntegerField())
+        (CartItem.objects
+         .filter(user=user, product_id__in=valid_ids)
+         .update(quantity=F('quantity') + increment, added_at=timezone.now()))
+        refresh_user_summary(user)
+    return len(valid_ids)
+
+
+def cart_lines(request):
+    """
+    Lignes du panier courant et sous-total, en une seule requête.
+
+    Panier de visiteur : tous les produits sont lus d'un coup (in_bulk) ; les
+    ids périmés ou inactifs sont retirés du panier au passage et les prix
+    mémorisés sont remis à jour.
+    """
+    if request.user.is_authenticated:
+        items = _user_items(request.user)
+        lines = [CartLine(item.id, item.product, item.quantity) for item in items]
+    else:
+        cart = get_guest_cart(request)
+        lines = _guest_lines(cart, _guest_products().in_bulk(_guest_product_ids(cart)))
+    return lines, _subtotal(lines)
+
+
+async def acart_lines(request):
+    """cart_lines() pour les vues asynchrones (ORM asynchrone)."""
+    user = await request.auser()
+    if user.is_authenticated:
+        lines = [CartLine(item.id, item.product, item.quantity) async for item in _user_items(user)]
+    else:
+        cart = await aget_guest_cart(request)
+        lines = _guest_lines(cart, await _guest_products().ain_bulk(_guest_product_ids(cart)))
+    return lines, _subtotal(lines)
+
+
+def _user_items(user):
+    return CartItem.objects.filter(user=user).select_related('product__category')
+
+
+def _guest_products():
+    return Product.objects.filter(is_active=True).select_related('category')
+
+
+def _guest_product_ids(cart):
+    return [int(pid) for pid in cart.items if str(pid).isdigit()]
+
+
+def _guest_lines(cart, products):
+    """Lignes du panier de visiteur d'après `products` ({id: produit actif})."""
+    lines = []
+    for pid, quantity in list(cart.items.items()):
+        product = products.get(int(pid)) if str(pid).isdigit() else None
+        if product is None:
+            cart.remove(pid)
+            continue
+        cart.reprice(pid, product.price)
+        lines.append(CartLine(product.id, product, quantity))
+    return lines
+
+
+def _subtotal(lines):
+    return sum((line.get_total_price() for line in lines), Decimal('0'))
+
+
+# --- Paniers abandonnés ---
+
+class CartPurgeReport:
+    def __init__(self):
+        self.carts = 0
+        self.rows = 0
+        self.freed_bytes = None  # pages rendues libres (SQLite), réutilisables sans VACUUM
+
+
+def abandoned_cart_users(cutoff, after=0):
+    """Ids des utilisateurs (> `after`, croissants) dont le dernier ajout au panier précède `cutoff`."""
+    # Parcours de l'index (user, added_at) : MAX par utilisateur sans lire la table
+    return (CartItem.objects
+            .filter(user_id__gt=after)
+            .values('user_id')
+            .annotate(last_added=Max('added_at'))
+            .filter(last_added__lt=cutoff)
+            .order_by('user_id')
+            .values_list('user_id', flat=True))
+
+
+def free_bytes():
+    """Octets des pages libres du fichier SQLite, ou None pour un autre moteur."""
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA freelist_count')
+        pages = cursor.fetchone()[0]
+        cursor.execute('PRAGMA page_size')
+        return pages * cursor.fetchone()[0]
+
+
+def purge_abandoned_carts(ttl=None, batch_size=PURGE_BATCH_SIZE, archive=None, dry_run=False, stdout=None):
+    """
+    Supprime les paniers en base dont le dernier ajout date de plus de `ttl`
+    secondes (CART_ITEM_TTL par défaut), par lots de `batch_size` paniers :
+    une transaction courte par lot, le verrou d'écriture n'est jamais gardé
+    longtemps. `archive` : fichier texte où chaque ligne supprimée est
+    écrite (JSONL) avant suppression. Renvoie un CartPurgeReport.
+    """
+    ttl = settings.CART_ITEM_TTL if ttl is None else ttl
+    cutoff = timezone.now() - datetime.timedelta(seconds=ttl)
+    report = CartPurgeReport()
+    free_before = free_bytes()
+    last_user = 0
+    while users := list(abandoned_cart_users(cutoff, after=last_user)[:batch_size]):
+        last_user = users[-1]
+        if dry_run:
+            report.carts += len(users)
+            report.rows += CartItem.objects.filter(user_id__in=users).count()
+            continue
+        with transaction.atomic():
+            # Un ajout depuis la sélection rend le panier actif : il reste entier
+            active = set(CartItem.objects
+                         .filter(user_id__in=users, added_at__gte=cutoff)
+                         .values_list('user_id', flat=True))
+            users = [user_id for user_id in users if user_id not in active]
+            items = CartItem.objects.filter(user_id__in=users)
+            if archive is not None:
+                for row in items.order_by('user_id', 'id').values(*ARCHIVE_FIELDS):
+                    row['added_at'] = row['added_at'].isoformat()
+                    archive.write(json.dumps(row) + '\n')
+            deleted, _ = items.delete()
+            # Recalculés (vides) à la prochaine lecture
+            CartSummary.objects.filter(user_id__in=users).delete()
+        report.carts += len(users)
+        report.rows += deleted
+        if stdout is not None:
+            stdout.write(f"  {report.carts} paniers abandonnés supprimés ({report.rows} lignes)")
+    if free_before is not None and not dry_run:
+        report.freed_bytes = free_bytes() - free_before
+    return report
@@ -0,0 +1,157 @@
+"""
+État partagé du catalogue : version et compteurs de produits.
+
+- La version du catalogue entre dans les clés des fragments mis en cache
+  (grille de la boutique) ; elle change à chaque écriture de Product ou
+  Category (voir app.signals), ce qui périme immédiatement ces fragments.
+- Les produits actifs par catégorie sont comptés en un seul GROUP BY, mis
+  en cache et effacés par les signaux de Product quand un produit change
+  de catégorie ou d'état (recompté à la lecture suivante), au lieu d'un
+  `category.product_set.count` par ligne du template.
+- La date de la dernière modification accompagne la version : elle sert
+  d'en-tête Last-Modified aux pages du catalogue (app.http_cache).
+
+Cet état n'est partagé entre processus (workers, commandes de gestion)
+que si le cache l'est (Redis, Memcached, fichiers) : `check --deploy`
+l'exige (app.checks). Dans un cache propre au processus (LocMemCache, le
+réglage de développement), une écriture faite ailleurs n'est pas vue :
+version, date et compteurs y expirent au bout de LOCAL_CACHE_TIMEOUT, ce
+qui borne le retard des fragments, des ETag et des compteurs.
+"""
+import datetime
+import time
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Product
+
+CATALOG_VERSION_KEY = 'catalog:version'
+CATALOG_MODIFIED_KEY = 'catalog:modified'
+CATEGORY_COUNTS_KEY = 'catalog:category_counts'
+CATEGORY_COUNTS_TIMEOUT = 3600  # filet de sécurité pour les update() en masse
+FACET_COUNTS_TIMEOUT = 300
+LOCAL_CACHE_TIMEOUT = 60
+
+
+def is_process_local(alias=DEFAULT_CACHE_ALIAS):
+    """Vrai si le cache `alias` n'est pas partagé entre processus."""
+    return isinstance(caches[alias], LocMemCache)
+
+
+def local_timeout(timeout):
+    """`timeout` (None : sans expiration), ramené à LOCAL_CACHE_TIMEOUT dans un cache propre au processus."""
+    if is_process_local() and (timeout is None or timeout > LOCAL_CACHE_TIMEOUT):
+        return LOCAL_CACHE_TIMEOUT
+    return timeout
+
+
+def catalog_version():
+    """Version courante du catalogue (créée à la volée si absente du cache)."""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Valeur jamais réutilisée : une clé évincée ne ressuscite pas
+        # d'anciens fragments mis en cache sous la même version.
+        version = time.time_ns()
+        if not cache.add(CATALOG_VERSION_KEY, version, local_timeout(None)):
+            version = cache.get(CATALOG_VERSION_KEY, version)
+    return version
+
+
+def bump_catalog_version():
+    """Périme tous les fragments dépendant du catalogue."""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        catalog_version()
+    cache.set(CATALOG_MODIFIED_KEY, time.time(), local_timeout(None))
+
+
+def catalog_modified():
+    """Date (UTC) de la dernière modification du catalogue."""
+    timestamp = cache.get(CATALOG_MODIFIED_KEY)
+    if timestamp is None:
+        # Inconnue (cache vidé) : maintenant plutôt qu'une date trop ancienne,
+        # qui ferait répondre 304 sur une page périmée
+        timestamp = time.time()
+        if not cache.add(CATALOG_MODIFIED_KEY, timestamp, local_timeout(None)):
+            timestamp = cache.get(CATALOG_MODIFIED_KEY, timestamp)
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+
+
+def _category_rows(queryset):
+    return queryset.order_by().values_list('category_id').annotate(n=Count('id'))
+
+
+def count_by_category(queryset):
+    """{category_id: nombre de produits} de `queryset`, en une requête groupée."""
+    return dict(_category_rows(queryset))
+
+
+async def acount_by_category(queryset):
+    return {category_id: count async for category_id, count in _category_rows(queryset)}
+
+
+def category_counts():
+    """Produits actifs par catégorie (clé None : sans catégorie), en cache."""
+    counts = cache.get(CATEGORY_COUNTS_KEY)
+    if counts is None:
+        counts = count_by_category(Product.objects.filter(is_active=True))
+        cache.set(CATEGORY_COUNTS_KEY, counts, local_timeout(CATEGORY_COUNTS_TIMEOUT))
+    return counts
+
+
+def facet_counts(queryset, key):
+    """
+    Compteurs par catégorie restreints à une recherche/un filtre.
+
+    `queryset` ne doit pas être filtré par catégorie (facettes) ; le
+    résultat est mis en cache sous `key` pour une courte durée.
+    """
+    counts = cache.get(key)
+    if counts is None:
+        counts = count_by_category(queryset)
+        cache.set(key, counts, FACET_COUNTS_TIMEOUT)
+    return counts
+
+
+async def acategory_counts():
+    """category_counts() pour les vues asynchrones (ORM et cache asynchrones)."""
+    counts = await cache.aget(CATEGORY_COUNTS_KEY)
+    if counts is None:
+        counts = await acount_by_category(Product.objects.filter(is_active=True))
+        await cache.aset(CATEGORY_COUNTS_KEY, counts, local_timeout(CATEGORY_COUNTS_TIMEOUT))
+    return counts
+
+
+async def afacet_counts(queryset, key):
+    counts = await cache.aget(key)
+    if counts is None:
+        counts = await acount_by_category(queryset)
+        await cache.aset(key, counts, FACET_COUNTS_TIMEOUT)
+    return counts
+
+
+def invalidate_category_counts():
+    """À appeler après des modifications en masse qui court-circuitent les signaux."""
+    cache.delete(CATEGORY_COUNTS_KEY)
+
+
+def product_changed(before, after):
+    """
+    Périme les compteurs en cache après l'écriture d'un produit.
+
+    `before` / `after` : (category_id, is_active) avant et après, ou None
+    pour une création / suppression. Pas d'ajustement lu puis réécrit :
+    deux enregistrements concurrents perdraient une mise à jour.
+    """
+    if before == after:
+        return
+    if (before is None or not before[1]) and (after is None or not after[1]):
+        # Produit inactif avant comme après : aucun compteur ne bouge
+        return
+    invalidate_category_counts()
+    # Et après validation : un calcul concurrent a pu relire l'ancien état
+    transaction.on_commit(invalidate_category_counts)
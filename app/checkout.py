@@ -0,0 +1,199 @@
+"""
+Passage de commande transactionnel avec réservation du stock.
+
+Toute la commande est une seule transaction : lecture unique du panier,
+décrément conditionnel et groupé du stock (`UPDATE … WHERE stock >= qté`),
+création de la commande et de ses lignes, retrait des lignes servies du
+panier. Les lignes qui ne peuvent pas être servies sont refusées une par
+une et restent dans le panier.
+
+Une clé d'idempotence optionnelle rend la commande rejouable sans risque :
+la même clé renvoie la commande déjà créée, sans aucune écriture.
+"""
+import datetime
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import Case, F, IntegerField, Value, When
+from django.utils import timezone
+
+from . import catalog, sellers
+from .cart import refresh_user_summary
+from .models import CartItem, CheckoutRequest, Order, OrderItem, Product
+
+LOCK_RETRIES = 5
+LOCK_BACKOFF = 0.05  # secondes, doublé à chaque nouvel essai
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 100
+IDEMPOTENCY_TTL = datetime.timedelta(
+    seconds=getattr(settings, 'CHECKOUT_IDEMPOTENCY_TTL', 24 * 60 * 60))
+
+
+class StockConflict(Exception):
+    """Le stock a changé entre la vérification et le décrément (annule la transaction)."""
+
+
+class _KeyTaken(Exception):
+    """Clé d'idempotence réservée par une requête concurrente (annule la transaction)."""
+
+
+class CheckoutLine:
+    """Résultat d'une ligne du panier : servie (`ok`) ou refusée avec une raison."""
+    __slots__ = ('product', 'quantity', 'ok', 'reason')
+
+    def __init__(self, product, quantity, ok=True, reason=''):
+        self.product = product
+        self.quantity = quantity
+        self.ok = ok
+        self.reason = reason
+
+
+class CheckoutResult:
+    def __init__(self, order=None, lines=(), replayed=False):
+        self.order = order
+        self.lines = list(lines)
+        # True : commande déjà créée par une requête précédente de même clé
+        self.replayed = replayed
+
+    @property
+    def accepted(self):
+        return [line for line in self.lines if line.ok]
+
+    @property
+    def rejected(self):
+        return [line for line in self.lines if not line.ok]
+
+
+def clean_idempotency_key(value):
+    """Clé utilisable ou '' (absente, vide ou trop longue)."""
+    value = (value or '').strip()
+    if len(value) > IDEMPOTENCY_KEY_MAX_LENGTH:
+        return ''
+    return value
+
+
+def _replayed_order(user, key):
+    entry = (CheckoutRequest.objects
+             .filter(user=user, key=key, created_at__gte=timezone.now() - IDEMPOTENCY_TTL)
+             .select_related('order')
+             .first())
+    return entry.order if entry is not None else None
+
+
+def checkout(user, shipping_address='', phone='', idempotency_key=''):
+    """
+    Crée la commande de `user` à partir de son panier.
+
+    Renvoie un CheckoutResult : `order` vaut None si rien n'a pu être servi
+    (panier vide ou toutes les lignes refusées). Avec `idempotency_key`, une
+    clé déjà vue (depuis moins de IDEMPOTENCY_TTL) renvoie la commande
+    d'origine avec `replayed=True`. Réessaie quelques fois si SQLite
+    signale un verrou (« database is locked »).
+    """
+    key = clean_idempotency_key(idempotency_key)
+    if key:
+        order = _replayed_order(user, key)
+        if order is not None:
+            return CheckoutResult(order, replayed=True)
+
+    for attempt in range(LOCK_RETRIES):
+        try:
+            return _checkout(user, shipping_address, phone, key)
+        except (OperationalError, StockConflict) as exc:
+            if isinstance(exc, OperationalError) and 'locked' not in str(exc):
+                raise
+            if attempt == LOCK_RETRIES - 1:
+                raise
+            time.sleep(LOCK_BACKOFF * (2 ** attempt))
+
+
+def expired_checkout_requests():
+    return CheckoutRequest.objects.filter(created_at__lt=timezone.now() - IDEMPOTENCY_TTL)
+
+
+def purge_expired_checkout_requests():
+    """Supprime les clés d'idempotence expirées (commande purge_carts) ; renvoie leur nombre."""
+    deleted, _ = expired_checkout_requests().delete()
+    return deleted
+
+
+def _checkout(user, shipping_address, phone, key):
+    try:
+        return _create_order(user, shipping_address, phone, key)
+    except _KeyTaken:
+        # Hors de la transaction annulée : la commande gagnante est validée
+        return CheckoutResult(_replayed_order(user, key), replayed=True)
+
+
+def _create_order(user, shipping_address, phone, key):
+    with transaction.atomic():
+        # Première instruction = écriture : sous SQLite, la transaction prend
+        # le verrou d'écriture avant toute lecture, donc les lectures de
+        # stock ci-dessous ne peuvent plus être devancées par une autre commande.
+        order = Order.objects.create(user=user, total_price=0,
+                                     shipping_address=shipping_address, phone=phone)
+
+        if key:
+            # Réservée dans la même transaction : une requête concurrente de
+            # même clé échoue sur la contrainte et renvoie la commande gagnante.
+            CheckoutRequest.objects.filter(
+                user=user, key=key, created_at__lt=timezone.now() - IDEMPOTENCY_TTL).delete()
+            try:
+                with transaction.atomic():
+                    CheckoutRequest.objects.create(user=user, key=key, order=order)
+            except IntegrityError:
+                raise _KeyTaken()
+
+        items = list(CartItem.objects.filter(user=user).select_related('product'))
+        if not items:
+            transaction.set_rollback(True)
+            return CheckoutResult()
+
+        # Stock courant (verrouillé ligne à ligne sur les moteurs qui le permettent)
+        stock = dict(Product.objects
+                     .select_for_update()
+                     .filter(pk__in=[item.product_id for item in items])
+                     .values_list('pk', 'stock'))
+
+        lines = []
+        for item in items:
+            product = item.product
+            available = stock.get(product.pk, 0)
+            if not product.is_active:
+                lines.append(CheckoutLine(product, item.quantity, False, "produit indisponible"))
+            elif available < item.quantity:
+                lines.append(CheckoutLine(product, item.quantity, False,
+                                          f"stock insuffisant ({available} disponible(s))"))
+            else:
+                lines.append(CheckoutLine(product, item.quantity))
+        accepted = [line for line in lines if line.ok]
+        if not accepted:
+            transaction.set_rollback(True)
+            return CheckoutResult(lines=lines)
+
+        # Décrément groupé et conditionnel : une seule instruction UPDATE
+        quantity = Case(*[When(pk=line.product.pk, then=Value(line.quantity)) for line in accepted],
+                        output_field=IntegerField())
+        updated = (Product.objects
+                   .filter(pk__in=[line.product.pk for line in accepted], stock__gte=quantity)
+                   .update(stock=F('stock') - quantity))
+        if updated != len(accepted):
+            raise StockConflict()
+
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product=line.product, quantity=line.quantity, price=line.product.price)
+            for line in accepted
+        ])
+        sellers.record_order(order, [(line.product, line.quantity, line.product.price) for line in accepted])
+        order.total_price = sum((line.product.price * line.quantity for line in accepted), Decimal('0'))
+        order.save(update_fields=['total_price', 'updated_at'])
+
+        served = {line.product.pk for line in accepted}
+        CartItem.objects.filter(pk__in=[item.pk for item in items if item.product_id in served]).delete()
+        refresh_user_summary(user)
+        # Le stock affiché dans la boutique a changé (update() n'émet pas de signal)
+        transaction.on_commit(catalog.bump_catalog_version)
+
+    return CheckoutResult(order, lines)
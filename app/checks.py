@@ -0,0 +1,25 @@
+"""
+Vérifications propres à l'application (`manage.py check --deploy`).
+"""
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.checks import Error, Tags, register
+
+from .catalog import is_process_local
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Version du catalogue, compteurs et fragments (app.catalog) doivent être
+    vus de tous les processus : un cache propre au processus ne l'est pas.
+    """
+    if not is_process_local():
+        return []
+    backend = type(caches[DEFAULT_CACHE_ALIAS])
+    return [Error(
+        f"Le cache « {DEFAULT_CACHE_ALIAS} » ({backend.__module__}.{backend.__name__}) est propre à "
+        f"chaque processus : une modification du catalogue faite par un autre worker ou une commande "
+        f"n'y est pas vue.",
+        hint="Utiliser un cache partagé dans CACHES (Redis, Memcached ou FileBasedCache).",
+        id='app.E001',
+    )]
@@ -1,14 +1,43 @@
 """
 Context processors pour rendre des variables disponibles dans tous les templates.
+
+Les context processors sont synchrones : une vue asynchrone appelle
+d'abord `aload_request_context(request)`, qui lit d'avance par l'ORM
+asynchrone ce qu'ils liront, pour qu'ils n'exécutent aucune requête.
 """
-from .models import CartItem
+from django.contrib.auth.models import User
+from django.utils.functional import SimpleLazyObject
+
+from .cart import arequest_summary, request_summary
+from .models import Profile
 
 
 def cart_count(request):
     """
-    Renvoie le nombre total d'articles dans le panier de l'utilisateur connecté.
+    Résumé du panier (`cart_summary`) et nombre total d'articles (`cart_count`).
+
+    Évalués paresseusement : aucune requête si le template ne les affiche
+    pas ; une lecture de CartSummary pour un utilisateur connecté, aucune
+    pour un visiteur (app.guest_cart). Le résumé déjà lu pendant la
+    requête (ETag de la boutique, `aload_request_context`) est réutilisé.
+    """
+    cart_summary = SimpleLazyObject(lambda: request_summary(request))
+    return {
+        'cart_summary': cart_summary,
+        'cart_count': SimpleLazyObject(lambda: cart_summary.total_quantity),
+    }
+
+
+async def aload_request_context(request, cart_summary=True):
+    """
+    Vues asynchrones : utilisateur (avec son profil, lu par les menus) et,
+    si le template l'affiche, résumé du panier, lus en asynchrone et gardés
+    sur la requête.
     """
-    count = 0
-    if request.user.is_authenticated:
-        count = CartItem.objects.filter(user=request.user).count()
-    return {'cart_count': count}
+    user = await request.auser()
+    if user.is_authenticated:
+        # Profil absent (superutilisateur) mémorisé aussi : pas de requête au rendu
+        User.profile.related.set_cached_value(user, await Profile.objects.filter(user=user).afirst())
+    request.user = user
+    if cart_summary:
+        await arequest_summary(request)
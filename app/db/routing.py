@@ -0,0 +1,158 @@
+"""
+Lectures du catalogue sur des réplicas, écritures sur la base principale.
+
+Les réplicas (settings.DATABASE_REPLICAS : alias de DATABASES, copies de la
+base principale) servent les lectures des modèles de REPLICA_MODELS :
+catalogue (boutique, recherche) et tableau de bord vendeur. Le panier, les
+comptes, les sessions et le passage de commande lisent toujours la base
+principale.
+
+La base principale sert aussi toutes les lectures (« sticky primary ») :
+- d'une requête autre que GET / HEAD / OPTIONS (connexion, commande…) ;
+- de la suite d'une requête, dès sa première écriture ;
+- des requêtes suivantes pendant REPLICA_STICKY_SECONDS après une
+  écriture (cookie posé par StickyPrimaryMiddleware) : le vendeur voit
+  son produit dès la redirection, même si les réplicas sont en retard ;
+- d'un bloc `with use_primary():` (traitements en arrière-plan) ;
+- de la boutique juste après une modification du catalogue
+  (`pin_primary_if_recent`) : les fragments mis en cache sous la nouvelle
+  version du catalogue ne doivent pas venir d'un réplica en retard.
+
+Hors requête (commandes de gestion), la première écriture fait de même
+pour la suite du contexte d'exécution.
+"""
+import datetime
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+REPLICA_MODELS = frozenset({
+    'app.category',
+    'app.product',
+    'app.productsearchentry',
+    'app.sellerstats',
+    'app.order',
+    'app.orderitem',
+})
+STICKY_COOKIE = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class _Routing:
+    """État du contexte courant (requête, thread, tâche asynchrone)."""
+    __slots__ = ('primary', 'wrote')
+
+    def __init__(self, primary=False):
+        self.primary = primary
+        self.wrote = False
+
+
+_routing = ContextVar('db_routing', default=None)
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+@contextmanager
+def use_primary():
+    """Toutes les lectures du bloc sur la base principale."""
+    token = _routing.set(_Routing(primary=True))
+    try:
+        yield
+    finally:
+        _routing.reset(token)
+
+
+def pin_primary_if_recent(modified):
+    """Lectures de la suite du contexte sur la base principale si `modified` est récent."""
+    lag = datetime.timedelta(seconds=settings.REPLICA_STICKY_SECONDS)
+    if not replicas() or timezone.now() - modified >= lag:
+        return
+    state = _routing.get()
+    if state is None:
+        state = _Routing()
+        _routing.set(state)
+    state.primary = True
+
+
+class PrimaryReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if not aliases or model._meta.label_lower not in REPLICA_MODELS:
+            return DEFAULT_DB_ALIAS
+        state = _routing.get()
+        if state is not None and state.primary:
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is None:
+            state = _Routing()
+            _routing.set(state)
+        state.primary = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mêmes données partout : un produit lu sur un réplica peut être
+        # rattaché à une ligne de panier écrite sur la base principale
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Les réplicas sont des copies de la base principale, déjà migrée
+        if db in replicas():
+            return False
+        return None
+
+
+class StickyPrimaryMiddleware:
+    """
+    Choisit la base des lectures de la requête et pose le cookie après une
+    écriture. Sous ASGI, l'état suit la requête dans les threads de
+    sync_to_async (ORM asynchrone, middlewares synchrones) : le ContextVar
+    y est copié, l'objet _Routing partagé.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = _Routing(primary=request.method not in SAFE_METHODS or STICKY_COOKIE in request.COOKIES)
+        token = _routing.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing.reset(token)
+        self._stick(state, response)
+        return response
+
+    async def __acall__(self, request):
+        state = _Routing(primary=request.method not in SAFE_METHODS or STICKY_COOKIE in request.COOKIES)
+        token = _routing.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing.reset(token)
+        self._stick(state, response)
+        return response
+
+    def _stick(self, state, response):
+        if state.wrote and replicas():
+            response.set_cookie(STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS,
+                                httponly=True, samesite='Lax')
@@ -0,0 +1,101 @@
+"""
+Moteur SQLite réglé pour la production (ENGINE 'app.db.sqlite3', activé par
+SQLITE_TUNED=1, voir config.settings).
+
+À chaque connexion, les PRAGMAS ci-dessous, dont le journal WAL : une
+lecture ne bloque plus une écriture ni l'inverse (elle voit le dernier état
+validé) ; il reste un seul écrivain à la fois.
+
+Les transactions (atomic) commencent par BEGIN IMMEDIATE : le verrou
+d'écriture est pris d'entrée. Avec BEGIN simple (DEFERRED), une transaction
+qui lit puis écrit (get_or_create, décrément du stock) doit promouvoir son
+verrou, et si un autre écrivain a validé entre-temps, SQLite répond
+« database is locked » sur-le-champ, sans attendre busy_timeout.
+
+Un BEGIN ou une instruction hors transaction encore refusé après
+busy_timeout est réessayé avec une attente croissante : rien n'a été écrit,
+le réessai est sûr. Dans une transaction ouverte, l'erreur remonte : c'est
+la transaction entière qu'il faut rejouer (voir app.checkout).
+
+OPTIONS de DATABASES : 'pragmas' (remplace des valeurs de PRAGMAS),
+'lock_retries', 'lock_backoff' ; 'transaction_mode' garde son sens Django
+(IMMEDIATE par défaut ici).
+"""
+import random
+import time
+
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    # En premier : les suivants attendent un verrou au lieu d'échouer
+    'busy_timeout': 5000,  # ms
+    'journal_mode': 'WAL',
+    # Sûr en WAL : une coupure de courant peut perdre les derniers commits,
+    # jamais corrompre la base ; évite un fsync par commit
+    'synchronous': 'NORMAL',
+    'cache_size': -32000,  # négatif : en Kio, soit 32 Mo par connexion
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',  # tris et index temporaires (ORDER BY, DISTINCT)
+}
+LOCK_RETRIES = 5
+LOCK_BACKOFF = 0.05  # secondes, doublé à chaque nouvel essai
+
+_OPTIONS = ('pragmas', 'lock_retries', 'lock_backoff')
+
+
+def is_lock_error(exc):
+    return isinstance(exc, base.Database.OperationalError) and 'locked' in str(exc)
+
+
+class RetryingCursorWrapper(base.SQLiteCursorWrapper):
+    """Curseur qui réessaie, hors transaction, les instructions refusées sur un verrou."""
+
+    retry = None  # DatabaseWrapper._retry_locked, posé par create_cursor
+
+    def execute(self, query, params=None):
+        if self.connection.in_transaction:
+            return super().execute(query, params)
+        return self.retry(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        if self.connection.in_transaction:
+            return super().executemany(query, param_list)
+        # Liste : un générateur ne se relit pas au second essai
+        return self.retry(super().executemany, query, list(param_list))
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_connection_params(self):
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = {**PRAGMAS, **options.get('pragmas', {})}
+        self.lock_retries = options.get('lock_retries', LOCK_RETRIES)
+        self.lock_backoff = options.get('lock_backoff', LOCK_BACKOFF)
+        kwargs = super().get_connection_params()
+        for name in _OPTIONS:
+            kwargs.pop(name, None)
+        if 'transaction_mode' not in options:
+            self.transaction_mode = 'IMMEDIATE'
+        return kwargs
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            # Passage en WAL : verrou exclusif bref, peut attendre un lecteur
+            self._retry_locked(conn.execute, f'PRAGMA {name} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=RetryingCursorWrapper)
+        cursor.retry = self._retry_locked
+        return cursor
+
+    def _retry_locked(self, func, *args):
+        for attempt in range(self.lock_retries + 1):
+            try:
+                return func(*args)
+            except base.Database.OperationalError as exc:
+                if not is_lock_error(exc) or attempt == self.lock_retries:
+                    raise
+            # Attente dispersée : les écrivains en conflit ne repartent pas ensemble
+            time.sleep(self.lock_backoff * (2 ** attempt) * random.uniform(0.5, 1.5))
@@ -0,0 +1,135 @@
+"""
+Exports en flux (CSV ou JSONL) des commandes et du catalogue d'un vendeur.
+
+Les générateurs ci-dessous produisent le fichier morceau par morceau : ils
+servent tels quels à un StreamingHttpResponse (vues) ou à l'écriture d'un
+fichier (commande export_data). La base est parcourue par
+`iterator(chunk_size=…)` : jamais plus d'un paquet de lignes en mémoire,
+préchargement des articles compris (un prefetch par paquet de commandes).
+
+Le catalogue est exporté avec les colonnes de l'import (app.product_import) :
+le fichier peut être modifié puis réimporté tel quel.
+"""
+import csv
+import json
+
+from django.db.models import Prefetch
+
+from .models import Order, OrderItem, Product
+from .product_import import FORMATS
+from .sellers import get_seller_stats, seller_orders
+
+EXPORT_FORMATS = sorted(set(FORMATS.values()))
+EXPORT_CHUNK_SIZE = 2000
+CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'jsonl': 'application/x-ndjson; charset=utf-8'}
+
+ORDER_FIELDS = ['order_id', 'created_at', 'status', 'customer', 'total_price', 'shipping_address', 'phone']
+ORDER_ITEM_FIELDS = ['product_id', 'sku', 'product', 'quantity', 'price']
+CATALOG_FIELDS = ['sku', 'name', 'category', 'description', 'price', 'old_price', 'discount_percentage',
+                  'badge', 'stock', 'is_featured', 'id', 'is_active', 'created_at']
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer : renvoie la ligne au lieu de l'écrire."""
+
+    def write(self, value):
+        return value
+
+
+def _csv(header, rows):
+    writer = csv.writer(_Echo())
+    # BOM : Excel reconnaît alors l'UTF-8 (l'import l'accepte)
+    yield '\ufeff' + writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _jsonl(objects):
+    for obj in objects:
+        yield json.dumps(obj, ensure_ascii=False, default=str) + '\n'
+
+
+def _check_format(fmt):
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Format d'export inconnu : {fmt}")
+
+
+# --- Commandes ---
+
+def orders_queryset(seller=None, status=None, start=None, end=None):
+    """
+    Commandes à exporter, par date croissante. Avec `seller`, seules ses
+    commandes, et seuls ses articles dans `order.seller_items` ; sinon tous
+    les articles dans `order.export_items`.
+    """
+    if seller is not None:
+        orders = seller_orders(seller, status=status, start=start, end=end,
+                               order_count=get_seller_stats(seller).order_count)
+    else:
+        orders = Order.objects.prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product').order_by('id'),
+                     to_attr='export_items'))
+        if status:
+            orders = orders.filter(status=status)
+        if start is not None:
+            orders = orders.filter(created_at__gte=start)
+        if end is not None:
+            orders = orders.filter(created_at__lt=end)
+    return orders.select_related('user').order_by('created_at', 'id')
+
+
+def _order_items(order):
+    items = getattr(order, 'seller_items', None)
+    return items if items is not None else order.export_items
+
+
+def _order_values(order):
+    return [order.pk, order.created_at.isoformat(), order.status, order.user.username,
+            order.total_price, order.shipping_address, order.phone]
+
+
+def _item_values(item):
+    return [item.product_id, item.product.sku, item.product.name, item.quantity, item.price]
+
+
+def export_orders(fmt, chunk_size=EXPORT_CHUNK_SIZE, **filters):
+    """
+    Morceaux du fichier d'export des commandes : en CSV une ligne par
+    article (colonnes de la commande répétées), en JSONL une commande par
+    ligne avec ses articles dans `items`. `filters` : voir orders_queryset.
+    """
+    _check_format(fmt)
+    orders = orders_queryset(**filters).iterator(chunk_size=chunk_size)
+    if fmt == 'csv':
+        return _csv(ORDER_FIELDS + ORDER_ITEM_FIELDS, (
+            _order_values(order) + _item_values(item)
+            for order in orders
+            for item in _order_items(order)
+        ))
+    return _jsonl(
+        dict(zip(ORDER_FIELDS, _order_values(order)),
+             items=[dict(zip(ORDER_ITEM_FIELDS, _item_values(item))) for item in _order_items(order)])
+        for order in orders
+    )
+
+
+# --- Catalogue d'un vendeur ---
+
+def _product_values(product):
+    return [product.sku, product.name, product.category.slug if product.category else '',
+            product.description, product.price, product.old_price, product.discount_percentage,
+            product.badge, product.stock, product.is_featured, product.pk, product.is_active,
+            product.created_at.isoformat()]
+
+
+def export_catalog(seller, fmt, chunk_size=EXPORT_CHUNK_SIZE):
+    """Morceaux du fichier d'export des produits de `seller` (par id croissant)."""
+    _check_format(fmt)
+    products = (Product.objects
+                .filter(seller=seller)
+                .select_related('category')
+                .order_by('id')
+                .iterator(chunk_size=chunk_size))
+    if fmt == 'csv':
+        return _csv(CATALOG_FIELDS, (_product_values(product) for product in products))
+    return _jsonl(dict(zip(CATALOG_FIELDS, _product_values(product))) for product in products)
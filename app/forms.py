@@ -166,3 +166,30 @@ class ProductForm(forms.ModelForm):
 			'is_featured': 'Produit mis en avant',
 		}
 
+
+
+class ProductImportRowForm(ProductForm):
+	"""
+	Validation d'une ligne d'import (mêmes règles que ProductForm) : sans
+	images, et la catégorie est résolue à part, par son slug.
+	"""
+	
+	class Meta(ProductForm.Meta):
+		fields = ['sku', 'name', 'description', 'price', 'old_price',
+				  'discount_percentage', 'badge', 'stock', 'is_featured']
+
+
+class ProductImportForm(forms.Form):
+	"""Fichier CSV ou JSONL à importer dans le catalogue du vendeur"""
+	
+	file = forms.FileField(
+		label='Fichier (.csv ou .jsonl)',
+		widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.jsonl,.ndjson'})
+	)
+	
+	def clean_file(self):
+		from .product_import import detect_format
+		upload = self.cleaned_data['file']
+		if detect_format(upload.name) is None:
+			raise ValidationError("Format non reconnu : fichier .csv ou .jsonl attendu.")
+		return upload
@@ -0,0 +1,318 @@
+"""
+Panier des visiteurs non connectés.
+
+Stocké selon settings.GUEST_CART_STORAGE :
+
+- 'session' : dans la session (moteur cached_db : lue depuis le cache,
+  écrite aussi en base) ;
+- 'cookie' : dans un cookie signé, compact et versionné, limité à
+  COOKIE_MAX_LINES lignes. Ni session ni écriture en base : les robots qui
+  suivent les liens « Ajouter au panier » ne remplissent plus django_session.
+
+Les vues lisent le panier par `get_guest_cart(request)` (chargé une fois par
+requête ; `aget_guest_cart` pour les vues asynchrones) ; GuestCartMiddleware
+l'enregistre à la réponse s'il a changé.
+Un panier inactif depuis GUEST_CART_TTL est abandonné : cookie expiré, ou
+session supprimée par la commande purge_carts.
+"""
+import datetime
+from decimal import Decimal
+from importlib import import_module
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY as AUTH_SESSION_KEY
+from django.core import signing
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+
+from .models import CartSummary
+
+SESSION_CART_KEY = 'cart'
+SESSION_PRICES_KEY = 'cart_prices'
+
+CART_COOKIE_NAME = 'guest_cart'
+COOKIE_SALT = 'app.guest_cart'
+# Format du cookie : une nouvelle version rend les anciens cookies vides
+# (panier perdu) au lieu de les mal lire
+COOKIE_VERSION = 1
+COOKIE_MAX_LINES = 50
+COOKIE_MAX_BYTES = 3800  # un cookie, attributs compris, tient en 4096 octets
+PURGE_BATCH_SIZE = 1000
+
+
+class CartFull(Exception):
+    """Le panier ne peut pas contenir une ligne de plus (cookie)."""
+
+
+class GuestCart:
+    """Quantités par produit, et prix unitaires mémorisés à l'ajout (sous-total sans requête)."""
+
+    def __init__(self, items=None, prices=None, max_lines=None):
+        self.items = dict(items or {})  # {id produit (str): quantité}
+        self.prices = dict(prices or {})  # {id produit (str): prix unitaire (str)}
+        self.max_lines = max_lines
+        self.modified = False
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, product, quantity=1):
+        key = str(product.pk)
+        if key not in self.items and self.max_lines is not None and len(self.items) >= self.max_lines:
+            raise CartFull
+        self.items[key] = self.items.get(key, 0) + quantity
+        self.prices[key] = str(product.price)
+        self.modified = True
+
+    def set_quantity(self, product_id, quantity):
+        """Nouvelle quantité d'une ligne existante (0 ou moins : retirée)."""
+        key = str(product_id)
+        if key not in self.items:
+            return
+        if quantity <= 0:
+            self.remove(key)
+        else:
+            self.items[key] = quantity
+            self.modified = True
+
+    def remove(self, product_id):
+        """Retire une ligne ; False si elle n'était pas dans le panier."""
+        key = str(product_id)
+        if self.items.pop(key, None) is None:
+            return False
+        self.prices.pop(key, None)
+        self.modified = True
+        return True
+
+    def reprice(self, product_id, price):
+        key = str(product_id)
+        if self.prices.get(key) != str(price):
+            self.prices[key] = str(price)
+            self.modified = True
+
+    def clear(self):
+        if self.items or self.prices:
+            self.items, self.prices = {}, {}
+            self.modified = True
+
+    def summary(self):
+        """Résumé du panier, sans requête (instance non enregistrée)."""
+        subtotal = sum((Decimal(self.prices.get(key, '0')) * quantity for key, quantity in self.items.items()),
+                       Decimal('0'))
+        return CartSummary(item_count=len(self.items), total_quantity=sum(self.items.values()), subtotal=subtotal)
+
+
+# --- Stockages ---
+
+class SessionStorage:
+    max_lines = None
+
+    def may_have_cart(self, request):
+        return settings.SESSION_COOKIE_NAME in request.COOKIES
+
+    def load(self, request):
+        session = request.session
+        return GuestCart(session.get(SESSION_CART_KEY), session.get(SESSION_PRICES_KEY))
+
+    async def aload(self, request):
+        session = request.session
+        return GuestCart(await session.aget(SESSION_CART_KEY), await session.aget(SESSION_PRICES_KEY))
+
+    def save(self, request, response, cart):
+        session = request.session
+        if cart.items:
+            session[SESSION_CART_KEY] = cart.items
+            session[SESSION_PRICES_KEY] = cart.prices
+        else:
+            session.pop(SESSION_CART_KEY, None)
+            session.pop(SESSION_PRICES_KEY, None)
+
+
+def encode_cookie(cart):
+    """Valeur signée du cookie : [version, [[id, quantité, prix], …]], compressée."""
+    lines = [[int(key), quantity, cart.prices.get(key, '')] for key, quantity in cart.items.items()]
+    value = signing.dumps([COOKIE_VERSION, lines], salt=COOKIE_SALT, compress=True)
+    if len(value) > COOKIE_MAX_BYTES:
+        raise CartFull
+    return value
+
+
+def decode_cookie(value, max_lines=COOKIE_MAX_LINES):
+    """Panier du cookie ; vide si la signature, l'âge, la version ou le contenu ne conviennent pas."""
+    try:
+        version, lines = signing.loads(value, salt=COOKIE_SALT, max_age=settings.GUEST_CART_TTL)
+        if version != COOKIE_VERSION:
+            return GuestCart(max_lines=max_lines)
+        items, prices = {}, {}
+        for product_id, quantity, price in lines[:max_lines]:
+            if int(quantity) > 0:
+                items[str(int(product_id))] = int(quantity)
+                if price:
+                    prices[str(int(product_id))] = str(Decimal(price))
+    except (signing.BadSignature, ValueError, TypeError, ArithmeticError):
+        return GuestCart(max_lines=max_lines)
+    return GuestCart(items, prices, max_lines=max_lines)
+
+
+class CookieStorage:
+    max_lines = COOKIE_MAX_LINES
+
+    def may_have_cart(self, request):
+        return CART_COOKIE_NAME in request.COOKIES
+
+    def load(self, request):
+        value = request.COOKIES.get(CART_COOKIE_NAME)
+        if not value:
+            return GuestCart(max_lines=self.max_lines)
+        return decode_cookie(value, self.max_lines)
+
+    async def aload(self, request):
+        return self.load(request)
+
+    def save(self, request, response, cart):
+        if not cart.items:
+            response.delete_cookie(CART_COOKIE_NAME, samesite='Lax')
+            return
+        try:
+            value = encode_cookie(cart)
+        except CartFull:
+            return  # impossible dans les limites d'add() : l'ancien cookie reste
+        # Rafraîchi à chaque modification : l'inactivité seule le fait expirer
+        response.set_cookie(CART_COOKIE_NAME, value, max_age=settings.GUEST_CART_TTL,
+                            secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax')
+
+
+STORAGES = {'session': SessionStorage, 'cookie': CookieStorage}
+
+
+def get_storage():
+    name = getattr(settings, 'GUEST_CART_STORAGE', 'session')
+    try:
+        return STORAGES[name]()
+    except KeyError:
+        raise ImproperlyConfigured(f"GUEST_CART_STORAGE inconnu : {name!r} (attendu : {', '.join(STORAGES)}).")
+
+
+def get_guest_cart(request):
+    """Panier du visiteur de `request`, lu une seule fois par requête."""
+    if getattr(request, '_guest_cart', None) is None:
+        request._guest_cart = get_storage().load(request)
+    return request._guest_cart
+
+
+async def aget_guest_cart(request):
+    """get_guest_cart() pour les vues asynchrones (session lue en asynchrone)."""
+    if getattr(request, '_guest_cart', None) is None:
+        request._guest_cart = await get_storage().aload(request)
+    return request._guest_cart
+
+
+def may_have_cart(request):
+    """Faux si le visiteur n'a certainement pas de panier (aucun cookie à lire)."""
+    return get_storage().may_have_cart(request)
+
+
+class GuestCartMiddleware:
+    """Enregistre le panier du visiteur modifié par la vue. Après SessionMiddleware."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        cart = self._process_response(request, response)
+        if cart is not None:
+            get_storage().save(request, response, cart)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        cart = self._process_response(request, response)
+        if cart is not None:
+            await sync_to_async(get_storage().save)(request, response, cart)
+        return response
+
+    def _process_response(self, request, response):
+        """Panier à enregistrer, ou None."""
+        cart = getattr(request, '_guest_cart', None)
+        if cart is None:
+            return None
+        # Page rendue d'après le panier : propre aux cookies du visiteur
+        patch_vary_headers(response, ('Cookie',))
+        return cart if cart.modified else None
+
+
+# --- Purge (commande purge_carts) ---
+
+class PurgeReport:
+    def __init__(self):
+        self.expired_sessions = 0
+        self.scanned_sessions = 0
+        self.abandoned_carts = 0
+
+
+def _delete_sessions(store_class, keys):
+    store_class.get_model_class().objects.filter(session_key__in=keys).delete()
+    # cached_db : la copie en cache ne doit pas survivre à la ligne
+    prefix = getattr(store_class, 'cache_key_prefix', None)
+    if prefix is not None:
+        caches[settings.SESSION_CACHE_ALIAS].delete_many([prefix + key for key in keys])
+
+
+def purge_sessions(batch_size=PURGE_BATCH_SIZE, dry_run=False, stdout=None):
+    """
+    Supprime, par lots (une transaction courte chacun), les sessions
+    expirées puis les sessions de visiteurs dont le panier est inactif depuis
+    GUEST_CART_TTL. Sans effet si les sessions ne sont pas en base.
+    Renvoie un PurgeReport.
+    """
+    report = PurgeReport()
+    store_class = import_module(settings.SESSION_ENGINE).SessionStore
+    if not hasattr(store_class, 'get_model_class'):
+        return report
+    model = store_class.get_model_class()
+    now = timezone.now()
+
+    expired = model.objects.filter(expire_date__lt=now)
+    if dry_run:
+        report.expired_sessions = expired.count()
+    else:
+        while keys := list(expired.values_list('session_key', flat=True)[:batch_size]):
+            _delete_sessions(store_class, keys)
+            report.expired_sessions += len(keys)
+
+    # Une session expire SESSION_COOKIE_AGE après son dernier enregistrement :
+    # celles enregistrées avant `now - GUEST_CART_TTL` n'ont pas bougé depuis
+    idle_before = now + datetime.timedelta(seconds=settings.SESSION_COOKIE_AGE - settings.GUEST_CART_TTL)
+    candidates = model.objects.filter(expire_date__gte=now, expire_date__lt=idle_before).order_by('session_key')
+    decoder = store_class()
+    last_key = ''
+    while True:
+        rows = list(candidates.filter(session_key__gt=last_key)
+                    .values_list('session_key', 'session_data')[:batch_size])
+        if not rows:
+            break
+        last_key = rows[-1][0]
+        report.scanned_sessions += len(rows)
+        abandoned = []
+        for key, data in rows:
+            session = decoder.decode(data)
+            # Session anonyme avec un panier : rien d'autre à conserver
+            if SESSION_CART_KEY in session and AUTH_SESSION_KEY not in session:
+                abandoned.append(key)
+        if abandoned and not dry_run:
+            _delete_sessions(store_class, abandoned)
+        report.abandoned_carts += len(abandoned)
+        if stdout is not None:
+            stdout.write(f"  {report.scanned_sessions} sessions examinées, "
+                         f"{report.abandoned_carts} paniers abandonnés")
+    return report
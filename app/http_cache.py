@@ -0,0 +1,91 @@
+"""
+Requêtes conditionnelles (ETag / Last-Modified) des pages du catalogue.
+
+Le validateur d'une page se calcule sans la rendre : version du catalogue
+(app.catalog, change à chaque écriture de Product / Category, import,
+commande), empreinte des statiques déployés (noms hachés des bundles), et
+parties propres au visiteur affichées par la page (compte, rôle, nombre
+d'articles du panier). Un navigateur qui renvoie l'ETag reçoit un 304 :
+ni requête produit, ni rendu de template.
+
+Une page vue sans panier de visiteur ni connexion est identique pour tous :
+elle est marquée `public` avec un `s-maxage` court, qu'un CDN ou un proxy
+inverse peut resservir (Vary: Cookie ; le proxy ne doit garder dans sa clé
+que les cookies de session et de panier). Les autres sont `private` et
+revalidées à chaque vue.
+
+Pour une vue asynchrone, utilisateur et panier sont lus d'avance
+(`aload_request_context`) : les validateurs se calculent sans requête.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .cart import request_summary
+from .catalog import catalog_modified, catalog_version
+from .context_processors import aload_request_context
+from .guest_cart import may_have_cart
+
+# Durée pendant laquelle un cache partagé resert une page anonyme sans
+# revalider : une modification du catalogue y apparaît avec ce retard au plus
+SHARED_MAX_AGE = 60
+
+
+def _personal_part(request):
+    """Parties de la page propres au visiteur, '' si elle est la même pour tous."""
+    user = request.user
+    if not user.is_authenticated:
+        # Sans cookie de session ou de panier, pas de panier : rien à lire
+        if not may_have_cart(request):
+            return ''
+        return f'guest:{request_summary(request).total_quantity}'
+    profile = getattr(user, 'profile', None)
+    return f'{user.pk}:{profile.role if profile else ""}:{request_summary(request).total_quantity}'
+
+
+def _etag(request, *args, **kwargs):
+    build = getattr(staticfiles_storage, 'manifest_hash', '')
+    raw = f'{catalog_version()}:{build}:{_personal_part(request)}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _last_modified(request, *args, **kwargs):
+    # La date ne suit que le catalogue, pas le panier : page partagée seulement
+    if _personal_part(request):
+        return None
+    return catalog_modified()
+
+
+def catalog_page(view):
+    """
+    Décorateur des vues du catalogue : 304 si le validateur envoyé par le
+    client est à jour, Cache-Control / Vary sur toutes les réponses GET.
+    """
+    conditional_view = condition(etag_func=_etag, last_modified_func=_last_modified)(view)
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            await aload_request_context(request)
+            response = await conditional_view(request, *args, **kwargs)
+            return _patch_headers(request, response)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return _patch_headers(request, conditional_view(request, *args, **kwargs))
+    return wrapper
+
+
+def _patch_headers(request, response):
+    if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+        if _personal_part(request):
+            patch_cache_control(response, private=True, no_cache=True)
+        else:
+            patch_cache_control(response, public=True, max_age=0, s_maxage=SHARED_MAX_AGE)
+        patch_vary_headers(response, ('Cookie',))
+    return response
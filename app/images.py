@@ -0,0 +1,285 @@
+"""
+Déclinaisons des images produit (miniature, carte, détail ; JPEG et WebP).
+
+Chaque image envoyée (image, image2, image3) est redimensionnée et
+recompressée une fois pour toutes. Les fichiers sont nommés d'après une
+empreinte du contenu de l'original et des réglages ci-dessous : un nom ne
+désigne jamais deux contenus différents (cache HTTP illimité possible), et
+une image envoyée deux fois n'est traitée qu'une fois.
+
+Les noms générés sont enregistrés dans Product.image_variants :
+
+    {'image': {'source': 'products/x.jpg',
+               'variants': {'card': {'width': 480, 'height': 360,
+                                     'jpeg': '…', 'webp': '…'}, …}}, …}
+
+La génération est déclenchée après l'enregistrement d'un produit dont une
+image a changé (app.signals) : dans la requête qui envoie l'image, ou dans
+un thread si IMAGE_VARIANTS_IN_BACKGROUND est vrai. Le tag `product_image`
+affiche l'original tant qu'une déclinaison manque et ne la demande qu'au
+thread : jamais de redimensionnement pendant le rendu d'une page. La
+commande generate_image_variants rattrape l'existant.
+
+Une déclinaison générée ne change pas la version du catalogue (elle
+périmerait tous les fragments de la boutique) : un fragment déjà en cache
+garde l'original jusqu'à son expiration ou la prochaine modification.
+
+Un produit sans image affiche une image par défaut choisie parmi celles
+de sa catégorie, toujours la même pour un produit donné (`default_image`) :
+les fragments en cache et les ETag de la boutique restent identiques
+d'une requête à l'autre.
+"""
+import hashlib
+import io
+import logging
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.db.models import Q
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .db.routing import use_primary
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+IMAGE_FIELDS = ('image', 'image2', 'image3')
+# Boîte (largeur, hauteur) dans laquelle chaque déclinaison est inscrite
+VARIANTS = {
+    'thumb': (160, 160),
+    'card': (480, 480),
+    'detail': (1200, 1200),
+}
+FORMATS = ('jpeg', 'webp')
+JPEG_QUALITY = 82
+WEBP_QUALITY = 80
+VARIANT_DIR = 'products/variants'
+# Entre deux demandes de génération pour un même produit
+PENDING_TIMEOUT = 5 * 60
+
+# Tout changement de réglage change les empreintes, donc les noms
+_SPEC = repr((sorted(VARIANTS.items()), FORMATS, JPEG_QUALITY, WEBP_QUALITY)).encode()
+
+_executor = None
+
+
+def _digest(fieldfile):
+    digest = hashlib.sha256(_SPEC)
+    fieldfile.open('rb')
+    try:
+        for chunk in fieldfile.chunks():
+            digest.update(chunk)
+    finally:
+        fieldfile.close()
+    return digest.hexdigest()[:24]
+
+
+def _open(fieldfile):
+    fieldfile.open('rb')
+    try:
+        image = Image.open(fieldfile)
+        # Un JPEG est décodé directement à l'échelle utile (bien plus rapide)
+        image.draft('RGB', max(VARIANTS.values()))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            return background
+        return image.convert('RGB')
+    finally:
+        fieldfile.close()
+
+
+def _encode(image, fmt):
+    buffer = io.BytesIO()
+    if fmt == 'jpeg':
+        image.save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def _generate(fieldfile):
+    """Entrée de image_variants pour un fichier (déclinaisons écrites au besoin)."""
+    digest = _digest(fieldfile)
+    source = None
+    variants = {}
+    for variant, box in VARIANTS.items():
+        names = {fmt: f'{VARIANT_DIR}/{digest[:2]}/{digest}-{variant}.{"jpg" if fmt == "jpeg" else fmt}'
+                 for fmt in FORMATS}
+        size = None
+        if not all(default_storage.exists(name) for name in names.values()):
+            if source is None:
+                source = _open(fieldfile)
+            image = source.copy()
+            image.thumbnail(box, Image.LANCZOS)
+            size = image.size
+            for fmt, name in names.items():
+                if not default_storage.exists(name):
+                    default_storage.save(name, ContentFile(_encode(image, fmt)))
+        else:
+            # Déjà générée (même contenu ailleurs) : seules les dimensions manquent
+            with default_storage.open(names['jpeg']) as fh:
+                size = Image.open(fh).size
+        variants[variant] = {'width': size[0], 'height': size[1], **names}
+    return {'source': fieldfile.name, 'variants': variants}
+
+
+def variant_entry(product, field='image'):
+    """Entrée à jour de `field` dans image_variants, ou None (absente ou périmée)."""
+    fieldfile = getattr(product, field)
+    entry = (product.image_variants or {}).get(field)
+    if not fieldfile or entry is None or entry.get('source') != fieldfile.name:
+        return None
+    if set(entry.get('variants', ())) != set(VARIANTS):
+        return None
+    return entry
+
+
+def generate_variants(product_id, force=False):
+    """
+    Génère les déclinaisons manquantes ou périmées d'un produit ; avec
+    `force`, revérifie aussi les entrées à jour (fichiers disparus
+    recréés). Renvoie True si image_variants a changé.
+    """
+    product = Product.objects.filter(pk=product_id).only('image_variants', *IMAGE_FIELDS).first()
+    if product is None:
+        return False
+    entries = {}
+    for field in IMAGE_FIELDS:
+        fieldfile = getattr(product, field)
+        if not fieldfile:
+            continue
+        entry = None if force else variant_entry(product, field)
+        if entry is None:
+            try:
+                entry = _generate(fieldfile)
+            except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+                logger.warning("Image illisible pour le produit %s (%s) : %s", product_id, field, fieldfile.name)
+                continue
+        entries[field] = entry
+    if entries == (product.image_variants or {}):
+        return False
+    # Seulement si l'image n'a pas changé entre-temps (sinon une autre
+    # génération est déjà prévue) ; update() : pas de signal, pas de boucle
+    unchanged = Q()
+    for field in IMAGE_FIELDS:
+        name = getattr(product, field).name
+        unchanged &= Q(**{field: name}) if name else Q(**{field: ''}) | Q(**{f'{field}__isnull': True})
+    updated = Product.objects.filter(unchanged, pk=product_id).update(image_variants=entries or None)
+    return bool(updated)
+
+
+def _run(product_id):
+    try:
+        generate_variants(product_id)
+    except Exception:
+        logger.exception("Échec de la génération des images du produit %s", product_id)
+    finally:
+        cache.delete(f'images:pending:{product_id}')
+
+
+def _run_in_background(product_id):
+    try:
+        # Lancé juste après l'enregistrement : un réplica peut être en retard
+        with use_primary():
+            _run(product_id)
+    finally:
+        close_old_connections()
+
+
+def _pending(product_id):
+    # Demandes répétées pendant une génération (rendus concurrents) ignorées
+    return not cache.add(f'images:pending:{product_id}', 1, PENDING_TIMEOUT)
+
+
+def _submit(product_id):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-variants')
+    _executor.submit(_run_in_background, product_id)
+
+
+def schedule_variants(product_id):
+    """
+    Demande la génération des déclinaisons d'un produit enregistré, après
+    la transaction en cours : dans la requête, ou dans un thread si
+    IMAGE_VARIANTS_IN_BACKGROUND est vrai.
+    """
+    if _pending(product_id):
+        return
+    if getattr(settings, 'IMAGE_VARIANTS_IN_BACKGROUND', False):
+        transaction.on_commit(lambda: _submit(product_id))
+    else:
+        transaction.on_commit(lambda: _run(product_id))
+
+
+def request_variants(product_id):
+    """
+    Déclinaison manquante vue au rendu d'une page : confiée au thread si
+    IMAGE_VARIANTS_IN_BACKGROUND est vrai, sinon laissée à la commande
+    generate_image_variants.
+    """
+    if getattr(settings, 'IMAGE_VARIANTS_IN_BACKGROUND', False) and not _pending(product_id):
+        _submit(product_id)
+
+
+def images_changed(product):
+    """Vrai si image_variants ne correspond plus aux images de `product`."""
+    recorded = product.image_variants or {}
+    for field in IMAGE_FIELDS:
+        if getattr(product, field):
+            if variant_entry(product, field) is None:
+                return True
+        elif field in recorded:
+            return True
+    return False
+
+
+# --- Images par défaut (produits sans image) ---
+
+PLACEHOLDER_DIR = 'assets/img/shop/'
+DEFAULT_PLACEHOLDERS = ['shop-1.jpg', 'shop-2.jpg', 'shop-3.jpg', 'shop-4.jpg', 'shop-5.jpg']
+# Par slug de catégorie ; les autres catégories utilisent DEFAULT_PLACEHOLDERS
+CATEGORY_PLACEHOLDERS = {
+    'maison-decoration': ['armoir.jpeg', 'meublee.jpeg', 'table.jpeg'],
+}
+
+_placeholders = None
+
+
+def resolve_placeholders():
+    """
+    Chemins statiques des images par défaut, par slug de catégorie ('' :
+    ensemble général). Fichiers absents écartés ; appelé une fois au
+    démarrage (AppConfig.ready).
+    """
+    global _placeholders
+
+    def existing(names):
+        return [PLACEHOLDER_DIR + name for name in names if finders.find(PLACEHOLDER_DIR + name)]
+
+    resolved = {'': existing(DEFAULT_PLACEHOLDERS)}
+    for slug, names in CATEGORY_PLACEHOLDERS.items():
+        resolved[slug] = existing(names) or resolved['']
+    _placeholders = resolved
+    return resolved
+
+
+def default_image(product):
+    """Chemin statique de l'image par défaut de `product`, stable d'une requête à l'autre."""
+    placeholders = _placeholders if _placeholders is not None else resolve_placeholders()
+    # category_id seul ne suffit pas : le slug vient de la catégorie préchargée
+    category = product.category if product.category_id else None
+    choices = placeholders.get(category.slug if category else '') or placeholders['']
+    if not choices:
+        return ''
+    # crc32 plutôt que hash() : identique d'un processus à l'autre
+    return choices[zlib.crc32(str(product.pk).encode()) % len(choices)]
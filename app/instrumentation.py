@@ -0,0 +1,286 @@
+"""
+Instrumentation des requêtes SQL par requête HTTP (opt-in).
+
+`QueryBudgetMiddleware` mesure pour chaque requête : nombre de requêtes
+SQL, temps passé en base, requêtes répétées (empreintes identiques, signe
+d'un N+1) et temps de rendu des templates. Le résultat est :
+
+- renvoyé dans l'en-tête `Server-Timing` (visible dans l'onglet Réseau) ;
+- journalisé en une ligne JSON sur le logger `app.instrumentation` ;
+- comparé au budget de la vue (settings.QUERY_BUDGETS, par nom d'URL) :
+  avertissement, ou QueryBudgetExceeded si QUERY_BUDGET_STRICT est vrai.
+
+Activé par QUERY_INSTRUMENTATION = True (variable d'environnement du même
+nom dans config/settings.py). Pour les tests : `query_budget()` et
+`assert_query_budget(response)`.
+"""
+import contextvars
+import hashlib
+import json
+import logging
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# Nombre de requêtes répétées détaillées dans le rapport et le journal
+MAX_REPORTED_DUPLICATES = 5
+
+_current = contextvars.ContextVar('app_instrumentation_stats', default=None)
+
+# Enveloppes posées par le premier bloc `record()` actif, retirées par le
+# dernier : hors mesure, ni rendu ni connexion ne passent par ce module
+_lock = threading.Lock()
+_active = 0
+_wrapped = weakref.WeakSet()
+_original_render = None
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Une vue a dépassé son budget de requêtes SQL."""
+
+
+def fingerprint(sql):
+    """Empreinte courte d'une requête (SQL paramétré, sans les valeurs)."""
+    return hashlib.sha1(sql.encode()).hexdigest()[:12]
+
+
+class RequestStats:
+    """Mesures d'une requête HTTP (ou d'un bloc `query_budget`)."""
+
+    def __init__(self, parent=None):
+        self.queries = []  # (sql, empreinte des paramètres, durée en s)
+        self.template_time = 0.0
+        self.total_time = 0.0
+        self.view_name = ''
+        self.parent = parent  # bloc englobant, qui compte aussi requêtes et rendu
+        self._template_depth = 0
+
+    @property
+    def query_count(self):
+        return len(self.queries)
+
+    @property
+    def db_time(self):
+        return sum(duration for _, _, duration in self.queries)
+
+    def duplicates(self):
+        """
+        Requêtes exécutées plusieurs fois, les plus répétées d'abord :
+        [{fingerprint, count, identical, sql}]. `identical` compte les
+        exécutions redondantes (mêmes paramètres qu'une exécution précédente).
+        """
+        groups = {}
+        for sql, params, _ in self.queries:
+            group = groups.setdefault(sql, {'count': 0, 'params': set()})
+            group['count'] += 1
+            group['params'].add(params)
+        repeated = [
+            {'fingerprint': fingerprint(sql), 'count': group['count'],
+             'identical': group['count'] - len(group['params']), 'sql': sql}
+            for sql, group in groups.items() if group['count'] > 1
+        ]
+        return sorted(repeated, key=lambda entry: -entry['count'])
+
+    def as_dict(self):
+        return {
+            'view': self.view_name,
+            'queries': self.query_count,
+            'db_ms': round(self.db_time * 1000, 2),
+            'template_ms': round(self.template_time * 1000, 2),
+            'total_ms': round(self.total_time * 1000, 2),
+            'duplicates': [
+                {key: entry[key] for key in ('fingerprint', 'count', 'identical')}
+                for entry in self.duplicates()[:MAX_REPORTED_DUPLICATES]
+            ],
+        }
+
+    def server_timing(self):
+        return (f'db;dur={self.db_time * 1000:.2f};desc="{self.query_count} queries", '
+                f'tpl;dur={self.template_time * 1000:.2f}, '
+                f'total;dur={self.total_time * 1000:.2f}')
+
+    def report(self, budget):
+        """Message d'échec lisible : dépassement et requêtes répétées."""
+        lines = [f"{self.view_name or 'bloc'} : {self.query_count} requêtes SQL pour un budget de {budget}"]
+        for entry in self.duplicates()[:MAX_REPORTED_DUPLICATES]:
+            lines.append(f"  x{entry['count']} [{entry['fingerprint']}] {entry['sql'][:200]}")
+        return '\n'.join(lines)
+
+
+def _record_query(execute, sql, params, many, context):
+    """
+    Enveloppe (execute_wrapper) posée sur les connexions pendant une
+    mesure : attribue la requête aux mesures du contexte courant. Sous ASGI, l'ORM exécute les
+    requêtes dans un thread de sync_to_async, avec ses propres connexions,
+    mais le contexte de la requête HTTP y est copié.
+    """
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        entry = (sql, hash(repr(params)), time.perf_counter() - start)
+        while stats is not None:
+            stats.queries.append(entry)
+            stats = stats.parent
+
+
+def _wrap_connection(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+        _wrapped.add(connection)
+
+
+def _timed_render(self, *args, **kwargs):
+    """Template.render des templates Django pendant une mesure."""
+    stats = _current.get()
+    if stats is None:
+        return _original_render(self, *args, **kwargs)
+    # Seul le template le plus externe compte (pas de double comptage)
+    stats._template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_render(self, *args, **kwargs)
+    finally:
+        stats._template_depth -= 1
+        if stats._template_depth == 0:
+            # Comptée aussi par les blocs englobants, comme les requêtes
+            elapsed = time.perf_counter() - start
+            while stats is not None:
+                stats.template_time += elapsed
+                stats = stats.parent
+
+
+def _install():
+    global _original_render
+    from django.template.backends.django import Template
+
+    _original_render = Template.render
+    Template.render = _timed_render
+    # Connexions ouvertes pendant la mesure, dans tout thread
+    connection_created.connect(_wrap_connection, dispatch_uid=__name__)
+
+
+def _uninstall():
+    from django.template.backends.django import Template
+
+    Template.render = _original_render
+    connection_created.disconnect(dispatch_uid=__name__)
+    for connection in list(_wrapped):
+        if _record_query in connection.execute_wrappers:
+            connection.execute_wrappers.remove(_record_query)
+    _wrapped.clear()
+
+
+@contextmanager
+def record():
+    """Enregistre les requêtes SQL et le rendu des templates du bloc."""
+    global _active
+    with _lock:
+        if not _active:
+            _install()
+        _active += 1
+        for connection in connections.all():
+            _wrap_connection(connection)
+    stats = RequestStats(parent=_current.get())
+    token = _current.set(stats)
+    start = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        stats.total_time = time.perf_counter() - start
+        _current.reset(token)
+        with _lock:
+            _active -= 1
+            if not _active:
+                _uninstall()
+
+
+def budget_for(view_name):
+    return getattr(settings, 'QUERY_BUDGETS', {}).get(view_name)
+
+
+@contextmanager
+def query_budget(max_queries):
+    """
+    Échoue (QueryBudgetExceeded) si le bloc exécute plus de `max_queries`
+    requêtes SQL :
+
+        with query_budget(4):
+            client.get(reverse('shop'))
+    """
+    with record() as stats:
+        yield stats
+    if stats.query_count > max_queries:
+        raise QueryBudgetExceeded(stats.report(max_queries))
+
+
+def assert_query_budget(response, max_queries=None):
+    """
+    Vérifie une réponse du client de test (middleware actif) contre
+    `max_queries` ou, à défaut, le budget déclaré pour la vue.
+    """
+    stats = getattr(response, 'query_stats', None)
+    if stats is None:
+        raise AssertionError("Réponse sans mesures : QUERY_INSTRUMENTATION est-il activé ?")
+    budget = max_queries if max_queries is not None else budget_for(stats.view_name)
+    if budget is not None and stats.query_count > budget:
+        raise QueryBudgetExceeded(stats.report(budget))
+    return stats
+
+
+class QueryBudgetMiddleware:
+    """
+    À placer en tête de MIDDLEWARE pour compter aussi session et
+    authentification. Sous ASGI, les requêtes de l'ORM asynchrone et des
+    vues synchrones sont comptées aussi (voir `_record_query`).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'QUERY_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.strict = getattr(settings, 'QUERY_BUDGET_STRICT', False)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record() as stats:
+            response = self.get_response(request)
+        return self._report(request, response, stats)
+
+    async def __acall__(self, request):
+        with record() as stats:
+            response = await self.get_response(request)
+        return self._report(request, response, stats)
+
+    def _report(self, request, response, stats):
+        match = request.resolver_match
+        stats.view_name = match.view_name if match else ''
+
+        response.query_stats = stats
+        response['Server-Timing'] = stats.server_timing()
+
+        budget = budget_for(stats.view_name)
+        entry = stats.as_dict()
+        entry.update(method=request.method, path=request.path, status=response.status_code, budget=budget)
+        over = budget is not None and stats.query_count > budget
+        logger.log(logging.WARNING if over else logging.INFO, json.dumps(entry))
+        if over and self.strict:
+            raise QueryBudgetExceeded(stats.report(budget))
+        return response
@@ -0,0 +1,286 @@
+import argparse
+import asyncio
+import io
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app.guest_cart import CART_COOKIE_NAME
+from app.models import Product
+from app.pagination import DEFAULT_SORT, keyset_page
+from app.synthetic import CatalogGenerator
+from app.views import SHOP_PER_PAGE
+
+from .benchmark_storefront import percentile
+
+# Mode -> (interface, ASYNC_VIEWS) ; chaque mode tourne dans son propre
+# processus, les vues étant choisies à l'import des URL
+MODES = {
+    'wsgi': ('wsgi', '0'),  # serveur WSGI à pool de threads, vues synchrones
+    'asgi-sync': ('asgi', '0'),  # ASGI, vues synchrones (thread de sync_to_async)
+    'asgi': ('asgi', '1'),  # ASGI, vues asynchrones
+}
+BENCH_SELLERS = 5
+GUEST_CART_LINES = 5
+HOST = 'testserver'
+
+
+class Command(BaseCommand):
+    help = ("Débit et latences des pages en lecture (accueil, boutique, panier) sous WSGI et sous ASGI "
+            "(vues synchrones puis asynchrones), à forte concurrence, sur une base SQLite jetable. "
+            "Les gestionnaires WSGI / ASGI de Django sont appelés directement, sans serveur HTTP.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=100,
+                            help="Clients simultanés (défaut : %(default)s)")
+        parser.add_argument('--requests', type=int, default=2000,
+                            help="Requêtes mesurées par mode (défaut : %(default)s)")
+        parser.add_argument('--threads', type=int, default=8,
+                            help="Threads du serveur WSGI simulé (défaut : %(default)s)")
+        parser.add_argument('--modes', nargs='+', choices=list(MODES), default=list(MODES))
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--visitors', type=int, default=30,
+                            help="Visiteurs : anonymes, avec un panier de visiteur, connectés (par tiers)")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', default='benchmark_asgi.json',
+                            help="Fichier du rapport JSON (défaut : %(default)s)")
+        # Processus de mesure d'un mode (lancé par la commande elle-même)
+        parser.add_argument('--serve', choices=list(MODES), help=argparse.SUPPRESS)
+        parser.add_argument('--database', help=argparse.SUPPRESS)
+        parser.add_argument('--plan', help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options['serve']:
+            return self._serve(options)
+
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            raise CommandError("Le banc d'essai crée une base SQLite jetable : moteur SQLite requis.")
+        directory = tempfile.mkdtemp(prefix='benchmark-asgi-')
+        path = os.path.join(directory, 'storefront.sqlite3')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = path
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        overrides = override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+        overrides.enable()
+        try:
+            cache.clear()
+            plan = self._seed(options)
+            plan_path = os.path.join(directory, 'plan.json')
+            with open(plan_path, 'w', encoding='utf-8') as fh:
+                json.dump(plan, fh)
+            # Les processus de mesure ouvrent la base eux-mêmes
+            connections.close_all()
+            results = {}
+            for mode in options['modes']:
+                self.stdout.write(f"  {mode}…")
+                results[mode] = self._run_mode(mode, path, plan_path, options)
+        finally:
+            overrides.disable()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(directory, ignore_errors=True)
+
+        report = {'meta': self._meta(options, len(plan)), 'modes': results}
+        with open(options['output'], 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+        self._print(results)
+        self.stdout.write(self.style.SUCCESS(f"Rapport écrit dans {options['output']}"))
+
+    # --- Données et requêtes ---
+
+    def _seed(self, options):
+        """Catalogue, visiteurs et liste mélangée des requêtes (chemin, paramètres, cookies)."""
+        rng = random.Random(options['seed'])
+        visitors = options['visitors']
+        generator = CatalogGenerator(rng, prefix='bench')
+        generator.generate(products=options['products'], sellers=BENCH_SELLERS, buyers=visitors // 3,
+                           carts=visitors // 3, orders=0)
+        product_ids = [pk for pk, _ in generator.products]
+        category = generator.categories[0][0]
+        second_page = keyset_page(Product.objects.filter(is_active=True), DEFAULT_SORT,
+                                  per_page=SHOP_PER_PAGE).next_cursor
+
+        buyers = User.objects.in_bulk(generator.buyers)
+        cookies = []
+        for i in range(visitors):
+            client = Client()
+            if i % 3 == 1:
+                for pk in rng.sample(product_ids, GUEST_CART_LINES):
+                    client.get(reverse('add_to_cart', args=[pk]))
+            elif i % 3 == 2:
+                client.force_login(buyers[generator.buyers[i // 3]])
+            # Session et panier seulement : pas le cookie des messages, lus une fois
+            cookies.append('; '.join(f'{name}={morsel.value}' for name, morsel in client.cookies.items()
+                                     if name in (settings.SESSION_COOKIE_NAME, CART_COOKIE_NAME)))
+
+        pages = [
+            (reverse('index'), ''),
+            (reverse('shop'), ''),
+            (reverse('shop'), f'category={category.pk}'),
+            (reverse('shop'), 'sort=price_asc'),
+            (reverse('shop'), f'cursor={second_page}'),
+            (reverse('cart'), ''),
+        ]
+        plan = [[path, query, cookie] for cookie in cookies for path, query in pages]
+        rng.shuffle(plan)
+        self.stdout.write(f"Données : {options['products']} produits, {visitors} visiteurs, "
+                          f"{len(pages)} pages.")
+        return plan
+
+    def _run_mode(self, mode, path, plan_path, options):
+        interface, async_views = MODES[mode]
+        command = [sys.executable, '-m', 'django', 'benchmark_asgi', '--serve', mode,
+                   '--database', path, '--plan', plan_path,
+                   '--concurrency', str(options['concurrency']), '--requests', str(options['requests']),
+                   '--threads', str(options['threads'])]
+        # DJANGO_SETTINGS_MODULE hérité (posé par manage.py ou --settings)
+        env = {**os.environ, 'ASYNC_VIEWS': async_views}
+        process = subprocess.run(command, env=env, cwd=settings.BASE_DIR, capture_output=True, text=True)
+        if process.returncode != 0:
+            raise CommandError(f"Mesure {mode} en échec :\n{process.stderr[-2000:]}")
+        result = json.loads(process.stdout.strip().splitlines()[-1])
+        result['interface'] = interface
+        result['async_views'] = async_views == '1'
+        return result
+
+    # --- Processus de mesure ---
+
+    def _serve(self, options):
+        connections['default'].settings_dict['NAME'] = options['database']
+        with open(options['plan'], encoding='utf-8') as fh:
+            plan = json.load(fh)
+        interface, _ = MODES[options['serve']]
+        with override_settings(DEBUG=False, QUERY_INSTRUMENTATION=False):
+            if interface == 'wsgi':
+                handler = WSGIHandler()
+                pool = ThreadPoolExecutor(options['threads'])
+
+                async def call(request):
+                    return await asyncio.get_running_loop().run_in_executor(pool, _wsgi_request, handler, request)
+            else:
+                handler = ASGIHandler()
+
+                async def call(request):
+                    return await _asgi_request(handler, request)
+            result = asyncio.run(_load(call, plan, options['concurrency'], options['requests']))
+        self.stdout.write(json.dumps(result))
+
+    # --- Rapport ---
+
+    def _meta(self, options, plan_size):
+        return {
+            'created_at': timezone.now().isoformat(),
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'threads': options['threads'],
+            'products': options['products'],
+            'visitors': options['visitors'],
+            'distinct_requests': plan_size,
+            'seed': options['seed'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        }
+
+    def _print(self, results):
+        self.stdout.write(f"{'mode':<12}{'req/s':>10}{'p50 (ms)':>10}{'p90':>10}{'p99':>10}{'erreurs':>10}")
+        for mode, result in results.items():
+            self.stdout.write(f"{mode:<12}{result['requests_per_s']:>10.0f}{result['p50_ms']:>10.1f}"
+                              f"{result['p90_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['errors']:>10}")
+
+
+async def _load(call, plan, concurrency, total):
+    """`concurrency` clients enchaînent les requêtes du plan jusqu'à `total` ; débit et latences."""
+    # Chauffe : caches, fragments, manifeste des statiques, chaque requête une fois
+    for request in plan:
+        await call(request)
+
+    latencies, errors = [], []
+    numbers = itertools.count()
+
+    async def client():
+        while (number := next(numbers)) < total:
+            start = time.perf_counter()
+            status = await call(plan[number % len(plan)])
+            latencies.append((time.perf_counter() - start) * 1000)
+            if status >= 400:
+                errors.append(status)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p90_ms': round(percentile(latencies, 90), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'errors': len(errors),
+    }
+
+
+def _wsgi_request(handler, request):
+    path, query, cookie = request
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': HOST, 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'REMOTE_ADDR': '127.0.0.1',
+        'HTTP_HOST': HOST, 'HTTP_COOKIE': cookie,
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    statuses = []
+    response = handler(environ, lambda status, headers, exc_info=None: statuses.append(int(status.split()[0])))
+    try:
+        for _ in response:
+            pass
+    finally:
+        # request_finished : connexions fermées comme par un vrai serveur
+        response.close()
+    return statuses[0]
+
+
+async def _asgi_request(application, request):
+    path, query, cookie = request
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0), 'server': (HOST, 80),
+    }
+    received = asyncio.Event()
+    statuses = []
+
+    async def receive():
+        if not received.is_set():
+            received.set()
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # Le client ne se déconnecte pas : Django annule cette attente après la réponse
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await application(scope, receive, send)
+    return statuses[0]
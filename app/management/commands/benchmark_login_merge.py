@@ -0,0 +1,79 @@
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from app.guest_cart import (CART_COOKIE_NAME, SESSION_CART_KEY, SESSION_PRICES_KEY, CookieStorage, GuestCart,
+                            encode_cookie, get_storage)
+from app.models import CartItem, Product
+from app.synthetic import CatalogGenerator
+
+BENCH_USERNAME = 'bench-login'
+BENCH_PASSWORD = 'bench-login-password'
+
+
+class Command(BaseCommand):
+    help = ("Mesure la latence de login_view avec fusion d'un panier invité de N lignes, "
+            "dans une base SQLite jetable.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lines', type=int, default=50, help="Lignes du panier invité (défaut : %(default)s)")
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Le banc d'essai crée une base SQLite jetable : moteur SQLite requis.")
+        # Base de test dans un fichier temporaire : un essai interrompu ne
+        # laisse ni utilisateur ni produit en production
+        directory = tempfile.mkdtemp(prefix='benchmark-login-')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(directory, 'login.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            timings, queries, lines = self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(directory, ignore_errors=True)
+
+        timings.sort()
+        p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+        self.stdout.write(
+            f"login + fusion de {lines} lignes : "
+            f"médiane {statistics.median(timings):.1f} ms, p95 {p95:.1f} ms, "
+            f"{statistics.median(queries):.0f} requêtes SQL"
+        )
+
+    def _run(self, options):
+        CatalogGenerator(random.Random(options['seed']), prefix='bench').generate(
+            products=options['lines'], sellers=1, buyers=0, carts=0, orders=0)
+        user = User.objects.create_user(BENCH_USERNAME, password=BENCH_PASSWORD)
+        products = list(Product.objects.filter(is_active=True)[:options['lines']])
+        timings, queries = [], []
+        for _ in range(options['repeat']):
+            client = Client()
+            cart = GuestCart({str(p.pk): 2 for p in products}, {str(p.pk): str(p.price) for p in products})
+            if isinstance(get_storage(), CookieStorage):
+                client.cookies[CART_COOKIE_NAME] = encode_cookie(cart)
+            else:
+                session = client.session
+                session[SESSION_CART_KEY] = cart.items
+                session[SESSION_PRICES_KEY] = cart.prices
+                session.save()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = client.post('/login/', {'username': BENCH_USERNAME, 'password': BENCH_PASSWORD})
+                timings.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 302:
+                raise CommandError(f"Réponse {response.status_code} inattendue à la connexion.")
+            queries.append(len(captured.captured_queries))
+            # Panier en base vidé : chaque itération mesure une fusion complète
+            CartItem.objects.filter(user=user).delete()
+        return timings, queries, len(products)
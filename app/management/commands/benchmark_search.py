@@ -0,0 +1,107 @@
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Q
+
+from app.models import Category, Product
+from app.search import search_products
+
+BENCH_SELLER = 'bench-search'
+CATEGORIES = ['Mobilier', 'Mode', 'Informatique', 'Cuisine']
+
+NOUNS = ['chaise', 'table', 'armoire', 'canapé', 'lampe', 'robe', 'chemise', 'sac', 'chaussure',
+         'ordinateur', 'souris', 'clavier', 'écran', 'cafetière']
+ADJECTIVES = ['électrique', 'bois', 'métal', 'rouge', 'noir', 'blanc', 'élégant', 'moderne',
+              'vintage', 'léger', 'solide', 'pliable']
+SYLLABLES = ['ba', 'lo', 'ri', 'ta', 'mé', 'nu', 'so', 'ké', 'fa', 'di', 'po', 'zé']
+QUERIES = ['chaise', 'electrique', 'canape bois', 'ordi', 'robe rouge', 'cafetiere electrique', 'balori']
+
+
+class Command(BaseCommand):
+    help = ("Compare la recherche FTS5 à icontains sur un catalogue synthétique, "
+            "dans une base SQLite jetable.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--keep-db', action='store_true',
+                            help="Conserver la base jetable (son chemin est affiché)")
+
+    def handle(self, *args, **options):
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            raise CommandError("Le banc d'essai crée une base SQLite jetable : moteur SQLite requis.")
+        # Base de test dans un fichier temporaire, créée et migrée comme par
+        # le test runner (triggers FTS5 compris) : rien n'est écrit en production
+        directory = tempfile.mkdtemp(prefix='benchmark-search-')
+        path = os.path.join(directory, 'search.sqlite3')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = path
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            seller = User.objects.create(username=BENCH_SELLER)
+            self._seed(seller, options['products'])
+            base = Product.objects.filter(is_active=True, seller=seller)
+            self.stdout.write(f"{'requête':<24}{'icontains (ms)':>16}{'résultats':>11}{'fts5 (ms)':>12}{'résultats':>11}")
+            for text in QUERIES:
+                like_ms, like_count = self._measure(lambda: self._icontains(base, text), options['repeat'])
+                fts_ms, fts_count = self._measure(
+                    lambda: search_products(base, text).order_by('-created_at'), options['repeat'])
+                self.stdout.write(f"{text:<24}{like_ms:>16.2f}{like_count:>11}{fts_ms:>12.2f}{fts_count:>11}")
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keep_db'])
+            if options['keep_db']:
+                self.stdout.write(f"Base conservée : {path}")
+            else:
+                shutil.rmtree(directory, ignore_errors=True)
+
+    def _seed(self, seller, total):
+        categories = Category.objects.bulk_create([
+            Category(name=name, slug=name.lower()) for name in CATEGORIES])
+        rng = random.Random(42)
+        # Vocabulaire de description large (pseudo-mots) : des requêtes
+        # sélectives comme sur un vrai catalogue, pas 26 mots partout.
+        vocabulary = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+        batch = []
+        for _ in range(total):
+            batch.append(Product(
+                seller=seller,
+                category=rng.choice(categories),
+                name=f"{rng.choice(NOUNS).capitalize()} {rng.choice(ADJECTIVES)} {rng.choice(vocabulary)}",
+                description=' '.join(rng.choices(vocabulary, k=15) + rng.sample(ADJECTIVES, 2)),
+                price=rng.randint(500, 500_000),
+            ))
+            if len(batch) == 5000:
+                with transaction.atomic():
+                    Product.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            with transaction.atomic():
+                Product.objects.bulk_create(batch)
+        self.stdout.write(f"{total} produits synthétiques prêts.")
+
+    @staticmethod
+    def _icontains(base, text):
+        qs = base
+        for word in text.split():
+            qs = qs.filter(Q(name__icontains=word) | Q(description__icontains=word))
+        return qs.order_by('-created_at')
+
+    @staticmethod
+    def _measure(build, repeat):
+        """Médiane (ms) de : première page de 20 résultats + total."""
+        timings = []
+        count = 0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            qs = build()
+            list(qs[:20])
+            count = qs.count()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings), count
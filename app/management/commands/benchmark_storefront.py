@@ -0,0 +1,306 @@
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import uuid
+
+import django
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app.cart import refresh_user_summary
+from app.instrumentation import record
+from app.models import CartItem, Product
+from app.pagination import DEFAULT_SORT, SEARCH_SORT, SHOP_SORTS, keyset_page
+from app.synthetic import PASSWORD, CatalogGenerator
+from app.views import SHOP_PER_PAGE
+
+BENCH_SELLERS = 10
+CART_LINES = 10
+DEEP_PAGE = 50
+WARMUP = 3
+
+SEARCH_TEXT = 'chaise bois'
+
+# Au-delà de ces écarts par rapport au rapport de référence (--compare),
+# un scénario est signalé comme régression
+P50_REGRESSION_RATIO = 1.25
+# Paramètres qui doivent être identiques pour que deux rapports se comparent
+COMPARABLE_META = ('seed', 'products', 'users', 'orders', 'iterations', 'cold_cache')
+
+
+def percentile(values, pct):
+    """Percentile par rang le plus proche (valeurs déjà triées)."""
+    if not values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(values) + 0.5)) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = ("Mesure latences (percentiles) et nombre de requêtes SQL des pages clés de la boutique "
+            "sur une base SQLite jetable, et écrit un rapport JSON comparable d'un commit à l'autre.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--orders', type=int, default=2000)
+        parser.add_argument('--iterations', type=int, default=30,
+                            help="Mesures par scénario, après %d requêtes de chauffe" % WARMUP)
+        parser.add_argument('--seed', type=int, default=42)
+        # Cache froid par défaut : sur cache chaud, les pages de la boutique
+        # sont servies depuis les fragments et le nombre de requêtes SQL
+        # mesuré (0) ne dit rien des requêtes de la vue
+        parser.add_argument('--cold-cache', dest='cold_cache', action='store_true', default=True,
+                            help="Vider le cache avant chaque requête mesurée (défaut)")
+        parser.add_argument('--warm-cache', dest='cold_cache', action='store_false',
+                            help="Garder le cache entre les requêtes : latences d'un serveur chaud, "
+                                 "sans nombre de requêtes significatif pour la boutique")
+        parser.add_argument('--output', default='benchmark_report.json',
+                            help="Fichier du rapport JSON (défaut : %(default)s)")
+        parser.add_argument('--compare', help="Rapport de référence, obtenu avec les mêmes paramètres : "
+                                              "affiche les écarts et régressions")
+        parser.add_argument('--keep-db', action='store_true',
+                            help="Conserver la base jetable (son chemin est affiché)")
+
+    def handle(self, *args, **options):
+        connection = connections['default']
+        if connection.vendor != 'sqlite':
+            raise CommandError("Le banc d'essai crée une base SQLite jetable : moteur SQLite requis.")
+        reference = None
+        if options['compare']:
+            # Vérifié avant la mesure : deux rapports aux paramètres différents ne se comparent pas
+            with open(options['compare'], encoding='utf-8') as fh:
+                reference = json.load(fh)
+            self._check_comparable(reference, self._meta(options))
+
+        # Base de test dans un fichier temporaire (pas en mémoire : plus
+        # proche du serveur réel), créée et migrée comme par le test runner
+        directory = tempfile.mkdtemp(prefix='benchmark-')
+        path = os.path.join(directory, 'storefront.sqlite3')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = path
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        # Hachage rapide : on mesure les vues, pas PBKDF2 ; DEBUG coupé comme sous le test runner
+        overrides = override_settings(
+            DEBUG=False,
+            QUERY_INSTRUMENTATION=False,
+            PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+        )
+        overrides.enable()
+        try:
+            cache.clear()
+            self.rng = random.Random(options['seed'])
+            self.iterations = options['iterations']
+            self.cold_cache = options['cold_cache']
+            self._seed(options['products'], options['users'], options['orders'])
+            scenarios = self._run_scenarios()
+        finally:
+            overrides.disable()
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keep_db'])
+            if options['keep_db']:
+                self.stdout.write(f"Base conservée : {path}")
+            else:
+                shutil.rmtree(directory, ignore_errors=True)
+
+        report = {'meta': self._meta(options), 'scenarios': scenarios}
+        with open(options['output'], 'w', encoding='utf-8') as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+        self._print(scenarios)
+        self.stdout.write(self.style.SUCCESS(f"Rapport écrit dans {options['output']}"))
+
+        if reference is not None:
+            self._compare(reference, report)
+
+    # --- Données ---
+
+    def _seed(self, total_products, total_users, total_orders):
+        generator = CatalogGenerator(self.rng, prefix='bench')
+        generator.generate(products=total_products, sellers=BENCH_SELLERS, buyers=total_users,
+                           carts=0, orders=total_orders)
+        # Stock illimité : les passages de commande mesurés ne sont jamais refusés
+        Product.objects.update(stock=1_000_000)
+
+        users = User.objects.in_bulk(generator.sellers + generator.buyers)
+        self.sellers = [users[pk] for pk in generator.sellers]
+        self.buyers = [users[pk] for pk in generator.buyers]
+        self.categories = [category for category, _ in generator.categories]
+        self.product_ids = [pk for pk, _ in generator.products]
+        self.stdout.write(f"Données : {total_products} produits, {total_users} utilisateurs, "
+                          f"{total_orders} commandes.")
+
+    # --- Mesures ---
+
+    def _measure(self, request, setup=None):
+        """Chauffe puis mesure `request()` ; `setup()` (non mesuré) avant chaque appel."""
+        latencies, queries = [], []
+        status = None
+        for i in range(WARMUP + self.iterations):
+            if setup is not None:
+                setup()
+            if self.cold_cache:
+                cache.clear()
+            with record() as stats:
+                response = request()
+            status = response.status_code
+            if status >= 400:
+                raise CommandError(f"Réponse {status} inattendue pendant la mesure.")
+            if i >= WARMUP:
+                latencies.append(stats.total_time * 1000)
+                queries.append(stats.query_count)
+        latencies.sort()
+        return {
+            'status': status,
+            'iterations': self.iterations,
+            'p50_ms': round(percentile(latencies, 50), 3),
+            'p90_ms': round(percentile(latencies, 90), 3),
+            'p99_ms': round(percentile(latencies, 99), 3),
+            'mean_ms': round(statistics.fmean(latencies), 3),
+            'max_ms': round(latencies[-1], 3),
+            'queries_min': min(queries),
+            'queries_median': statistics.median(queries),
+            'queries_max': max(queries),
+        }
+
+    def _login(self, user):
+        client = Client()
+        client.force_login(user)
+        return client
+
+    def _fill_cart(self, user, count=CART_LINES):
+        CartItem.objects.filter(user=user).delete()
+        CartItem.objects.bulk_create([
+            CartItem(user=user, product_id=pk, quantity=self.rng.randint(1, 3))
+            for pk in self.rng.sample(self.product_ids, count)
+        ])
+        refresh_user_summary(user)
+
+    def _guest_with_cart(self):
+        client = Client()
+        for pk in self.rng.sample(self.product_ids, CART_LINES):
+            client.get(reverse('add_to_cart', args=[pk]))
+        return client
+
+    def _run_scenarios(self):
+        rng = self.rng
+        results = {}
+        shop = reverse('shop')
+        guest = Client()
+
+        def run(name, request, setup=None):
+            self.stdout.write(f"  {name}…")
+            results[name] = self._measure(request, setup)
+
+        # Boutique : chaque tri, filtre de catégorie, recherche, page profonde
+        for sort in SHOP_SORTS:
+            if sort != SEARCH_SORT:
+                run(f'shop[sort={sort}]', lambda sort=sort: guest.get(shop, {'sort': sort}))
+        category = self.categories[0]
+        run('shop[category]', lambda: guest.get(shop, {'category': category.pk}))
+        run('shop[search]', lambda: guest.get(shop, {'q': SEARCH_TEXT, 'sort': SEARCH_SORT}))
+        cursor = None
+        active = Product.objects.filter(is_active=True)
+        for _ in range(DEEP_PAGE - 1):
+            cursor = keyset_page(active, DEFAULT_SORT, cursor, per_page=SHOP_PER_PAGE).next_cursor
+        run(f'shop[page={DEEP_PAGE}]', lambda: guest.get(shop, {'cursor': cursor}))
+
+        # Panier
+        cart_guest = self._guest_with_cart()
+        run('cart[guest]', lambda: cart_guest.get(reverse('cart')))
+        buyer = self.buyers[0]
+        client = self._login(buyer)
+        self._fill_cart(buyer)
+        run('cart[user]', lambda: client.get(reverse('cart')))
+        run('add_to_cart[user]', lambda: client.get(reverse('add_to_cart', args=[rng.choice(self.product_ids)])))
+        item = CartItem.objects.filter(user=buyer).first()
+        run('update_cart_item[user]', lambda: client.post(reverse('update_cart_item', args=[item.pk]),
+                                                          {'quantity': rng.randint(1, 5)}))
+
+        # Connexion avec fusion d'un panier de session (un utilisateur par essai)
+        logins = iter(self.buyers[1:])
+        state = {}
+
+        def prepare_login():
+            state['client'] = self._guest_with_cart()
+            state['user'] = next(logins)
+
+        run('login_view[merge]', lambda: state['client'].post(reverse('login'), {
+            'username': state['user'].username, 'password': PASSWORD}), setup=prepare_login)
+
+        # Passage de commande (panier rempli hors mesure)
+        checkout_buyer = self.buyers[-1]
+        checkout_client = self._login(checkout_buyer)
+        run('checkout_now', lambda: checkout_client.post(reverse('checkout'),
+                                                         {'idempotency_key': uuid.uuid4().hex}),
+            setup=lambda: self._fill_cart(checkout_buyer, 3))
+
+        # Tableau de bord vendeur
+        seller_client = self._login(self.sellers[0])
+        run('vendeur_dashboard', lambda: seller_client.get(reverse('vendeur_dashboard')))
+        return results
+
+    # --- Rapport ---
+
+    def _meta(self, options):
+        try:
+            commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                    text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = ''
+        return {
+            'commit': commit,
+            'created_at': timezone.now().isoformat(),
+            'seed': options['seed'],
+            'products': options['products'],
+            'users': options['users'],
+            'orders': options['orders'],
+            'iterations': options['iterations'],
+            'cold_cache': options['cold_cache'],
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+        }
+
+    def _print(self, scenarios):
+        self.stdout.write(f"{'scénario':<30}{'p50 (ms)':>10}{'p90':>10}{'p99':>10}{'requêtes':>10}")
+        for name, result in scenarios.items():
+            queries = result['queries_median']
+            if result['queries_min'] != result['queries_max']:
+                queries = f"{result['queries_min']}-{result['queries_max']}"
+            self.stdout.write(f"{name:<30}{result['p50_ms']:>10.2f}{result['p90_ms']:>10.2f}"
+                              f"{result['p99_ms']:>10.2f}{queries!s:>10}")
+
+    def _check_comparable(self, reference, meta):
+        differences = [f"{key} = {reference['meta'].get(key)} -> {meta[key]}"
+                       for key in COMPARABLE_META if reference['meta'].get(key) != meta[key]]
+        if differences:
+            raise CommandError("Rapport de référence obtenu avec d'autres paramètres, comparaison impossible : "
+                               + ', '.join(differences) + ".")
+
+    def _compare(self, reference, report):
+        self.stdout.write(f"\nComparaison avec le rapport de référence ({reference['meta'].get('commit') or '?'}) :")
+        regressions = 0
+        for name, result in report['scenarios'].items():
+            before = reference['scenarios'].get(name)
+            if before is None:
+                self.stdout.write(f"  {name:<30} nouveau scénario")
+                continue
+            ratio = result['p50_ms'] / before['p50_ms'] if before['p50_ms'] else 1.0
+            more_queries = result['queries_max'] > before['queries_max']
+            flag = more_queries or ratio > P50_REGRESSION_RATIO
+            regressions += flag
+            line = (f"  {name:<30} p50 x{ratio:.2f}  requêtes {before['queries_max']} -> "
+                    f"{result['queries_max']}")
+            self.stdout.write(self.style.ERROR(line + "  RÉGRESSION") if flag else line)
+        if regressions:
+            raise CommandError(f"{regressions} régression(s) détectée(s).")
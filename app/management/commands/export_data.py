@@ -0,0 +1,68 @@
+import datetime
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from app.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, export_catalog, export_orders
+from app.models import Order
+from app.sellers import day_start
+
+
+class Command(BaseCommand):
+    help = ("Exporte en flux (CSV ou JSONL) les commandes avec leurs articles, ou le catalogue "
+            "d'un vendeur, sans charger tout le résultat en mémoire.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('subject', choices=['orders', 'catalog'])
+        parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--output', default='-', help="Fichier de sortie (défaut : sortie standard)")
+        parser.add_argument('--seller', help="Nom d'utilisateur du vendeur (obligatoire pour catalog)")
+        parser.add_argument('--status', choices=[value for value, _ in Order.STATUS_CHOICES])
+        parser.add_argument('--from', dest='date_from', help="Commandes à partir du AAAA-MM-JJ")
+        parser.add_argument('--to', dest='date_to', help="Commandes jusqu'au AAAA-MM-JJ inclus")
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help="Lignes lues par paquet (défaut : %(default)s)")
+
+    def handle(self, *args, **options):
+        seller = None
+        if options['seller']:
+            try:
+                seller = User.objects.get(username=options['seller'])
+            except User.DoesNotExist:
+                raise CommandError(f"Utilisateur inconnu : {options['seller']}")
+
+        if options['subject'] == 'catalog':
+            if seller is None:
+                raise CommandError("--seller est obligatoire pour exporter un catalogue.")
+            chunks = export_catalog(seller, options['format'], chunk_size=options['chunk_size'])
+        else:
+            date_from = self._date(options['date_from'])
+            date_to = self._date(options['date_to'])
+            chunks = export_orders(
+                options['format'],
+                chunk_size=options['chunk_size'],
+                seller=seller,
+                status=options['status'],
+                start=day_start(date_from) if date_from else None,
+                end=day_start(date_to + datetime.timedelta(days=1)) if date_to else None,
+            )
+
+        if options['output'] == '-':
+            sys.stdout.writelines(chunks)
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as fh:
+            fh.writelines(chunks)
+        self.stderr.write(self.style.SUCCESS(f"Export écrit dans {options['output']}"))
+
+    def _date(self, value):
+        if not value:
+            return None
+        try:
+            day = parse_date(value)
+        except ValueError:
+            day = None
+        if day is None:
+            raise CommandError(f"Date invalide : {value} (AAAA-MM-JJ attendu)")
+        return day
@@ -0,0 +1,51 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.synthetic import BATCH_SIZE, PASSWORD, CatalogGenerator
+
+
+class Command(BaseCommand):
+    help = ("Génère un catalogue synthétique réaliste (catégories, vendeurs, clients, produits, "
+            "paniers, commandes) par lots de bulk_create, avec débit affiché.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10_000)
+        parser.add_argument('--sellers', type=int,
+                            help="Nombre de vendeurs (défaut : un pour 200 produits)")
+        parser.add_argument('--buyers', type=int,
+                            help="Nombre de clients (défaut : un pour 10 produits)")
+        parser.add_argument('--carts', type=int,
+                            help="Clients ayant un panier en cours (défaut : 20 %% des clients)")
+        parser.add_argument('--orders', type=int,
+                            help="Nombre de commandes (défaut : autant que de produits)")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help="Lignes par lot et par transaction (défaut : %(default)s)")
+        parser.add_argument('--seed', type=int, help="Graine pour des données reproductibles")
+        parser.add_argument('--prefix', default='synth', help="Préfixe des noms d'utilisateur générés")
+
+    def handle(self, *args, **options):
+        products = options['products']
+        if products < 1:
+            raise CommandError("--products doit être positif.")
+        sellers = options['sellers'] or max(products // 200, 1)
+        buyers = options['buyers'] or max(products // 10, 1)
+        carts = options['carts'] if options['carts'] is not None else buyers // 5
+        orders = options['orders'] if options['orders'] is not None else products
+
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+        self.stdout.write(f"Graine : {seed} — {products} produits, {sellers} vendeurs, {buyers} clients, "
+                          f"{carts} paniers, {orders} commandes")
+        start = time.perf_counter()
+        generator = CatalogGenerator(random.Random(seed), batch_size=options['batch_size'],
+                                     stdout=self.stdout, prefix=options['prefix'])
+        report = generator.generate(products, sellers, buyers, carts, orders)
+
+        self.stdout.write("")
+        for label, entry in report.items():
+            details = ', '.join(f"{key}={value}" for key, value in entry.items())
+            self.stdout.write(f"  {label:<24}{details}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Catalogue généré en {time.perf_counter() - start:.1f} s "
+            f"(mot de passe des comptes : {PASSWORD!r})."))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from app.images import IMAGE_FIELDS, generate_variants, images_changed
+from app.models import Product
+
+
+class Command(BaseCommand):
+    help = ("Génère les déclinaisons redimensionnées (miniature, carte, détail ; JPEG et WebP) "
+            "des images produit manquantes ou périmées.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help="Revérifier tous les produits (recrée les fichiers disparus)")
+
+    def handle(self, *args, **options):
+        with_image = Q()
+        for field in IMAGE_FIELDS:
+            with_image |= ~Q(**{field: ''}) & Q(**{f'{field}__isnull': False})
+        products = (Product.objects
+                    .filter(with_image | Q(image_variants__isnull=False))
+                    .only('image_variants', *IMAGE_FIELDS)
+                    .order_by('pk'))
+        checked = updated = 0
+        for product in products.iterator(chunk_size=500):
+            if not options['force'] and not images_changed(product):
+                continue
+            checked += 1
+            updated += generate_variants(product.pk, force=options['force'])
+            if checked % 100 == 0:
+                self.stdout.write(f"  {checked} produits traités")
+        self.stdout.write(self.style.SUCCESS(f"{checked} produits traités, {updated} mis à jour."))
@@ -0,0 +1,43 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from app.product_import import IMPORT_BATCH_SIZE, ImportFormatError, detect_format, import_products
+
+
+class Command(BaseCommand):
+    help = ("Importe un fichier CSV ou JSONL dans le catalogue d'un vendeur : crée les produits, "
+            "met à jour ceux dont la référence (sku) existe déjà, signale les lignes invalides.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier .csv, .jsonl ou .ndjson")
+        parser.add_argument('--seller', required=True, help="Nom d'utilisateur du vendeur")
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help="Format du fichier (défaut : d'après l'extension)")
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                            help="Lignes par transaction (défaut : %(default)s)")
+
+    def handle(self, *args, **options):
+        try:
+            seller = User.objects.get(username=options['seller'])
+        except User.DoesNotExist:
+            raise CommandError(f"Utilisateur inconnu : {options['seller']}")
+        fmt = options['format'] or detect_format(options['path'])
+        if fmt is None:
+            raise CommandError("Format non reconnu : précisez --format csv ou --format jsonl.")
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                report = import_products(seller, fileobj, fmt, batch_size=options['batch_size'],
+                                         stdout=self.stdout)
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except ImportFormatError as exc:
+            raise CommandError(f"Import interrompu : {exc}")
+
+        for line, message in report.errors:
+            self.stderr.write(f"ligne {line} : {message}")
+        if report.truncated:
+            self.stderr.write(f"… {report.error_count - len(report.errors)} autre(s) erreur(s) non détaillée(s)")
+        style = self.style.WARNING if report.error_count else self.style.SUCCESS
+        self.stdout.write(style(f"Import terminé : {report.created} créés, {report.updated} mis à jour, "
+                                f"{report.error_count} ligne(s) en erreur."))
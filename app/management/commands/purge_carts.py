@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from app.cart import PURGE_BATCH_SIZE as CART_BATCH_SIZE, free_bytes, purge_abandoned_carts
+from app.checkout import IDEMPOTENCY_TTL, expired_checkout_requests, purge_expired_checkout_requests
+from app.guest_cart import PURGE_BATCH_SIZE, purge_sessions
+
+
+def _mb(size):
+    return f"{size / (1024 * 1024):.1f} Mo"
+
+
+class Command(BaseCommand):
+    help = ("Supprime par lots les sessions expirées, les paniers de visiteurs abandonnés "
+            "(sessions anonymes dont le panier est inactif depuis GUEST_CART_TTL), les paniers "
+            "en base dont le dernier ajout date de plus de CART_ITEM_TTL et les clés d'idempotence "
+            "des commandes expirées.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int,
+                            help=f"Sessions ou paniers par lot (défaut : {PURGE_BATCH_SIZE} sessions, "
+                                 f"{CART_BATCH_SIZE} paniers)")
+        parser.add_argument('--ttl-days', type=float, help="Remplace CART_ITEM_TTL pour les paniers en base")
+        parser.add_argument('--archive', help="Fichier JSONL où écrire les lignes de panier supprimées")
+        parser.add_argument('--vacuum', action='store_true',
+                            help="VACUUM final pour réduire le fichier (verrou exclusif : hors heures d'affluence)")
+        parser.add_argument('--dry-run', action='store_true', help="Compter sans rien supprimer")
+
+    def handle(self, *args, **options):
+        dry_run, batch_size = options['dry_run'], options['batch_size']
+        verb = "à supprimer" if dry_run else "supprimés"
+        start = time.perf_counter()
+        report = purge_sessions(batch_size=batch_size or PURGE_BATCH_SIZE, dry_run=dry_run, stdout=self.stdout)
+        self.stdout.write(
+            f"{report.expired_sessions} sessions expirées et {report.abandoned_carts} paniers de visiteurs "
+            f"abandonnés {verb} ({report.scanned_sessions} sessions inactives examinées) "
+            f"en {time.perf_counter() - start:.1f} s."
+        )
+
+        start = time.perf_counter()
+        ttl = options['ttl_days'] * 24 * 60 * 60 if options['ttl_days'] is not None else None
+        archive = open(options['archive'], 'a', encoding='utf-8') if options['archive'] and not dry_run else None
+        try:
+            carts = purge_abandoned_carts(ttl=ttl, batch_size=batch_size or CART_BATCH_SIZE, archive=archive,
+                                          dry_run=dry_run, stdout=self.stdout)
+        finally:
+            if archive is not None:
+                archive.close()
+        self.stdout.write(f"{carts.carts} paniers en base abandonnés {verb} ({carts.rows} lignes) "
+                          f"en {time.perf_counter() - start:.1f} s.")
+        if archive is not None:
+            self.stdout.write(f"Lignes archivées dans {options['archive']}.")
+        if carts.freed_bytes is not None:
+            self.stdout.write(f"Espace libéré dans la base : {_mb(carts.freed_bytes)} "
+                              f"(réutilisé par SQLite ; --vacuum pour réduire le fichier).")
+
+        keys = expired_checkout_requests().count() if dry_run else purge_expired_checkout_requests()
+        self.stdout.write(f"{keys} clés d'idempotence de commande {verb} "
+                          f"(plus de {IDEMPOTENCY_TTL.total_seconds() / 3600:.0f} h).")
+
+        if options['vacuum'] and not dry_run and connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA page_count')
+                pages = cursor.fetchone()[0]
+                cursor.execute('PRAGMA page_size')
+                page_size = cursor.fetchone()[0]
+                free = free_bytes()
+                cursor.execute('VACUUM')
+            self.stdout.write(f"VACUUM : fichier ramené de {_mb(pages * page_size)} à "
+                              f"{_mb(pages * page_size - free)} environ.")
+        self.stdout.write(self.style.SUCCESS("Purge terminée."))
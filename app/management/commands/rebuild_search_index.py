@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from app.search import REBUILD_BATCH_SIZE, fts_available, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des produits (FTS5), par lots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE,
+                            help="Nombre de produits par transaction (défaut : %(default)s)")
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write(self.style.WARNING("FTS5 indisponible (moteur non SQLite) : rien à faire."))
+            return
+        indexed = rebuild_search_index(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Index de recherche reconstruit : {indexed} produits."))
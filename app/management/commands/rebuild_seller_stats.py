@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from app.sellers import REBUILD_BATCH_SIZE, rebuild_seller_stats
+
+
+class Command(BaseCommand):
+    help = "Recalcule les statistiques matérialisées de tous les vendeurs (SellerStats), par lots."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=REBUILD_BATCH_SIZE,
+                            help="Nombre de vendeurs par transaction (défaut : %(default)s)")
+
+    def handle(self, *args, **options):
+        count = rebuild_seller_stats(batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(f"Statistiques recalculées : {count} vendeurs."))
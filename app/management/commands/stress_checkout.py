@@ -0,0 +1,81 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Sum
+
+from app.checkout import checkout
+from app.models import CartItem, Order, OrderItem, Product
+
+BENCH_PREFIX = 'stress-checkout'
+
+
+class Command(BaseCommand):
+    help = ("Lance des commandes concurrentes sur un produit à stock faible "
+            "et vérifie qu'aucune survente n'a lieu, dans une base SQLite jetable "
+            "(test de non-régression : app.tests.CheckoutStockTests).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=40, help="Commandes parallèles (défaut : %(default)s)")
+        parser.add_argument('--stock', type=int, default=7, help="Stock initial du produit (défaut : %(default)s)")
+        parser.add_argument('--quantity', type=int, default=1, help="Quantité par commande (défaut : %(default)s)")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Le stress test crée une base SQLite jetable : moteur SQLite requis.")
+        # Base de test dans un fichier (une connexion par thread) : un essai
+        # interrompu ne laisse ni utilisateur ni commande en production
+        directory = tempfile.mkdtemp(prefix='stress-checkout-')
+        connection.settings_dict.setdefault('TEST', {})['NAME'] = os.path.join(directory, 'checkout.sqlite3')
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self._run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _run(self, options):
+        buyers, initial_stock, quantity = options['buyers'], options['stock'], options['quantity']
+        seller = User.objects.create_user(f'{BENCH_PREFIX}-seller')
+        product = Product.objects.create(seller=seller, name=f'{BENCH_PREFIX} produit', price=1000,
+                                         stock=initial_stock)
+        users = [User.objects.create_user(f'{BENCH_PREFIX}-{i}') for i in range(buyers)]
+        CartItem.objects.bulk_create([CartItem(user=u, product=product, quantity=quantity) for u in users])
+
+        barrier = threading.Barrier(buyers)
+        outcomes = []
+        errors = []
+
+        def buy(user):
+            try:
+                barrier.wait()
+                outcomes.append(checkout(user).order is not None)
+            except Exception as exc:  # noqa: BLE001 — rapporté ci-dessous
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(u,)) for u in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        product.refresh_from_db()
+        sold = OrderItem.objects.filter(product=product).aggregate(n=Sum('quantity'))['n'] or 0
+        orders = Order.objects.filter(user__in=users).count()
+        expected_orders = min(buyers, initial_stock // quantity)
+        self.stdout.write(
+            f"{buyers} commandes parallèles, stock initial {initial_stock} : "
+            f"{orders} commandes servies, {sold} unités vendues, stock final {product.stock}, "
+            f"{len(errors)} erreur(s)"
+        )
+        if errors:
+            raise CommandError(f"Erreurs pendant les commandes : {errors[:3]!r}")
+        if product.stock < 0 or sold + product.stock != initial_stock or orders != expected_orders:
+            raise CommandError("Survente ou incohérence de stock détectée.")
+        self.stdout.write(self.style.SUCCESS("Aucune survente."))
@@ -0,0 +1,139 @@
+import threading
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from app.cart import add_item
+from app.checkout import checkout
+from app.models import CartItem, Category, Order, Product
+from app.pagination import DEFAULT_SORT, keyset_page
+from app.views import SHOP_PER_PAGE
+
+from .benchmark_storefront import percentile
+
+BENCH_PREFIX = 'stress-sqlite'
+BENCH_PRODUCTS = 10
+# Lectures seules mesurées avant la rafale, pour comparaison
+BASELINE_SECONDS = 1.0
+
+
+class Command(BaseCommand):
+    help = ("Rafales d'écritures concurrentes (ajouts au panier, commandes) pendant des lectures "
+            "du catalogue : vérifie qu'aucune écriture n'échoue sur un verrou et que les lectures "
+            "ne sont pas bloquées par les écritures. À lancer avec SQLITE_TUNED=1 (et sans, pour comparer).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8, help="Écrivains parallèles (défaut : %(default)s)")
+        parser.add_argument('--operations', type=int, default=40,
+                            help="Ajouts au panier par écrivain (défaut : %(default)s)")
+        parser.add_argument('--checkout-every', type=int, default=10,
+                            help="Une commande tous les N ajouts, 0 pour aucune (défaut : %(default)s)")
+        parser.add_argument('--readers', type=int, default=4, help="Lecteurs parallèles (défaut : %(default)s)")
+        parser.add_argument('--max-read-ms', type=float, default=50.0,
+                            help="p95 maximal d'une lecture pendant la rafale (défaut : %(default)s)")
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+        self.stdout.write(f"Moteur {connection.settings_dict['ENGINE']}, journal {journal_mode}, "
+                          f"transactions {connection.transaction_mode or 'DEFERRED'}")
+
+        seller = User.objects.create_user(f'{BENCH_PREFIX}-seller')
+        category = Category.objects.first()
+        products = [Product.objects.create(seller=seller, category=category, name=f'{BENCH_PREFIX} {i}',
+                                           price=1000, stock=10 ** 6)
+                    for i in range(BENCH_PRODUCTS)]
+        users = [User.objects.create_user(f'{BENCH_PREFIX}-{i}') for i in range(options['writers'])]
+        try:
+            baseline, read_errors = self._read_while(options['readers'], products,
+                                                     lambda: time.sleep(BASELINE_SECONDS))
+            writes, write_errors = [], []
+            elapsed = []
+
+            def burst():
+                start = time.perf_counter()
+                self._write(users, products, options, writes, write_errors)
+                elapsed.append(time.perf_counter() - start)
+
+            during, burst_read_errors = self._read_while(options['readers'], products, burst)
+            read_errors += burst_read_errors
+
+            expected = options['writers'] * options['operations']
+            self.stdout.write(f"Écritures : {len(writes)}/{expected} ajouts en {elapsed[0]:.2f} s "
+                              f"({len(writes) / elapsed[0]:.0f}/s), {len(write_errors)} erreur(s)")
+            self._print_reads("Lectures seules", baseline)
+            self._print_reads("Lectures pendant la rafale", during)
+
+            if write_errors:
+                raise CommandError(f"Écritures en échec : {write_errors[:3]!r}")
+            if read_errors:
+                raise CommandError(f"Lectures en échec : {read_errors[:3]!r}")
+            if percentile(during, 95) > options['max_read_ms']:
+                raise CommandError(f"Lectures bloquées par les écritures : p95 {percentile(during, 95):.1f} ms "
+                                   f"> {options['max_read_ms']} ms.")
+            self.stdout.write(self.style.SUCCESS("Aucun verrou en échec, lectures non bloquées."))
+        finally:
+            Order.objects.filter(user__in=users).delete()
+            Product.objects.filter(pk__in=[product.pk for product in products]).delete()
+            User.objects.filter(username__startswith=BENCH_PREFIX).delete()
+
+    def _read_while(self, readers, products, action):
+        """Lectures du catalogue en boucle pendant `action()` ; latences triées (ms) et erreurs."""
+        stop = threading.Event()
+        latencies, errors = [], []
+        product_ids = [product.pk for product in products]
+
+        def read():
+            try:
+                while not stop.is_set():
+                    start = time.perf_counter()
+                    # Grille de la boutique, et une table en cours d'écriture
+                    list(keyset_page(Product.objects.filter(is_active=True), DEFAULT_SORT, '',
+                                     per_page=SHOP_PER_PAGE))
+                    CartItem.objects.filter(product_id__in=product_ids).count()
+                    latencies.append((time.perf_counter() - start) * 1000)
+            except Exception as exc:  # noqa: BLE001 — rapporté par handle
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=read) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        try:
+            action()
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        return sorted(latencies), errors
+
+    def _write(self, users, products, options, writes, errors):
+        barrier = threading.Barrier(len(users))
+        operations, checkout_every = options['operations'], options['checkout_every']
+
+        def write(user):
+            try:
+                barrier.wait()
+                for i in range(operations):
+                    add_item(user, products[i % len(products)])
+                    writes.append(1)
+                    if checkout_every and (i + 1) % checkout_every == 0:
+                        checkout(user)
+            except Exception as exc:  # noqa: BLE001 — rapporté par handle
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=write, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def _print_reads(self, label, latencies):
+        self.stdout.write(f"{label} : {len(latencies)} lectures, médiane {percentile(latencies, 50):.1f} ms, "
+                          f"p95 {percentile(latencies, 95):.1f} ms, max {percentile(latencies, 100):.1f} ms")
@@ -0,0 +1,96 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Table FTS5 autonome (elle stocke aussi le nom de catégorie, absent de
+# app_product). `remove_diacritics 2` : « eléctrique » trouve « électrique ».
+# Le rang par défaut est bm25 pondéré : nom > catégorie > description.
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS app_product_fts USING fts5(
+        name, description, category,
+        tokenize = "unicode61 remove_diacritics 2"
+    )
+    """,
+    "INSERT INTO app_product_fts(app_product_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')",
+    # Maintenance incrémentale par triggers : couvre save(), delete(),
+    # bulk_create(), update() et le SET_NULL des catégories supprimées.
+    """
+    CREATE TRIGGER IF NOT EXISTS app_product_fts_ai AFTER INSERT ON app_product BEGIN
+        INSERT INTO app_product_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description,
+                COALESCE((SELECT name FROM app_category WHERE id = new.category_id), ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS app_product_fts_ad AFTER DELETE ON app_product BEGIN
+        DELETE FROM app_product_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS app_product_fts_au
+    AFTER UPDATE OF name, description, category_id ON app_product BEGIN
+        DELETE FROM app_product_fts WHERE rowid = old.id;
+        INSERT INTO app_product_fts(rowid, name, description, category)
+        VALUES (new.id, new.name, new.description,
+                COALESCE((SELECT name FROM app_category WHERE id = new.category_id), ''));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS app_category_fts_au AFTER UPDATE OF name ON app_category BEGIN
+        UPDATE app_product_fts SET category = new.name
+        WHERE rowid IN (SELECT id FROM app_product WHERE category_id = new.id);
+    END
+    """,
+    """
+    INSERT INTO app_product_fts(rowid, name, description, category)
+    SELECT p.id, p.name, p.description, COALESCE(c.name, '')
+    FROM app_product p LEFT JOIN app_category c ON c.id = p.category_id
+    """,
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS app_category_fts_au",
+    "DROP TRIGGER IF EXISTS app_product_fts_au",
+    "DROP TRIGGER IF EXISTS app_product_fts_ad",
+    "DROP TRIGGER IF EXISTS app_product_fts_ai",
+    "DROP TABLE IF EXISTS app_product_fts",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 n'existe que sous SQLite ; ailleurs app.search retombe sur icontains
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSearchEntry',
+            fields=[
+                ('product', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_entry', serialize=False, to='app.product')),
+                ('name', models.TextField()),
+                ('description', models.TextField()),
+                ('category', models.TextField()),
+                ('document', models.TextField(db_column='app_product_fts')),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'app_product_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(_run(CREATE_SQL), _run(DROP_SQL)),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_product_search_index'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CartSummary',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='cart_summary', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Utilisateur')),
+                ('item_count', models.PositiveIntegerField(default=0, verbose_name="Nombre d'articles")),
+                ('total_quantity', models.PositiveIntegerField(default=0, verbose_name='Quantité totale')),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Sous-total')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière modification')),
+            ],
+            options={
+                'verbose_name': 'Résumé du panier',
+                'verbose_name_plural': 'Résumés des paniers',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:45
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    """Fusionne les doublons (user, product) existants avant la contrainte."""
+    CartItem = apps.get_model('app', 'CartItem')
+    duplicates = (CartItem.objects
+                  .values('user_id', 'product_id')
+                  .annotate(n=Count('id'), total=Sum('quantity'), first_id=models.Min('id'))
+                  .filter(n__gt=1))
+    for dup in duplicates:
+        CartItem.objects.filter(pk=dup['first_id']).update(quantity=dup['total'])
+        (CartItem.objects
+         .filter(user_id=dup['user_id'], product_id=dup['product_id'])
+         .exclude(pk=dup['first_id'])
+         .delete())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_cart_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('user', 'product'), name='unique_cart_item_per_user_product'),
+        ),
+    ]
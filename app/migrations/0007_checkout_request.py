@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_cartitem_unique_user_product'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CheckoutRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, verbose_name="Clé d'idempotence")),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Reçue le')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.order', verbose_name='Commande')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Client')),
+            ],
+            options={
+                'verbose_name': 'Requête de commande',
+                'verbose_name_plural': 'Requêtes de commande',
+                'indexes': [models.Index(fields=['created_at'], name='app_checkou_created_e040ab_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'key'), name='unique_checkout_key_per_user')],
+            },
+        ),
+    ]
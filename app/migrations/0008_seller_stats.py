@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_checkout_request'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerStats',
+            fields=[
+                ('seller', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='seller_stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Vendeur')),
+                ('product_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de produits')),
+                ('order_count', models.PositiveIntegerField(default=0, verbose_name='Nombre de commandes')),
+                ('units_sold', models.PositiveIntegerField(default=0, verbose_name='Unités vendues')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name="Chiffre d'affaires")),
+                ('last_order_at', models.DateTimeField(blank=True, null=True, verbose_name='Dernière commande')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Dernière modification')),
+            ],
+            options={
+                'verbose_name': 'Statistiques vendeur',
+                'verbose_name_plural': 'Statistiques vendeurs',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:08
+
+import importlib
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Sous SQLite, AddField reconstruit app_product (copie puis renommage), ce
+# qui supprime ses triggers FTS et casse celui de app_category : on les
+# retire le temps de la reconstruction, puis on les recrée. La table FTS et
+# ses lignes (rowid = id du produit, conservé par la copie) restent en place.
+search_index = importlib.import_module('app.migrations.0004_product_search_index')
+TRIGGERS_SQL = [sql for sql in search_index.CREATE_SQL if 'CREATE TRIGGER' in sql]
+DROP_TRIGGERS_SQL = [sql for sql in search_index.DROP_SQL if 'DROP TRIGGER' in sql]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_order_history_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(search_index._run(DROP_TRIGGERS_SQL), search_index._run(TRIGGERS_SQL)),
+        migrations.AddField(
+            model_name='product',
+            name='sku',
+            field=models.CharField(blank=True, max_length=64, verbose_name='Référence (SKU)'),
+        ),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(condition=models.Q(('sku', ''), _negated=True), fields=('seller', 'sku'), name='unique_product_sku_per_seller'),
+        ),
+        migrations.RunPython(search_index._run(TRIGGERS_SQL), search_index._run(DROP_TRIGGERS_SQL)),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_product_sku'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_variants',
+            field=models.JSONField(blank=True, editable=False, null=True, verbose_name='Déclinaisons des images'),
+        ),
+    ]
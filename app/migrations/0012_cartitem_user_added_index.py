@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_product_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cartitem',
+            index=models.Index(fields=['user', 'added_at'], name='cartitem_user_added_idx'),
+        ),
+    ]
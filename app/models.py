@@ -70,6 +70,8 @@ class Product(models.Model):
     seller = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Vendeur")
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Catégorie")
     name = models.CharField(max_length=255, verbose_name="Nom du produit")
+    # Référence propre au vendeur : clé des imports en masse (app.product_import)
+    sku = models.CharField(max_length=64, blank=True, verbose_name="Référence (SKU)")
     description = models.TextField(blank=True, verbose_name="Description")
     price = models.DecimalField(max_digits=10, decimal_places=2, verbose_name="Prix")
     old_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, verbose_name="Ancien prix")
@@ -77,6 +79,8 @@ class Product(models.Model):
     image = models.ImageField(upload_to='products/', blank=True, null=True, verbose_name="Image principale")
     image2 = models.ImageField(upload_to='products/', blank=True, null=True, verbose_name="Image 2")
     image3 = models.ImageField(upload_to='products/', blank=True, null=True, verbose_name="Image 3")
+    # Déclinaisons redimensionnées des images (app.images), générées après l'envoi
+    image_variants = models.JSONField(null=True, blank=True, editable=False, verbose_name="Déclinaisons des images")
     badge = models.CharField(max_length=20, choices=BADGE_CHOICES, blank=True, verbose_name="Badge")
     rating = models.DecimalField(max_digits=3, decimal_places=1, default=0.0, verbose_name="Note")
     stock = models.PositiveIntegerField(default=0, verbose_name="Stock disponible")
@@ -92,11 +96,47 @@ class Product(models.Model):
         verbose_name = "Produit"
         verbose_name_plural = "Produits"
         ordering = ['-created_at']
+        # Un index partiel (produits actifs) par tri de la boutique, avec et
+        # sans catégorie : chaque page paginée par curseur est un parcours
+        # d'index par intervalle, sans tri temporaire (SQLite les lit aussi
+        # à l'envers pour les tris décroissants).
         indexes = [
-            models.Index(fields=['is_active', 'created_at']),
-            models.Index(fields=['category', 'is_active']),
+            models.Index(fields=['created_at', 'id'], condition=models.Q(is_active=True), name='product_active_created_idx'),
+            models.Index(fields=['price', 'id'], condition=models.Q(is_active=True), name='product_active_price_idx'),
+            models.Index(fields=['name', 'id'], condition=models.Q(is_active=True), name='product_active_name_idx'),
+            models.Index(fields=['rating', 'id'], condition=models.Q(is_active=True), name='product_active_rating_idx'),
+            models.Index(fields=['category', 'created_at', 'id'], condition=models.Q(is_active=True), name='product_cat_created_idx'),
+            models.Index(fields=['category', 'price', 'id'], condition=models.Q(is_active=True), name='product_cat_price_idx'),
+            models.Index(fields=['category', 'name', 'id'], condition=models.Q(is_active=True), name='product_cat_name_idx'),
+            models.Index(fields=['category', 'rating', 'id'], condition=models.Q(is_active=True), name='product_cat_rating_idx'),
             models.Index(fields=['created_at']),
         ]
+        constraints = [
+            models.UniqueConstraint(fields=['seller', 'sku'], condition=~models.Q(sku=''),
+                                    name='unique_product_sku_per_seller'),
+        ]
+
+
+# --- Index de recherche plein texte (table virtuelle FTS5, SQLite) ---
+class ProductSearchEntry(models.Model):
+    """
+    Ligne de la table FTS5 `app_product_fts` (rowid = id du produit).
+
+    La table est créée et tenue à jour par des triggers SQL (migration
+    0004), y compris pour les bulk_create/update : jamais écrite par Django.
+    """
+    product = models.OneToOneField(Product, on_delete=models.DO_NOTHING, primary_key=True,
+                                   db_column='rowid', related_name='search_entry')
+    name = models.TextField()
+    description = models.TextField()
+    category = models.TextField()
+    # Colonnes cachées de FTS5 : cible de MATCH et score bm25 pondéré
+    document = models.TextField(db_column='app_product_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'app_product_fts'
 
 
 # --- Élément du panier ---
@@ -115,6 +155,36 @@ class CartItem(models.Model):
     class Meta:
         verbose_name = "Article du panier"
         verbose_name_plural = "Articles du panier"
+        # Une seule ligne par produit : fusions concurrentes et doubles clics
+        # ne peuvent pas créer de doublons (et l'upsert s'appuie dessus)
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'product'], name='unique_cart_item_per_user_product'),
+        ]
+        indexes = [
+            # Paniers abandonnés : dernier ajout par utilisateur (app.cart.purge_abandoned_carts)
+            models.Index(fields=['user', 'added_at'], name='cartitem_user_added_idx'),
+        ]
+
+
+# --- Résumé dénormalisé du panier ---
+class CartSummary(models.Model):
+    """
+    Totaux du panier d'un utilisateur, recalculés à chaque écriture du
+    panier (voir app.cart) pour que l'en-tête n'interroge jamais CartItem.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                related_name='cart_summary', verbose_name="Utilisateur")
+    item_count = models.PositiveIntegerField(default=0, verbose_name="Nombre d'articles")
+    total_quantity = models.PositiveIntegerField(default=0, verbose_name="Quantité totale")
+    subtotal = models.DecimalField(max_digits=12, decimal_places=2, default=0, verbose_name="Sous-total")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernière modification")
+
+    def __str__(self):
+        return f"{self.user.username} - {self.total_quantity} article(s)"
+
+    class Meta:
+        verbose_name = "Résumé du panier"
+        verbose_name_plural = "Résumés des paniers"
 
 
 # --- Commande ---
@@ -142,6 +212,38 @@ class Order(models.Model):
         verbose_name = "Commande"
         verbose_name_plural = "Commandes"
         ordering = ['-created_at']
+        # Historique des commandes (pagination par curseur sur created_at, id),
+        # éventuellement filtré par statut
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='order_created_idx'),
+            models.Index(fields=['status', 'created_at', 'id'], name='order_status_created_idx'),
+        ]
+
+
+# --- Clé d'idempotence du passage de commande ---
+class CheckoutRequest(models.Model):
+    """
+    Associe une clé d'idempotence (champ de formulaire ou en-tête
+    Idempotency-Key) à la commande qu'elle a créée : une requête rejouée
+    renvoie cette commande sans refaire aucune écriture (voir app.checkout).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Client")
+    key = models.CharField(max_length=100, verbose_name="Clé d'idempotence")
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, verbose_name="Commande")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Reçue le")
+
+    def __str__(self):
+        return f"{self.user.username} - {self.key} -> #{self.order_id}"
+
+    class Meta:
+        verbose_name = "Requête de commande"
+        verbose_name_plural = "Requêtes de commande"
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='unique_checkout_key_per_user'),
+        ]
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
 
 
 # --- Détails de commande ---
@@ -160,3 +262,32 @@ class OrderItem(models.Model):
     class Meta:
         verbose_name = "Article de commande"
         verbose_name_plural = "Articles de commande"
+        # Commandes d'un vendeur : produit -> commande sans lire la table
+        indexes = [
+            models.Index(fields=['product', 'order'], name='orderitem_product_order_idx'),
+        ]
+
+
+# --- Statistiques vendeur matérialisées ---
+class SellerStats(models.Model):
+    """
+    Agrégats d'un vendeur pour son tableau de bord, tenus à jour par
+    app.sellers (passage de commande, changements de statut, produits) au
+    lieu d'être recalculés à chaque affichage. Les commandes annulées ne
+    comptent pas.
+    """
+    seller = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                  related_name='seller_stats', verbose_name="Vendeur")
+    product_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de produits")
+    order_count = models.PositiveIntegerField(default=0, verbose_name="Nombre de commandes")
+    units_sold = models.PositiveIntegerField(default=0, verbose_name="Unités vendues")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Chiffre d'affaires")
+    last_order_at = models.DateTimeField(null=True, blank=True, verbose_name="Dernière commande")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Dernière modification")
+
+    def __str__(self):
+        return f"{self.seller.username} - {self.order_count} commande(s)"
+
+    class Meta:
+        verbose_name = "Statistiques vendeur"
+        verbose_name_plural = "Statistiques vendeurs"
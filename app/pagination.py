@@ -0,0 +1,178 @@
+"""
+Pagination par curseur (keyset) pour la boutique et l'historique des
+commandes vendeur (tri « -created_at », valable pour Product comme Order).
+
+Au lieu de COUNT(*) + OFFSET à chaque requête, une page est obtenue par
+« WHERE (tri, id) après la dernière ligne vue ORDER BY tri, id LIMIT n »,
+servie par un parcours d'index : la page 500 coûte autant que la page 1.
+"""
+import datetime
+from decimal import Decimal
+
+from django.core import signing
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+# Tri demandé -> colonnes (champ, décroissant). `id` départage les ex aequo
+# pour que l'ordre soit total et stable d'une page à l'autre.
+SHOP_SORTS = {
+    '-created_at': (('created_at', True), ('id', True)),
+    'price_asc': (('price', False), ('id', False)),
+    'price_desc': (('price', True), ('id', True)),
+    'name': (('name', False), ('id', False)),
+    'rating': (('rating', True), ('id', True)),
+    # Uniquement avec une recherche (`search_rank` : bm25, voir app.search)
+    'relevance': (('search_rank', False), ('id', False)),
+}
+DEFAULT_SORT = '-created_at'
+SEARCH_SORT = 'relevance'
+
+CURSOR_SALT = 'app.pagination.cursor'
+
+
+def encode_cursor(sort, values, direction, offset):
+    """Construit un jeton opaque et signé (déterministe) désignant une position."""
+    payload = {
+        's': sort,
+        'v': [_serialize(v) for v in values],
+        'd': direction,
+        'o': offset,
+    }
+    return signing.Signer(salt=CURSOR_SALT).sign_object(payload, compress=True)
+
+
+def decode_cursor(token, sort):
+    """Décode un jeton ; None s'il est absent, falsifié ou d'un autre tri."""
+    if not token:
+        return None
+    try:
+        payload = signing.Signer(salt=CURSOR_SALT).unsign_object(token)
+    except signing.BadSignature:
+        return None
+    if not isinstance(payload, dict) or payload.get('s') != sort:
+        return None
+    if payload.get('d') not in ('n', 'p') or len(payload.get('v') or []) != len(SHOP_SORTS[sort]):
+        return None
+    return payload
+
+
+def _serialize(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _seek_filter(ordering, values, backwards):
+    """
+    Condition « strictement après (ou avant) » la ligne de référence.
+
+    Pour (a, id) : a >= va AND (a > va OR (a = va AND id > vid)).
+    La borne sur la première colonne permet à SQLite un parcours d'index
+    par intervalle plutôt qu'un filtrage ligne à ligne.
+    """
+    def op(descending):
+        return 'lt' if descending != backwards else 'gt'
+
+    first_field, first_desc = ordering[0]
+    bound = Q(**{f'{first_field}__{op(first_desc)}e': values[0]})
+
+    seek = Q()
+    equals = {}
+    for (field, descending), value in zip(ordering, values):
+        seek |= Q(**equals, **{f'{field}__{op(descending)}': value})
+        equals[field] = value
+    return bound & seek
+
+
+def _order_by(ordering, backwards):
+    return [('-' if descending != backwards else '') + field for field, descending in ordering]
+
+
+class KeysetPage:
+    """
+    Page de résultats obtenue par curseur.
+
+    Expose la même interface que `django.core.paginator.Page` pour ce que
+    le template utilise (itération, has_next, start_index, ...). La requête
+    n'est exécutée qu'au premier accès : si le template sert la grille
+    depuis le cache de fragments, elle n'est jamais exécutée.
+    """
+
+    def __init__(self, queryset, sort, per_page, state):
+        self.queryset = queryset
+        self.sort = sort
+        self.per_page = per_page
+        self.state = state
+
+    @cached_property
+    def _result(self):
+        """(lignes, offset, has_next, has_previous) — une requête LIMIT per_page + 1."""
+        ordering = SHOP_SORTS[self.sort]
+        state = self.state
+        backwards = state is not None and state['d'] == 'p'
+
+        qs = self.queryset
+        if state is not None:
+            qs = qs.filter(_seek_filter(ordering, state['v'], backwards))
+        rows = list(qs.order_by(*_order_by(ordering, backwards))[:self.per_page + 1])
+        # La ligne en trop indique seulement s'il existe une page suivante (ou précédente)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if backwards:
+            rows.reverse()
+            return rows, state['o'] if has_more else 0, True, has_more
+        return rows, state['o'] if state is not None else 0, has_more, state is not None
+
+    @property
+    def object_list(self):
+        return self._result[0]
+
+    @property
+    def offset(self):
+        return self._result[1]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._result[2]
+
+    def has_previous(self):
+        return self._result[3]
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def start_index(self):
+        return self.offset + 1 if self.object_list else 0
+
+    def end_index(self):
+        return self.offset + len(self.object_list)
+
+    def _values(self, obj):
+        return [getattr(obj, field) for field, _ in SHOP_SORTS[self.sort]]
+
+    @property
+    def next_cursor(self):
+        if not self.has_next():
+            return ''
+        return encode_cursor(self.sort, self._values(self.object_list[-1]), 'n', self.end_index())
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return ''
+        return encode_cursor(self.sort, self._values(self.object_list[0]), 'p', max(self.offset - self.per_page, 0))
+
+
+def keyset_page(queryset, sort, cursor=None, per_page=9):
+    """Renvoie la page (paresseuse) de `queryset` située après (ou avant) `cursor`."""
+    if sort not in SHOP_SORTS:
+        sort = DEFAULT_SORT
+    return KeysetPage(queryset, sort, per_page, decode_cursor(cursor, sort))
@@ -0,0 +1,275 @@
+"""
+Import en masse des produits d'un vendeur (CSV ou JSONL).
+
+Le fichier est lu ligne à ligne (mémoire constante) et traité par lots :
+chaque ligne est validée par ProductImportRowForm (mêmes règles que
+ProductForm), la catégorie est résolue par son slug (une requête par slug
+distinct, pour tout l'import), puis le lot est écrit dans une transaction :
+bulk_create des nouveaux produits, bulk_update de ceux que la ligne
+désigne déjà chez le vendeur. Une ligne invalide est signalée avec son
+numéro et n'interrompt pas l'import.
+
+Colonnes : sku, name, category (slug), description, price, old_price,
+discount_percentage, badge, stock, is_featured, et id (facultative). Une
+ligne désigne un produit existant du vendeur par son id (colonne de
+l'export, app.exports), sinon par sa référence (sku) ; à défaut elle crée
+un produit. Une colonne absente prend la valeur par défaut, y compris
+pour un produit mis à jour (la ligne décrit le produit entier).
+
+bulk_create / bulk_update n'émettent pas de signaux : version du
+catalogue, compteurs par catégorie, résumés de panier et statistiques
+vendeur sont mis à jour ici. L'index plein texte suit par ses triggers.
+"""
+import copy
+import csv
+import io
+import itertools
+import json
+import os
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import cart, catalog, sellers
+from .forms import ProductImportRowForm
+from .models import Category, Product
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+IMPORT_BATCH_SIZE = 500
+# Lignes en erreur détaillées dans le rapport (toutes sont comptées)
+MAX_REPORTED_ERRORS = 200
+
+ROW_FIELDS = ProductImportRowForm._meta.fields
+REQUIRED_COLUMNS = ('name', 'price')
+UPDATE_FIELDS = ROW_FIELDS + ['category', 'updated_at']
+ROW_DEFAULTS = {'discount_percentage': '0', 'stock': '0'}
+FALSE_VALUES = {'', '0', 'false', 'faux', 'no', 'non', 'off'}
+
+
+class ImportFormatError(ValueError):
+    """Fichier illisible (encodage, en-tête, CSV mal formé) : l'import s'arrête."""
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.error_count = 0
+        self.errors = []  # (numéro de ligne, message), au plus MAX_REPORTED_ERRORS
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, message))
+
+    @property
+    def truncated(self):
+        return self.error_count > len(self.errors)
+
+
+def detect_format(filename):
+    """'csv', 'jsonl' ou None d'après l'extension du fichier."""
+    return FORMATS.get(os.path.splitext(filename or '')[1].lower())
+
+
+# --- Lecture ---
+
+def _csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        header = text.readline()
+        # Excel en français exporte avec « ; »
+        delimiter = ';' if header.count(';') > header.count(',') else ','
+        reader = csv.DictReader(itertools.chain([header], text), delimiter=delimiter)
+        columns = {(name or '').strip() for name in reader.fieldnames or ()}
+        missing = [name for name in REQUIRED_COLUMNS if name not in columns]
+        if missing:
+            raise ImportFormatError(f"Colonnes obligatoires absentes : {', '.join(missing)}.")
+        for row in reader:
+            # Valeurs en trop (clé None) ignorées ; cellules manquantes à None
+            yield reader.line_num, {key.strip(): value for key, value in row.items() if key}, ''
+    except UnicodeDecodeError:
+        raise ImportFormatError("Encodage invalide : fichier UTF-8 attendu.")
+    except csv.Error as exc:
+        raise ImportFormatError(f"CSV mal formé : {exc}.")
+    finally:
+        # Rend le fichier à l'appelant au lieu de le fermer avec l'enveloppe
+        text.detach()
+
+
+def _jsonl_rows(fileobj):
+    for number, raw in enumerate(fileobj, 1):
+        if not raw.strip():
+            continue
+        try:
+            row = json.loads(raw)
+        except ValueError:
+            yield number, None, "JSON invalide."
+            continue
+        if not isinstance(row, dict):
+            yield number, None, "Objet JSON attendu."
+            continue
+        yield number, row, ''
+
+
+def iter_rows(fileobj, fmt):
+    """
+    (numéro de ligne, dict des colonnes, erreur) pour chaque ligne du
+    fichier binaire `fileobj`, sans le charger en mémoire.
+    """
+    if fmt == 'csv':
+        return _csv_rows(fileobj)
+    if fmt == 'jsonl':
+        return _jsonl_rows(fileobj)
+    raise ImportFormatError(f"Format inconnu : {fmt}")
+
+
+def _form_data(row):
+    data = dict(ROW_DEFAULTS)
+    for field in ROW_FIELDS:
+        value = row.get(field)
+        if value is None or value == '':
+            continue
+        if isinstance(value, bool):
+            value = 'on' if value else ''
+        data[field] = str(value).strip()
+    if data.get('is_featured', '').lower() in FALSE_VALUES:
+        data.pop('is_featured', None)
+    return data
+
+
+def _form_errors(form):
+    return '; '.join(f"{field} : {' '.join(messages)}" for field, messages in form.errors.items())
+
+
+# --- Écriture ---
+
+class _CategoryLookup:
+    """Slug -> id, une requête par slug distinct (slugs inconnus compris)."""
+
+    def __init__(self):
+        self._ids = {}
+
+    def __call__(self, slug):
+        if slug not in self._ids:
+            self._ids[slug] = Category.objects.filter(slug=slug).values_list('id', flat=True).first()
+        return self._ids[slug]
+
+
+def _row_id(row):
+    try:
+        return int(str(row.get('id') or '').strip())
+    except ValueError:
+        return None
+
+
+def _import_batch(seller, batch, report, categories):
+    skus = {str(row.get('sku') or '').strip() for _, row in batch} - {''}
+    ids = {_row_id(row) for _, row in batch} - {None}
+    existing = {product.pk: product
+                for product in Product.objects.filter(seller=seller).filter(Q(sku__in=skus) | Q(pk__in=ids))}
+    by_sku = {product.sku: product for product in existing.values() if product.sku}
+
+    # Produits à écrire (avec leur ligne), par id (ou par sku / par ligne
+    # pour les nouveaux) : la dernière ligne d'un même produit l'emporte,
+    # comme entre deux lots
+    pending = {}
+    for line, row in batch:
+        slug = str(row.get('category') or '').strip()
+        category_id = categories(slug) if slug else None
+        if slug and category_id is None:
+            report.add_error(line, f"category : catégorie inconnue « {slug} ».")
+            continue
+
+        data = _form_data(row)
+        sku = data.get('sku', '')
+        base = existing.get(_row_id(row)) or by_sku.get(sku)
+        if base is not None:
+            key = ('id', base.pk)
+        else:
+            key = ('sku', sku) if sku else ('line', line)
+        if key in pending:
+            base = pending[key][1]
+        # Copie : un formulaire invalide modifie quand même son instance
+        instance = copy.copy(base) if base is not None else Product(seller=seller)
+        form = ProductImportRowForm(data, instance=instance)
+        if not form.is_valid():
+            report.add_error(line, _form_errors(form))
+            continue
+        product = form.save(commit=False)
+        product.category_id = category_id
+        pending[key] = (line, product)
+
+    now = timezone.now()
+    for _, product in pending.values():
+        if product.pk is not None:
+            product.updated_at = now
+
+    rows = list(pending.values())
+    try:
+        written = _write(seller, [product for _, product in rows], existing, report)
+    except IntegrityError:
+        # Un sku pris entre-temps (autre import, autre produit) : le lot est
+        # réécrit ligne à ligne pour ne rejeter que les lignes en cause
+        written = 0
+        for line, product in rows:
+            try:
+                written += _write(seller, [product], existing, report)
+            except IntegrityError:
+                report.add_error(line, "sku : référence déjà utilisée par un autre produit.")
+    if written:
+        catalog.invalidate_category_counts()
+        catalog.bump_catalog_version()
+
+
+def _write(seller, products, existing, report):
+    """
+    Écrit `products` dans une transaction et met à jour compteurs et résumés
+    de panier ; IntegrityError propagée, rien d'écrit. Renvoie le nombre
+    de produits écrits.
+    """
+    creates = [product for product in products if product.pk is None]
+    updates = [product for product in products if product.pk is not None]
+    repriced = [product.pk for product in updates if product.price != existing[product.pk].price]
+    try:
+        with transaction.atomic():
+            Product.objects.bulk_create(creates)
+            Product.objects.bulk_update(updates, UPDATE_FIELDS)
+            sellers.product_count_changed(seller.pk, len(creates))
+            if repriced:
+                cart.invalidate_product_summaries(*repriced)
+    except IntegrityError:
+        # Écriture annulée : les produits créés redeviennent nouveaux
+        for product in creates:
+            product.pk = None
+            product._state.adding = True
+        raise
+    report.created += len(creates)
+    report.updated += len(updates)
+    return len(products)
+
+
+def import_products(seller, fileobj, fmt, batch_size=IMPORT_BATCH_SIZE, stdout=None):
+    """
+    Importe dans le catalogue de `seller` le fichier binaire `fileobj`
+    ('csv' ou 'jsonl'). Renvoie un ImportReport ; lève ImportFormatError
+    si le fichier est illisible (les lots déjà écrits sont conservés).
+    """
+    report = ImportReport()
+    categories = _CategoryLookup()
+    batch = []
+    for line, row, error in iter_rows(fileobj, fmt):
+        if error:
+            report.add_error(line, error)
+            continue
+        batch.append((line, row))
+        if len(batch) >= batch_size:
+            _import_batch(seller, batch, report, categories)
+            batch = []
+            if stdout is not None:
+                stdout.write(f"  ligne {line} : {report.created} créés, {report.updated} mis à jour, "
+                             f"{report.error_count} en erreur")
+    if batch:
+        _import_batch(seller, batch, report, categories)
+    return report
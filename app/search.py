@@ -0,0 +1,121 @@
+"""
+Recherche plein texte des produits.
+
+Sous SQLite, la recherche passe par la table FTS5 `app_product_fts`
+(voir `ProductSearchEntry`), classée par bm25 et insensible aux accents.
+Sur un autre moteur, on retombe sur des `icontains`.
+"""
+import re
+
+from django.db import connection, transaction
+from django.db.models import BooleanField, F, Func, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_TABLE = 'app_product_fts'
+REBUILD_BATCH_SIZE = 5000
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+class Match(Func):
+    """`<colonne FTS5> MATCH <requête>` utilisable dans un filter()."""
+    arg_joiner = ' MATCH '
+    template = '%(expressions)s'
+    output_field = BooleanField()
+
+
+def fts_available():
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(text):
+    """
+    Transforme la saisie utilisateur en requête FTS5 sûre.
+
+    Chaque mot est mis entre guillemets (aucun opérateur FTS5 ne passe),
+    les mots sont combinés en ET et le dernier est cherché en préfixe
+    pour la recherche au fil de la frappe.
+    """
+    words = _WORD_RE.findall(text or '')
+    if not words:
+        return ''
+    terms = ['"%s"' % w for w in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def search_products(queryset, text, ranked=False):
+    """
+    Restreint `queryset` (de Product) aux produits correspondant à `text`.
+
+    Par défaut, filtre `id IN (SELECT rowid ... MATCH ...)` : la sous-requête
+    FTS5 est évaluée une seule fois, quel que soit le plan choisi (COUNT,
+    tris par index, catégorie). Avec `ranked=True`, la table FTS5 est jointe
+    pour annoter `search_rank` (bm25 pondéré : plus petit = plus pertinent),
+    à réserver au tri par pertinence.
+    """
+    if not fts_available():
+        for word in _WORD_RE.findall(text or ''):
+            queryset = queryset.filter(
+                Q(name__icontains=word) | Q(description__icontains=word) | Q(category__name__icontains=word)
+            )
+        return queryset.annotate(search_rank=Value(0.0)) if ranked else queryset
+
+    match = build_match_query(text)
+    if not match:
+        # Aucun mot cherchable (« - », « !!! ») : vide, mais triable par pertinence
+        queryset = queryset.none()
+        return queryset.annotate(search_rank=Value(0.0)) if ranked else queryset
+    if not ranked:
+        return queryset.filter(pk__in=RawSQL(
+            f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [match]))
+    # Jointure interne obligatoire : MATCH est refusé à droite d'un LEFT JOIN
+    return (queryset
+            .filter(search_entry__isnull=False)
+            .filter(Match(F('search_entry__document'), Value(match)))
+            .annotate(search_rank=F('search_entry__rank')))
+
+
+def rebuild_search_index(batch_size=REBUILD_BATCH_SIZE, stdout=None):
+    """
+    Reconstruit l'index FTS5 par tranches d'ids croissants.
+
+    Chaque tranche est remplacée dans une transaction courte : la recherche
+    reste disponible pendant la reconstruction et les écritures concurrentes
+    ne sont bloquées que le temps d'un lot. Renvoie le nombre de produits indexés.
+    """
+    if not fts_available():
+        return 0
+
+    indexed = 0
+    last_id = 0
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT MAX(id) FROM (SELECT id FROM app_product WHERE id > %s ORDER BY id LIMIT %s)",
+                [last_id, batch_size],
+            )
+            upper = cursor.fetchone()[0]
+            if upper is None:
+                # Fin de table : purge des entrées orphelines au-delà
+                cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid > %s", [last_id])
+                break
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid > %s AND rowid <= %s", [last_id, upper])
+            cursor.execute(
+                f"""
+                INSERT INTO {SEARCH_TABLE}(rowid, name, description, category)
+                SELECT p.id, p.name, p.description, COALESCE(c.name, '')
+                FROM app_product p LEFT JOIN app_category c ON c.id = p.category_id
+                WHERE p.id > %s AND p.id <= %s
+                """,
+                [last_id, upper],
+            )
+            indexed += cursor.rowcount
+        last_id = upper
+        if stdout is not None:
+            stdout.write(f"  {indexed} produits indexés")
+
+    # Fusionne les segments FTS5 créés par les lots successifs
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+    return indexed
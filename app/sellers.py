@@ -0,0 +1,322 @@
+"""
+Statistiques vendeur matérialisées (SellerStats).
+
+- Passage de commande : deltas appliqués par `record_order` (un UPDATE par
+  vendeur présent dans la commande), dans la transaction de la commande.
+- Produits créés/supprimés : `product_count_changed` (voir app.signals).
+- Changements plus rares (annulation, article modifié dans l'admin) :
+  recalcul complet des vendeurs concernés (`refresh_seller_stats`), une
+  seule fois par vendeur en fin de transaction pour les articles
+  (`refresh_seller_stats_on_commit`).
+
+Une ligne absente est calculée à la première lecture (`get_seller_stats`) ;
+les deltas ne touchent que les lignes existantes, jamais une ligne partielle.
+
+Le module fournit aussi l'historique des commandes d'un vendeur
+(`seller_orders`) et sa série de chiffre d'affaires par jour ou par
+semaine (`revenue_series`), calculée par agrégats groupés et mise en
+cache par mois révolu.
+"""
+import datetime
+import time
+from collections import defaultdict
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DecimalField, Exists, F, Max, OuterRef, Prefetch, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Order, OrderItem, Product, Profile, SellerStats
+
+CANCELLED = 'cancelled'
+STATS_FIELDS = ['product_count', 'order_count', 'units_sold', 'revenue', 'last_order_at', 'updated_at']
+REBUILD_BATCH_SIZE = 500
+
+# Au-delà, l'historique parcourt les commandes par date (voir seller_orders)
+LARGE_SELLER_ORDERS = 1000
+
+SERIES_PERIODS = ('day', 'week')
+SERIES_MAX_DAYS = 2 * 366
+SERIES_CACHE_TIMEOUT = 7 * 24 * 60 * 60
+
+_MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def _compute(seller_ids):
+    """SellerStats non enregistrés pour `seller_ids`, en deux requêtes groupées."""
+    products = dict(Product.objects
+                    .filter(seller_id__in=seller_ids)
+                    .order_by()
+                    .values_list('seller_id')
+                    .annotate(n=Count('id')))
+    sales = {
+        row[0]: row[1:]
+        for row in (OrderItem.objects
+                    .filter(product__seller_id__in=seller_ids)
+                    .exclude(order__status=CANCELLED)
+                    .order_by()
+                    .values_list('product__seller_id')
+                    .annotate(order_count=Count('order_id', distinct=True),
+                              units_sold=Coalesce(Sum('quantity'), 0),
+                              revenue=Coalesce(Sum(F('price') * F('quantity'), output_field=_MONEY),
+                                               Decimal('0'), output_field=_MONEY),
+                              last_order_at=Max('order__created_at'))
+                    .values_list('product__seller_id', 'order_count', 'units_sold', 'revenue', 'last_order_at'))
+    }
+    stats = []
+    for seller_id in seller_ids:
+        order_count, units_sold, revenue, last_order_at = sales.get(seller_id, (0, 0, Decimal('0'), None))
+        stats.append(SellerStats(seller_id=seller_id, product_count=products.get(seller_id, 0),
+                                 order_count=order_count, units_sold=units_sold,
+                                 revenue=revenue, last_order_at=last_order_at))
+    return stats
+
+
+def refresh_seller_stats(seller_ids):
+    """Recalcule et enregistre les statistiques de `seller_ids` (agrégats + upsert)."""
+    seller_ids = sorted({seller_id for seller_id in seller_ids if seller_id is not None})
+    if not seller_ids:
+        return []
+    stats = _compute(seller_ids)
+    SellerStats.objects.bulk_create(stats, update_conflicts=True,
+                                    unique_fields=['seller'], update_fields=STATS_FIELDS)
+    # Des jours passés ont pu changer (annulation, article modifié)
+    for seller_id in seller_ids:
+        bump_series_version(seller_id)
+    return stats
+
+
+def _flush_pending_refresh(connection):
+    seller_ids = connection.pending_seller_stats
+    if not seller_ids:
+        return
+    connection.pending_seller_stats = set()
+    # Vendeur supprimé dans la transaction (cascade) : plus rien à calculer
+    refresh_seller_stats(User.objects.filter(pk__in=seller_ids).values_list('pk', flat=True))
+
+
+def refresh_seller_stats_on_commit(seller_ids):
+    """
+    refresh_seller_stats() après la transaction en cours, une fois pour
+    tous les vendeurs demandés pendant celle-ci (suppression d'une commande
+    et de ses articles) ; immédiat hors transaction.
+
+    Les vendeurs s'accumulent dans un ensemble propre à la connexion ; le
+    premier rappel validé le vide, les suivants n'ont plus rien à faire. Un
+    ensemble laissé par une transaction annulée part avec la suivante.
+    """
+    connection = transaction.get_connection()
+    if not hasattr(connection, 'pending_seller_stats'):
+        connection.pending_seller_stats = set()
+    connection.pending_seller_stats.update(seller_ids)
+    transaction.on_commit(lambda: _flush_pending_refresh(connection))
+
+
+def get_seller_stats(user):
+    stats = SellerStats.objects.filter(seller=user).first()
+    if stats is None:
+        stats = refresh_seller_stats([user.pk])[0]
+    return stats
+
+
+def record_order(order, lines):
+    """
+    Ajoute une commande fraîchement créée aux statistiques des vendeurs.
+
+    `lines` : itérable de (product, quantity, price) ; `product.seller_id`
+    doit être chargé. Un UPDATE par vendeur, sans lecture préalable.
+    """
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    for product, quantity, price in lines:
+        delta = deltas[product.seller_id]
+        delta[0] += quantity
+        delta[1] += price * quantity
+    for seller_id, (units, revenue) in deltas.items():
+        SellerStats.objects.filter(seller_id=seller_id).update(
+            order_count=F('order_count') + 1,
+            units_sold=F('units_sold') + units,
+            revenue=F('revenue') + Value(revenue, output_field=_MONEY),
+            last_order_at=order.created_at,
+        )
+
+
+def product_count_changed(seller_id, delta):
+    if seller_id is not None and delta:
+        SellerStats.objects.filter(seller_id=seller_id).update(product_count=F('product_count') + delta)
+
+
+def order_seller_ids(order_id):
+    return set(OrderItem.objects
+               .filter(order_id=order_id)
+               .values_list('product__seller_id', flat=True)
+               .distinct())
+
+
+def rebuild_seller_stats(batch_size=REBUILD_BATCH_SIZE, stdout=None):
+    """
+    Recalcule les statistiques de tous les vendeurs (profil « vendeur » ou
+    propriétaires d'au moins un produit), par lots. Renvoie leur nombre.
+    """
+    seller_ids = set(Profile.objects.filter(role='vendeur').values_list('user_id', flat=True))
+    seller_ids.update(Product.objects.order_by().values_list('seller_id', flat=True).distinct())
+    seller_ids.discard(None)
+    seller_ids = sorted(seller_ids)
+
+    for start in range(0, len(seller_ids), batch_size):
+        with transaction.atomic():
+            refresh_seller_stats(seller_ids[start:start + batch_size])
+        if stdout is not None:
+            stdout.write(f"  {min(start + batch_size, len(seller_ids))} vendeurs recalculés")
+    # Lignes de vendeurs qui n'en sont plus
+    (SellerStats.objects
+     .exclude(seller__profile__role='vendeur')
+     .exclude(seller_id__in=Product.objects.values('seller_id'))
+     .delete())
+    return len(seller_ids)
+
+
+# --- Historique des commandes ---
+
+def seller_orders(seller, status=None, start=None, end=None, order_count=0):
+    """
+    Commandes contenant des produits de `seller`, avec ses articles seulement
+    préchargés dans `order.seller_items` (une requête pour toute la page).
+
+    `start` / `end` : datetimes bornant `created_at` (end exclue).
+    `order_count` (SellerStats.order_count) choisit le plan : un gros vendeur
+    parcourt l'index (created_at, id) des commandes en testant EXISTS, ce qui
+    s'arrête dès la page remplie ; un petit vendeur part de ses articles
+    (id IN …) et trie ses quelques commandes.
+    """
+    seller_items = OrderItem.objects.filter(product__seller=seller)
+    if order_count >= LARGE_SELLER_ORDERS:
+        orders = Order.objects.filter(Exists(seller_items.filter(order=OuterRef('pk'))))
+    else:
+        orders = Order.objects.filter(pk__in=seller_items.values('order_id'))
+    if status:
+        orders = orders.filter(status=status)
+    if start is not None:
+        orders = orders.filter(created_at__gte=start)
+    if end is not None:
+        orders = orders.filter(created_at__lt=end)
+    return orders.prefetch_related(
+        Prefetch('items', queryset=seller_items.select_related('product'), to_attr='seller_items'))
+
+
+# --- Série du chiffre d'affaires ---
+# Un mois révolu ne change plus, sauf annulation ou modification d'article :
+# ces cas passent par refresh_seller_stats, qui change la version du vendeur
+# et périme ainsi tout son cache. Le mois courant n'est jamais mis en cache.
+
+def _series_version_key(seller_id):
+    return f'sellers:series_version:{seller_id}'
+
+
+def series_version(seller_id):
+    key = _series_version_key(seller_id)
+    version = cache.get(key)
+    if version is None:
+        # Même principe que catalog_version : jamais une valeur déjà servie
+        version = time.time_ns()
+        if not cache.add(key, version, None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_series_version(seller_id):
+    try:
+        cache.incr(_series_version_key(seller_id))
+    except ValueError:
+        series_version(seller_id)
+
+
+def day_start(day):
+    """Début (aware) du jour `day` dans le fuseau courant."""
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def _daily_sales(seller_id, first_day, last_day):
+    """{jour: (chiffre d'affaires, unités, commandes)} en une requête groupée."""
+    rows = (OrderItem.objects
+            .filter(product__seller_id=seller_id,
+                    order__created_at__gte=day_start(first_day),
+                    order__created_at__lt=day_start(last_day + datetime.timedelta(days=1)))
+            .exclude(order__status=CANCELLED)
+            .annotate(day=TruncDate('order__created_at'))
+            .order_by()
+            .values('day')
+            .annotate(revenue=Sum(F('price') * F('quantity'), output_field=_MONEY),
+                      units=Sum('quantity'),
+                      orders=Count('order_id', distinct=True)))
+    return {row['day']: (row['revenue'], row['units'], row['orders']) for row in rows}
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(month):
+    return (month + datetime.timedelta(days=31)).replace(day=1)
+
+
+def _month_days(month):
+    return [month + datetime.timedelta(days=n) for n in range((_next_month(month) - month).days)]
+
+
+def revenue_series(seller_id, first_day, last_day, period='day'):
+    """
+    Chiffre d'affaires de `seller_id` entre deux dates incluses, par jour ou
+    par semaine (lundi). Renvoie une liste de dicts {start, revenue, units,
+    orders}, périodes vides comprises.
+
+    Les jours des mois révolus sont lus en cache (un get_many) ; tous les
+    jours manquants sont calculés ensemble par une seule requête groupée.
+    """
+    if period not in SERIES_PERIODS:
+        raise ValueError(f"Période inconnue : {period}")
+    empty = (Decimal('0'), 0, 0)
+    today = timezone.localdate()
+    last_day = min(last_day, today)
+    days = [first_day + datetime.timedelta(days=n) for n in range((last_day - first_day).days + 1)]
+    if not days:
+        return []
+
+    # Jours regroupés par mois complet et révolu : une entrée de cache par
+    # vendeur et par mois plutôt que par jour (LocMemCache plafonne à 300 clés)
+    version = series_version(seller_id)
+    months = sorted({_month_start(day) for day in days if _next_month(_month_start(day)) <= today})
+    keys = {month: f'sellers:revenue:{seller_id}:{version}:{month:%Y-%m}' for month in months}
+    cached = cache.get_many(keys.values())
+    buckets = {}
+    for key in keys.values():
+        buckets.update(cached.get(key, {}))
+
+    missing = [day for day in days if day not in buckets]
+    if missing:
+        uncached = [month for month, key in keys.items() if key not in cached]
+        # Mois non encore en cache lus en entier pour pouvoir les y mettre
+        fetch_first = min([missing[0]] + uncached)
+        fetch_last = max([missing[-1]] + [_next_month(month) - datetime.timedelta(days=1) for month in uncached])
+        sales = _daily_sales(seller_id, fetch_first, fetch_last)
+        chunks = {}
+        for month in uncached:
+            chunk = {day: sales.get(day, empty) for day in _month_days(month)}
+            chunks[keys[month]] = chunk
+            buckets.update(chunk)
+        cache.set_many(chunks, SERIES_CACHE_TIMEOUT)
+        for day in missing:
+            buckets.setdefault(day, sales.get(day, empty))
+
+    points = {}
+    for day in days:
+        start = day - datetime.timedelta(days=day.weekday()) if period == 'week' else day
+        revenue, units, orders = buckets[day]
+        point = points.setdefault(start, {'start': start, 'revenue': Decimal('0'), 'units': 0, 'orders': 0})
+        point['revenue'] += revenue
+        point['units'] += units
+        # Une commande tombe dans un seul jour : la somme par semaine est exacte
+        point['orders'] += orders
+    return list(points.values())
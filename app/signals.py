@@ -1,10 +1,123 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Profile
+from .models import Category, Order, OrderItem, Product, Profile
+from . import cart, catalog, images, sellers
 
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         Profile.objects.create(user=instance)
 
+
+# --- Version et compteurs du catalogue (app.catalog) ---
+
+def _catalog_state(product):
+    return (product.category_id, product.is_active)
+
+
+@receiver(pre_save, sender=Product)
+def remember_product_state(sender, instance, **kwargs):
+    instance._catalog_previous = None
+    instance._previous_price = None
+    instance._previous_seller_id = None
+    if not instance._state.adding and instance.pk:
+        previous = (Product.objects
+                    .filter(pk=instance.pk)
+                    .values_list('category_id', 'is_active', 'price', 'seller_id')
+                    .first())
+        if previous is not None:
+            instance._catalog_previous = previous[:2]
+            instance._previous_price = previous[2]
+            instance._previous_seller_id = previous[3]
+
+
+@receiver(post_save, sender=Product)
+def update_catalog_on_product_save(sender, instance, created, **kwargs):
+    catalog.product_changed(getattr(instance, '_catalog_previous', None), _catalog_state(instance))
+    catalog.bump_catalog_version()
+    previous_price = getattr(instance, '_previous_price', None)
+    if previous_price is not None and previous_price != instance.price:
+        cart.invalidate_product_summaries(instance.pk)
+
+    previous_seller_id = getattr(instance, '_previous_seller_id', None)
+    if created:
+        sellers.product_count_changed(instance.seller_id, 1)
+    elif previous_seller_id is not None and previous_seller_id != instance.seller_id:
+        # Les ventes passées suivent le produit : recalcul des deux vendeurs
+        sellers.refresh_seller_stats([previous_seller_id, instance.seller_id])
+
+
+@receiver(post_save, sender=Product)
+def schedule_image_variants(sender, instance, **kwargs):
+    # Image envoyée ou remplacée (formulaire vendeur, admin) : déclinaisons
+    # générées après la transaction (app.images)
+    if images.images_changed(instance):
+        images.schedule_variants(instance.pk)
+
+
+@receiver(pre_delete, sender=Product)
+def invalidate_cart_summaries_on_product_delete(sender, instance, **kwargs):
+    # Avant la suppression en cascade des CartItem, pour retrouver les paniers
+    cart.invalidate_product_summaries(instance.pk)
+
+
+@receiver(post_delete, sender=Product)
+def update_catalog_on_product_delete(sender, instance, **kwargs):
+    catalog.product_changed(_catalog_state(instance), None)
+    catalog.bump_catalog_version()
+    sellers.product_count_changed(instance.seller_id, -1)
+
+
+@receiver(post_save, sender=Category)
+def update_catalog_on_category_save(sender, instance, **kwargs):
+    catalog.bump_catalog_version()
+
+
+@receiver(post_delete, sender=Category)
+def update_catalog_on_category_delete(sender, instance, **kwargs):
+    # Les produits passent à category=NULL par un update() sans signal
+    catalog.invalidate_category_counts()
+    catalog.bump_catalog_version()
+
+
+# --- Statistiques vendeur (app.sellers) ---
+# Le passage de commande met à jour les statistiques lui-même (OrderItem
+# créés par bulk_create, sans signal) ; ces récepteurs couvrent les
+# modifications faites ailleurs, dans l'admin notamment.
+
+@receiver(pre_save, sender=Order)
+def remember_order_status(sender, instance, update_fields=None, **kwargs):
+    instance._previous_status = None
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    if not instance._state.adding and instance.pk:
+        instance._previous_status = (Order.objects
+                                     .filter(pk=instance.pk)
+                                     .values_list('status', flat=True)
+                                     .first())
+
+
+@receiver(post_save, sender=Order)
+def update_seller_stats_on_status_change(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_previous_status', None)
+    if created or previous is None:
+        return
+    # Seule l'entrée dans / la sortie de l'état annulé change les totaux
+    if (previous == sellers.CANCELLED) != (instance.status == sellers.CANCELLED):
+        sellers.refresh_seller_stats(sellers.order_seller_ids(instance.pk))
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def update_seller_stats_on_order_item_change(sender, instance, **kwargs):
+    # Produit déjà chargé (admin, suppression en cascade) : pas de requête
+    if OrderItem.product.is_cached(instance):
+        seller_id = instance.product.seller_id
+    else:
+        seller_id = (Product.objects
+                     .filter(pk=instance.product_id)
+                     .values_list('seller_id', flat=True)
+                     .first())
+    # Suppression d'une commande : un recalcul par vendeur, pas par article
+    sellers.refresh_seller_stats_on_commit([seller_id])
@@ -15,6 +15,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 currentUrl.searchParams.set('category', categoryId);
             }
             currentUrl.searchParams.delete('page'); // Reset to page 1
+            currentUrl.searchParams.delete('cursor');
             
             window.location.href = currentUrl.toString();
         });
@@ -33,6 +34,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 currentUrl.searchParams.delete('sort');
             }
             currentUrl.searchParams.delete('page'); // Reset to page 1
+            currentUrl.searchParams.delete('cursor');
             
             window.location.href = currentUrl.toString();
         });
@@ -0,0 +1,301 @@
+"""
+Génération de catalogues synthétiques réalistes, en masse.
+
+Utilisé par la commande `generate_catalog` (données locales de la taille
+de la production) et par `benchmark_storefront`. Tout passe par
+bulk_create, par lots d'une transaction chacun ; avec une graine, deux
+générations sur une base vide produisent les mêmes données (dates
+relatives à l'instant de génération).
+
+Distributions :
+- vendeurs et produits populaires : loi de puissance (quelques gros
+  vendeurs, une longue traîne) ;
+- prix : log-normaux autour d'une médiane propre à la catégorie ;
+- commandes : réparties sur un an, plus nombreuses récemment, statut
+  selon l'âge (anciennes livrées, récentes en attente), 1 à 5 lignes.
+"""
+import datetime
+import itertools
+import math
+import time
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from . import catalog
+from .models import CartItem, CartSummary, Category, Order, OrderItem, Product, Profile
+from .sellers import rebuild_seller_stats
+
+PASSWORD = 'synthetic'
+BATCH_SIZE = 5000
+
+# Catégories de la boutique et prix médian (FCFA)
+CATEGORIES = [
+    ('Électronique', 'electronique', 'Téléphones, ordinateurs, accessoires électroniques', 120_000),
+    ('Mode & Vêtements', 'mode-vetements', 'Vêtements homme, femme, enfant, chaussures, accessoires', 15_000),
+    ('Maison & Décoration', 'maison-decoration', 'Meubles, décoration, électroménager', 60_000),
+    ('Beauté & Santé', 'beaute-sante', 'Cosmétiques, parfums, soins, produits de santé', 8_000),
+    ('Sports & Loisirs', 'sports-loisirs', 'Équipements sportifs, jeux, loisirs créatifs', 25_000),
+    ('Alimentation', 'alimentation', 'Produits alimentaires, boissons, épicerie', 3_000),
+    ('Livres & Média', 'livres-media', 'Livres, films, musique, jeux vidéo', 7_000),
+    ('Jouets & Enfants', 'jouets-enfants', 'Jouets, jeux, articles pour bébés et enfants', 12_000),
+    ('Bijoux & Montres', 'bijoux-montres', 'Bijoux, montres, accessoires précieux', 45_000),
+    ('Auto & Moto', 'auto-moto', 'Pièces auto, accessoires moto, équipements', 35_000),
+]
+
+NOUNS = ['chaise', 'table', 'armoire', 'canapé', 'lampe', 'robe', 'chemise', 'sac', 'chaussure',
+         'ordinateur', 'souris', 'clavier', 'écran', 'cafetière', 'montre', 'ballon', 'parfum',
+         'livre', 'casque', 'téléphone', 'tablette', 'jouet', 'pagne', 'boubou', 'marmite']
+ADJECTIVES = ['électrique', 'bois', 'métal', 'rouge', 'noir', 'blanc', 'élégant', 'moderne',
+              'vintage', 'léger', 'solide', 'pliable', 'premium', 'compact', 'traditionnel', 'brodé']
+SYLLABLES = ['ba', 'lo', 'ri', 'ta', 'mé', 'nu', 'so', 'ké', 'fa', 'di', 'po', 'zé']
+BADGES = [('', 85), ('new', 6), ('discount', 4), ('trending', 3), ('featured', 2)]
+
+
+def power_law_weights(count, exponent=1.0):
+    """Poids cumulés d'une loi de Zipf sur `count` éléments (pour rng.choices)."""
+    return list(itertools.accumulate(1 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Désactive auto_now_add le temps de la génération (dates historiques)."""
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+class Progress:
+    """Compteur de lignes écrites et débit, affiché après chaque lot."""
+
+    def __init__(self, label, total, stdout=None):
+        self.label = label
+        self.total = total
+        self.stdout = stdout
+        self.done = 0
+        self.start = time.perf_counter()
+
+    @property
+    def rate(self):
+        elapsed = time.perf_counter() - self.start
+        return self.done / elapsed if elapsed else 0.0
+
+    def advance(self, count):
+        self.done += count
+        if self.stdout is not None:
+            self.stdout.write(f"  {self.label} : {self.done}/{self.total} ({self.rate:,.0f} lignes/s)")
+
+
+class CatalogGenerator:
+    """
+    Génère catégories, vendeurs, clients, produits, paniers et commandes.
+
+    `rng` : random.Random (graine fixe pour des données reproductibles).
+    Les méthodes s'appellent dans l'ordre de `generate()` ; chacune garde
+    ce dont les suivantes ont besoin (ids et prix, pas les instances).
+    """
+
+    def __init__(self, rng, batch_size=BATCH_SIZE, stdout=None, prefix='synth'):
+        self.rng = rng
+        self.batch_size = batch_size
+        self.stdout = stdout
+        self.prefix = prefix
+        self.now = timezone.now()
+        self.categories = []
+        self.sellers = []
+        self.buyers = []
+        self.products = []  # (pk, prix) des produits actifs
+        self.report = {}
+
+    def _batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(self.batch_size, total - start)
+
+    def _finish(self, progress):
+        self.report[progress.label] = {'rows': progress.done, 'rows_per_s': round(progress.rate)}
+
+    def generate(self, products, sellers, buyers, carts, orders):
+        self.create_categories()
+        self.create_users(sellers, buyers)
+        self.create_products(products)
+        self.create_carts(carts)
+        self.create_orders(orders)
+        self.finalize()
+        return self.report
+
+    def create_categories(self):
+        with transaction.atomic():
+            Category.objects.bulk_create(
+                [Category(name=name, slug=slug, description=description)
+                 for name, slug, description, _ in CATEGORIES],
+                ignore_conflicts=True,
+            )
+            by_slug = Category.objects.in_bulk([slug for _, slug, _, _ in CATEGORIES], field_name='slug')
+        self.categories = [(by_slug[slug], median) for _, slug, _, median in CATEGORIES]
+
+    def create_users(self, sellers, buyers):
+        """Vendeurs puis clients, avec leur profil ; numérotation après l'existant."""
+        password = make_password(PASSWORD)
+        offset = User.objects.filter(username__startswith=f'{self.prefix}-').count()
+        progress = Progress('utilisateurs', sellers + buyers, self.stdout)
+        roles = [('vendeur', sellers), ('client', buyers)]
+        created = {'vendeur': [], 'client': []}
+        number = itertools.count(offset)
+        for role, total in roles:
+            for _, size in self._batches(total):
+                with transaction.atomic():
+                    users = User.objects.bulk_create([
+                        User(username=f'{self.prefix}-{role}-{next(number)}', password=password,
+                             date_joined=self.now)
+                        for _ in range(size)
+                    ])
+                    # bulk_create n'émet pas post_save : profils créés ici
+                    Profile.objects.bulk_create([Profile(user=user, role=role) for user in users])
+                created[role].extend(user.pk for user in users)
+                progress.advance(size)
+        self.sellers = created['vendeur']
+        self.buyers = created['client']
+        self._finish(progress)
+
+    def _product(self, rng, number, seller_weights, vocabulary):
+        category, median = rng.choice(self.categories)
+        price = max(100, round(median * math.exp(rng.gauss(0, 0.8)), -2))
+        old_price = None
+        discount = 0
+        if rng.random() < 0.2:
+            discount = rng.randint(5, 50)
+            old_price = Decimal(round(price / (1 - discount / 100), -2))
+        badge = rng.choices([b for b, _ in BADGES], weights=[w for _, w in BADGES])[0]
+        # Plus récents plus nombreux : âge exponentiel, borné à deux ans
+        age = min(rng.expovariate(1 / 180), 730)
+        return Product(
+            seller_id=rng.choices(self.sellers, cum_weights=seller_weights)[0],
+            category=category,
+            name=f"{rng.choice(NOUNS).capitalize()} {rng.choice(ADJECTIVES)} {rng.choice(vocabulary)} {number}",
+            description=' '.join(rng.choices(vocabulary, k=12) + rng.sample(ADJECTIVES, 2)),
+            price=Decimal(price),
+            old_price=old_price,
+            discount_percentage=discount,
+            badge=badge,
+            rating=Decimal(round(rng.triangular(2.5, 5.0, 4.4), 1)).quantize(Decimal('0.1')),
+            stock=0 if rng.random() < 0.05 else int(rng.paretovariate(1.5) * 5),
+            is_active=rng.random() > 0.03,
+            is_featured=rng.random() < 0.02,
+            created_at=self.now - datetime.timedelta(days=age),
+        )
+
+    def create_products(self, total):
+        rng = self.rng
+        # Loi de puissance : quelques vendeurs portent une grande partie du catalogue
+        seller_weights = power_law_weights(len(self.sellers), 0.9)
+        vocabulary = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+        offset = Product.objects.count()
+        progress = Progress('produits', total, self.stdout)
+        created_at = Product._meta.get_field('created_at')
+        with explicit_timestamps(created_at):
+            for start, size in self._batches(total):
+                batch = [self._product(rng, offset + start + i, seller_weights, vocabulary) for i in range(size)]
+                with transaction.atomic():
+                    Product.objects.bulk_create(batch)
+                self.products.extend((p.pk, p.price) for p in batch if p.is_active)
+                progress.advance(size)
+        self._finish(progress)
+
+    def _popular_products(self):
+        """Poids cumulés de popularité (Zipf) sur les produits actifs, dans un ordre aléatoire."""
+        products = list(self.products)
+        self.rng.shuffle(products)
+        return products, power_law_weights(len(products), 0.8)
+
+    def create_carts(self, total):
+        """`total` clients avec un panier de 1 à 8 lignes (et leur résumé)."""
+        rng = self.rng
+        if not self.products or not self.buyers:
+            return
+        products, weights = self._popular_products()
+        owners = rng.sample(self.buyers, min(total, len(self.buyers)))
+        progress = Progress('paniers', len(owners), self.stdout)
+        for start, size in self._batches(len(owners)):
+            items, summaries = [], []
+            for user_id in owners[start:start + size]:
+                lines = {}
+                for product_id, price in rng.choices(products, cum_weights=weights, k=rng.randint(1, 8)):
+                    lines[product_id] = (price, rng.choices([1, 2, 3], weights=[80, 15, 5])[0])
+                items.extend(CartItem(user_id=user_id, product_id=pid, quantity=qty)
+                             for pid, (_, qty) in lines.items())
+                summaries.append(CartSummary(
+                    user_id=user_id,
+                    item_count=len(lines),
+                    total_quantity=sum(qty for _, qty in lines.values()),
+                    subtotal=sum((price * qty for price, qty in lines.values()), Decimal('0')),
+                ))
+            with transaction.atomic():
+                CartItem.objects.bulk_create(items, ignore_conflicts=True)
+                CartSummary.objects.bulk_create(summaries, update_conflicts=True, unique_fields=['user'],
+                                                update_fields=['item_count', 'total_quantity', 'subtotal'])
+            progress.advance(size)
+        self._finish(progress)
+
+    def _status(self, age_days):
+        rng = self.rng
+        if rng.random() < 0.05:
+            return 'cancelled'
+        if age_days > 14:
+            return 'delivered'
+        if age_days > 3:
+            return rng.choice(['shipped', 'delivered'])
+        return rng.choice(['pending', 'processing'])
+
+    def create_orders(self, total):
+        """`total` commandes de 1 à 5 lignes, réparties sur l'année écoulée."""
+        rng = self.rng
+        if not self.products or not self.buyers:
+            return
+        products, weights = self._popular_products()
+        buyer_weights = power_law_weights(len(self.buyers), 0.7)
+        progress = Progress('commandes', total, self.stdout)
+        created_at = Order._meta.get_field('created_at')
+        with explicit_timestamps(created_at):
+            for _, size in self._batches(total):
+                orders, lines = [], []
+                for _ in range(size):
+                    age = min(rng.expovariate(1 / 120), 365)
+                    order = Order(
+                        user_id=rng.choices(self.buyers, cum_weights=buyer_weights)[0],
+                        status=self._status(age),
+                        created_at=self.now - datetime.timedelta(days=age),
+                        total_price=Decimal('0'),
+                    )
+                    chosen = {}
+                    for product_id, price in rng.choices(products, cum_weights=weights,
+                                                         k=min(int(rng.expovariate(0.8)) + 1, 5)):
+                        chosen[product_id] = (price, rng.choices([1, 2, 3], weights=[75, 18, 7])[0])
+                    order.total_price = sum((price * qty for price, qty in chosen.values()), Decimal('0'))
+                    orders.append(order)
+                    lines.append(chosen)
+                with transaction.atomic():
+                    Order.objects.bulk_create(orders)
+                    OrderItem.objects.bulk_create([
+                        OrderItem(order=order, product_id=pid, quantity=qty, price=price)
+                        for order, chosen in zip(orders, lines)
+                        for pid, (price, qty) in chosen.items()
+                    ])
+                progress.advance(size)
+        self._finish(progress)
+
+    def finalize(self):
+        """Agrégats dérivés : statistiques vendeurs, compteurs et version du catalogue."""
+        start = time.perf_counter()
+        rebuild_seller_stats()
+        catalog.invalidate_category_counts()
+        catalog.bump_catalog_version()
+        self.report['statistiques vendeurs'] = {'seconds': round(time.perf_counter() - start, 2)}
@@ -1,6 +1,10 @@
 from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
 import random
 
+from app import assets, images
+
 register = template.Library()
 
 @register.filter
@@ -17,16 +21,45 @@ def random_item(value):
         return ''
 
 @register.filter
-def get_random_default_image(value):
-    """Get a random default product image"""
-    default_images = [
-        'shop-1.jpg',
-        'shop-2.jpg',
-        'shop-3.jpg',
-        'shop-4.jpg',
-        'shop-5.jpg',
-        'armoir.jpeg',
-        'meublee.jpeg',
-        'table.jpeg'
-    ]
-    return random.choice(default_images)
+def default_image(product):
+    """Image par défaut (chemin statique) d'un produit sans image : toujours la même pour un produit"""
+    return images.default_image(product)
+
+
+@register.simple_tag
+def product_image(product, variant='card', field='image', sizes='', css_class=''):
+    """
+    Image produit redimensionnée : <picture> WebP + JPEG dont le `srcset`
+    liste toutes les déclinaisons, `variant` servant de taille par défaut.
+    Déclinaisons pas encore générées : l'original, et la génération est
+    demandée au thread d'arrière-plan s'il est actif (app.images).
+    """
+    fieldfile = getattr(product, field)
+    if not fieldfile:
+        return ''
+    entry = images.variant_entry(product, field)
+    if entry is None:
+        images.request_variants(product.pk)
+        return format_html('<img src="{}" alt="{}" class="{}" loading="lazy">',
+                           fieldfile.url, product.name, css_class)
+
+    variants = sorted(entry['variants'].values(), key=lambda item: item['width'])
+    chosen = entry['variants'][variant]
+    sizes = sizes or f"{chosen['width']}px"
+
+    def srcset(fmt):
+        return ', '.join(f"{default_storage.url(item[fmt])} {item['width']}w" for item in variants)
+
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" '
+        'loading="lazy" decoding="async"></picture>',
+        srcset('webp'), sizes, default_storage.url(chosen['jpeg']), srcset('jpeg'), sizes,
+        chosen['width'], chosen['height'], product.name, css_class,
+    )
+
+
+@register.simple_tag
+def asset_bundle(name):
+    """Bundle CSS/JS de app.assets.BUNDLES (fichiers séparés tant qu'il n'est pas construit)"""
+    return assets.bundle_tags(name)
@@ -1,3 +1,1107 @@
-from django.test import TestCase
+import contextlib
+import csv
+import datetime
+import gzip
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import SESSION_KEY as AUTH_SESSION_KEY
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.cached_db import SessionStore
+from django.contrib.sessions.models import Session
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core import signing
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import path, resolve, reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import assets, images, sellers, views
+from . import urls as app_urls
+from .cart import add_item, get_user_summary, merge_session_cart, purge_abandoned_carts
+from .catalog import LOCAL_CACHE_TIMEOUT, catalog_version, category_counts, count_by_category, local_timeout
+from .checkout import checkout
+from .checks import check_shared_cache
+from .context_processors import cart_count
+from .db.routing import STICKY_COOKIE, PrimaryReplicaRouter, StickyPrimaryMiddleware, use_primary
+from .db.sqlite3.base import DatabaseWrapper as TunedDatabaseWrapper
+from .exports import EXPORT_FORMATS, export_catalog, export_orders
+from .guest_cart import (CART_COOKIE_NAME, COOKIE_MAX_LINES, COOKIE_SALT, COOKIE_VERSION, SESSION_CART_KEY, CartFull,
+                         GuestCart, decode_cookie, encode_cookie, purge_sessions)
+from .instrumentation import QueryBudgetExceeded, _record_query, budget_for, query_budget, record
+from .models import CartItem, CartSummary, Category, CheckoutRequest, Order, OrderItem, Product, SellerStats
+from .pagination import SEARCH_SORT, SHOP_SORTS, encode_cursor, keyset_page
+from .product_import import import_products
+from .search import search_products
+from .sellers import refresh_seller_stats
+from .synthetic import CatalogGenerator
+
+
+# Réplicas (DATABASE_REPLICAS) ignorés : un miroir de la base de test a sa
+# propre connexion et ne voit pas les données d'un TestCase, non validées.
+# Le routage lui-même est testé par RoutingTests.
+primary_only = override_settings(DATABASE_REPLICAS=[])
+
+
+def create_product(seller, category=None, **fields):
+    fields.setdefault('name', 'Chaise en bois')
+    fields.setdefault('price', 1000)
+    fields.setdefault('stock', 10)
+    return Product.objects.create(seller=seller, category=category, **fields)
+
+
+def run_in_threads(func, args_list):
+    """Appelle `func(*args)` dans un thread par élément, lancés ensemble ; exceptions levées renvoyées."""
+    barrier = threading.Barrier(len(args_list))
+    results, errors = [], []
+
+    def target(*args):
+        try:
+            barrier.wait()
+            results.append(func(*args))
+        except Exception as exc:  # noqa: BLE001 — rapporté par le test
+            errors.append(exc)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=target, args=args) for args in args_list]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+@primary_only
+class ShopSearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('vendeur')
+        cls.category = Category.objects.create(name='Mobilier', slug='mobilier')
+        create_product(cls.seller, cls.category)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_query_without_search_terms_is_empty(self):
+        # Aucun mot cherchable : tri par pertinence sur un résultat vide, pas de 500
+        for query in ('-', '!!!', '"*'):
+            with self.subTest(query=query):
+                response = self.client.get(reverse('shop'), {'q': query})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.context['products']), 0)
+
+    def test_search_finds_product(self):
+        response = self.client.get(reverse('shop'), {'q': 'chaise'})
+        self.assertEqual([p.name for p in response.context['products']], ['Chaise en bois'])
+
+
+@primary_only
+class SearchIndexTests(TestCase):
+    """Index FTS5 : insensible aux accents, tenu à jour par les triggers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('vendeur')
+        cls.category = Category.objects.create(name='Électroménager', slug='electromenager')
+
+    def found(self, text):
+        return list(search_products(Product.objects.all(), text).values_list('name', flat=True))
+
+    def test_accents_are_ignored(self):
+        create_product(self.seller, self.category, name='Cafetière électrique')
+        for text in ('cafetiere electrique', 'CAFETIÈRE', 'electromenager', 'élec'):
+            with self.subTest(text=text):
+                self.assertEqual(self.found(text), ['Cafetière électrique'])
+
+    def test_index_follows_insert_update_delete(self):
+        product = create_product(self.seller, name='Canapé en cuir')
+        self.assertEqual(self.found('canape'), ['Canapé en cuir'])
+
+        product.name = 'Fauteuil en cuir'
+        product.save()
+        self.assertEqual(self.found('canape'), [])
+        self.assertEqual(self.found('fauteuil'), ['Fauteuil en cuir'])
+
+        # Catégorie renommée : l'index des produits suit aussi
+        product.category = self.category
+        product.save()
+        self.category.name = 'Salon'
+        self.category.save()
+        self.assertEqual(self.found('salon'), ['Fauteuil en cuir'])
+
+        product.delete()
+        self.assertEqual(self.found('fauteuil'), [])
+
+@primary_only
+class CategoryCountsTests(TestCase):
+    """Compteurs par catégorie en cache : toujours égaux au décompte en base."""
+
+    def setUp(self):
+        cache.clear()
+        self.seller = User.objects.create_user('vendeur')
+        self.chairs = Category.objects.create(name='Chaises', slug='chaises')
+        self.tables = Category.objects.create(name='Tables', slug='tables')
+
+    def assertCountsMatchDatabase(self, expected):
+        self.assertEqual({key: n for key, n in category_counts().items() if n}, expected)
+        self.assertEqual(category_counts(), count_by_category(Product.objects.filter(is_active=True)))
+
+    def test_counts_follow_product_writes(self):
+        chair = create_product(self.seller, self.chairs)
+        self.assertCountsMatchDatabase({self.chairs.pk: 1})
+
+        table = create_product(self.seller, self.tables)
+        self.assertCountsMatchDatabase({self.chairs.pk: 1, self.tables.pk: 1})
+
+        chair.category = self.tables
+        chair.save()
+        self.assertCountsMatchDatabase({self.tables.pk: 2})
+
+        table.is_active = False
+        table.save()
+        self.assertCountsMatchDatabase({self.tables.pk: 1})
+
+        chair.delete()
+        self.assertCountsMatchDatabase({})
+
+@primary_only
+class KeysetPaginationTests(TestCase):
+    """Pagination par curseur : chaque produit actif une fois, dans les deux sens, malgré les ex aequo."""
+
+    PER_PAGE = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user('vendeur')
+        # Prix, noms et notes en double : seul l'id départage
+        for i in range(11):
+            create_product(seller, name=f'Chaise {i % 3}', price=100 * (i % 4 + 1), rating=i % 2 + 4)
+        create_product(seller, name='Chaise 0', is_active=False)
+        # Même date de création pour tous
+        Product.objects.update(created_at=Product.objects.first().created_at)
+        cls.queryset = Product.objects.filter(is_active=True)
+
+    def walk(self, sort):
+        """Pages successives (ids, offset) en avançant, puis en revenant de la dernière."""
+        forward, page = [], keyset_page(self.queryset, sort, per_page=self.PER_PAGE)
+        while True:
+            forward.append(([p.pk for p in page], page.offset))
+            if not page.has_next():
+                break
+            page = keyset_page(self.queryset, sort, page.next_cursor, per_page=self.PER_PAGE)
+        backward = [([p.pk for p in page], page.offset)]
+        while page.has_previous():
+            page = keyset_page(self.queryset, sort, page.previous_cursor, per_page=self.PER_PAGE)
+            backward.append(([p.pk for p in page], page.offset))
+        return forward, backward
+
+    def test_walks_every_product_once_both_ways(self):
+        for sort, ordering in SHOP_SORTS.items():
+            if sort == SEARCH_SORT:
+                continue
+            with self.subTest(sort=sort):
+                forward, backward = self.walk(sort)
+                expected = list(self.queryset.order_by(*[('-' if desc else '') + field for field, desc in ordering])
+                                .values_list('pk', flat=True))
+                self.assertEqual([pk for ids, _ in forward for pk in ids], expected)
+                self.assertEqual([offset for _, offset in forward],
+                                 list(range(0, len(expected), self.PER_PAGE)))
+                self.assertEqual(backward, forward[::-1])
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        first = [p.pk for p in keyset_page(self.queryset, 'price_asc', per_page=self.PER_PAGE)]
+        next_cursor = keyset_page(self.queryset, 'price_asc', per_page=self.PER_PAGE).next_cursor
+        forged = encode_cursor('price_asc', [0, 0], 'n', 30)[:-2] + 'xx'
+        for cursor in (forged, next_cursor[:-1], 'nimporte-quoi'):
+            with self.subTest(cursor=cursor):
+                page = keyset_page(self.queryset, 'price_asc', cursor, per_page=self.PER_PAGE)
+                self.assertEqual(([p.pk for p in page], page.offset), (first, 0))
+        # Curseur d'un autre tri
+        page = keyset_page(self.queryset, 'name', next_cursor, per_page=self.PER_PAGE)
+        self.assertEqual(page.offset, 0)
+        self.assertFalse(page.has_previous())
+
+@primary_only
+class QueryBudgetTests(TestCase):
+    """Pages en lecture dans leur budget de requêtes (QUERY_BUDGETS), cache froid."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('vendeur')
+        cls.seller.profile.role = 'vendeur'
+        cls.seller.profile.save()
+        category = Category.objects.create(name='Mobilier', slug='mobilier')
+        for i in range(15):
+            create_product(cls.seller, category, name=f'Chaise {i}', is_featured=True)
+        # Statistiques déjà calculées (première visite : calcul et INSERT en plus)
+        refresh_seller_stats([cls.seller.pk])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_read_pages_stay_within_budget(self):
+        for name in ('index', 'shop'):
+            with self.subTest(view=name), query_budget(budget_for(name)):
+                self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+
+    def test_shop_category_page_stays_within_budget(self):
+        category = Category.objects.get()
+        with query_budget(budget_for('shop')):
+            self.client.get(reverse('shop'), {'category': category.pk, 'sort': 'price_asc'})
+
+    def test_seller_dashboard_stays_within_budget(self):
+        self.client.force_login(self.seller)
+        with query_budget(budget_for('vendeur_dashboard')):
+            self.assertEqual(self.client.get(reverse('vendeur_dashboard')).status_code, 200)
+
+    def test_measure_leaves_no_wrapper_behind(self):
+        from django.template.backends.django import Template
+
+        render = Template.render
+        with record() as outer:
+            with record() as inner:
+                self.client.get(reverse('shop'))
+            self.assertIn(_record_query, connection.execute_wrappers)
+        self.assertGreater(inner.template_time, 0)
+        self.assertEqual((outer.query_count, outer.template_time), (inner.query_count, inner.template_time))
+        self.assertIs(Template.render, render)
+        self.assertNotIn(_record_query, connection.execute_wrappers)
+
+    def test_budget_exceeded_raises(self):
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(0):
+                self.client.get(reverse('shop'))
+
+class SharedCacheTests(SimpleTestCase):
+    """État du catalogue : retard borné dans un cache propre au processus, cache partagé exigé en production."""
+
+    def test_process_local_cache_shortens_timeouts(self):
+        self.assertEqual(local_timeout(None), LOCAL_CACHE_TIMEOUT)
+        self.assertEqual(local_timeout(3600), LOCAL_CACHE_TIMEOUT)
+        self.assertEqual(local_timeout(10), 10)
+        self.assertEqual([error.id for error in check_shared_cache(None)], ['app.E001'])
+
+    def test_shared_cache_keeps_timeouts(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory}}):
+            self.assertIsNone(local_timeout(None))
+            self.assertEqual(local_timeout(3600), 3600)
+            self.assertEqual(check_shared_cache(None), [])
+
+@primary_only
+class CartMergeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('vendeur')
+        cls.buyer = User.objects.create_user('client')
+        cls.product = create_product(cls.seller)
+
+    def test_merge_adds_to_existing_lines(self):
+        other = create_product(self.seller, name='Table')
+        inactive = create_product(self.seller, name='Lampe', is_active=False)
+        add_item(self.buyer, self.product)
+
+        merged = merge_session_cart(self.buyer, {str(self.product.pk): 2, str(other.pk): 3,
+                                                 str(inactive.pk): 1, 'x': 1})
+
+        self.assertEqual(merged, 2)
+        self.assertEqual(dict(CartItem.objects.filter(user=self.buyer).values_list('product_id', 'quantity')),
+                         {self.product.pk: 3, other.pk: 3})
+
+@primary_only
+class CartSummaryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('vendeur')
+        cls.buyer = User.objects.create_user('client', password='secret')
+        cls.product = create_product(cls.seller, price=10)
+
+    def summary(self):
+        return CartSummary.objects.get(user=self.buyer)
+
+    def test_cart_writes_refresh_summary(self):
+        other = create_product(self.seller, name='Table', price='2.50')
+        add_item(self.buyer, self.product, 2)
+        merge_session_cart(self.buyer, {str(self.product.pk): 1, str(other.pk): 2})
+
+        summary = self.summary()
+        self.assertEqual((summary.item_count, summary.total_quantity, summary.subtotal),
+                         (2, 5, Decimal('35.00')))
+
+    def test_price_change_invalidates_summary(self):
+        add_item(self.buyer, self.product, 3)
+        self.product.price = 20
+        self.product.save()
+
+        self.assertFalse(CartSummary.objects.filter(user=self.buyer).exists())
+        self.assertEqual(get_user_summary(self.buyer).subtotal, Decimal('60.00'))
+
+    def test_header_count_reads_summary_only(self):
+        add_item(self.buyer, self.product, 4)
+        request = RequestFactory().get('/')
+        request.user = self.buyer
+
+        with self.assertNumQueries(1):
+            self.assertEqual(cart_count(request)['cart_count'], 4)
+
+@primary_only
+@override_settings(GUEST_CART_STORAGE='cookie')
+class GuestCartViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('vendeur')
+        cls.products = [create_product(cls.seller, name=f'Produit {i}', price=10 + i) for i in range(3)]
+
+    def get_cart(self, items):
+        self.client.cookies[CART_COOKIE_NAME] = encode_cookie(GuestCart(items))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('cart'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_depend_on_cart_size(self):
+        _, one_line = self.get_cart({str(self.products[0].pk): 1})
+        response, three_lines = self.get_cart({str(product.pk): 2 for product in self.products})
+
+        self.assertEqual(three_lines, one_line)
+        self.assertEqual(response.context['subtotal'], Decimal('66'))
+
+    def test_stale_and_inactive_products_are_dropped(self):
+        kept, inactive = self.products[:2]
+        inactive.is_active = False
+        inactive.save()
+
+        response, _ = self.get_cart({str(kept.pk): 1, str(inactive.pk): 1, '999999': 1})
+
+        self.assertEqual([line.product for line in response.context['items']], [kept])
+        cart = decode_cookie(response.cookies[CART_COOKIE_NAME].value)
+        self.assertEqual(cart.items, {str(kept.pk): 1})
+        self.assertEqual(cart.prices, {str(kept.pk): '10.00'})
+
+@primary_only
+class GuestCartStorageTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('vendeur')
+        cls.product = create_product(cls.seller, price='12.50')
+
+    def test_cookie_round_trip(self):
+        cart = decode_cookie(encode_cookie(GuestCart({'3': 2, '7': 1}, {'3': '12.50'})))
+
+        self.assertEqual((cart.items, cart.prices), ({'3': 2, '7': 1}, {'3': '12.50'}))
+
+    def test_invalid_cookies_give_empty_cart(self):
+        value = encode_cookie(GuestCart({'3': 2}))
+        for label, bad in [
+            ('signature', value[:-1] + ('A' if value[-1] != 'A' else 'B')),
+            ('version', signing.dumps([COOKIE_VERSION + 1, [[3, 2, '']]], salt=COOKIE_SALT, compress=True)),
+            ('contenu', signing.dumps([COOKIE_VERSION, [['x', 2, '']]], salt=COOKIE_SALT, compress=True)),
+            ('sel', signing.dumps([COOKIE_VERSION, [[3, 2, '']]], compress=True)),
+        ]:
+            with self.subTest(label):
+                self.assertEqual(decode_cookie(bad).items, {})
+
+    def test_cookie_size_is_bounded(self):
+        lines = [[pid, 1, ''] for pid in range(1, COOKIE_MAX_LINES + 20)]
+        value = signing.dumps([COOKIE_VERSION, lines], salt=COOKIE_SALT, compress=True)
+        self.assertEqual(len(decode_cookie(value)), COOKIE_MAX_LINES)
+
+        cart = GuestCart({str(pid): pid for pid in range(10 ** 6, 10 ** 6 + 2000)})
+        with self.assertRaises(CartFull):
+            encode_cookie(cart)
+
+    @override_settings(GUEST_CART_STORAGE='cookie')
+    def test_cookie_storage_writes_no_session(self):
+        response = self.client.get(reverse('add_to_cart', args=[self.product.pk]))
+
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Session.objects.exists())
+        cart = decode_cookie(response.cookies[CART_COOKIE_NAME].value)
+        self.assertEqual((cart.items, cart.prices), ({str(self.product.pk): 1}, {str(self.product.pk): '12.50'}))
+
+    def test_purge_sessions_deletes_expired_and_abandoned_guest_carts(self):
+        now = timezone.now()
+        idle = now + datetime.timedelta(days=1)  # dernier enregistrement il y a 13 jours
+        sessions = {}
+        for name, data, expire_date in [
+            ('expirée', {}, now - datetime.timedelta(minutes=1)),
+            ('panier abandonné', {SESSION_CART_KEY: {'1': 1}}, idle),
+            ('connecté', {SESSION_CART_KEY: {'1': 1}, AUTH_SESSION_KEY: '1'}, idle),
+            ('sans panier', {'vu': True}, idle),
+            ('panier récent', {SESSION_CART_KEY: {'1': 1}}, now + datetime.timedelta(days=13)),
+        ]:
+            session = SessionStore()
+            session.update(data)
+            session.create()
+            Session.objects.filter(session_key=session.session_key).update(expire_date=expire_date)
+            sessions[name] = session.session_key
+
+        dry = purge_sessions(batch_size=1, dry_run=True)
+        self.assertEqual((dry.expired_sessions, dry.abandoned_carts), (1, 1))
+        self.assertEqual(Session.objects.count(), 5)
+
+        report = purge_sessions(batch_size=1)
+
+        self.assertEqual((report.expired_sessions, report.scanned_sessions, report.abandoned_carts), (1, 3, 1))
+        self.assertEqual(set(Session.objects.values_list('session_key', flat=True)),
+                         {sessions['connecté'], sessions['sans panier'], sessions['panier récent']})
+        # cached_db : la copie en cache est supprimée avec la ligne
+        self.assertNotIn(SESSION_CART_KEY, SessionStore(sessions['panier abandonné']).load())
+
+@primary_only
+class AbandonedCartPurgeTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        seller = User.objects.create_user('vendeur')
+        products = [create_product(seller, name=f'Produit {i}') for i in range(2)]
+        old = timezone.now() - datetime.timedelta(days=31)
+        cls.users = {}
+        # Dates des ajouts de chaque panier : None = maintenant
+        for name, dates in [('abandonné', [old, old]), ('ajout récent', [old, None]),
+                            ('actif', [None]), ('ancien', [old])]:
+            user = cls.users[name] = User.objects.create_user(name)
+            for product, added_at in zip(products, dates):
+                add_item(user, product)
+                if added_at is not None:
+                    CartItem.objects.filter(user=user, product=product).update(added_at=added_at)
+
+    def test_dry_run_counts_only(self):
+        report = purge_abandoned_carts(batch_size=1, dry_run=True)
+
+        self.assertEqual((report.carts, report.rows), (2, 3))
+        self.assertEqual(CartItem.objects.count(), 6)
+
+    def test_purge_deletes_whole_abandoned_carts(self):
+        archive = io.StringIO()
+        report = purge_abandoned_carts(batch_size=1, archive=archive)
+
+        self.assertEqual((report.carts, report.rows), (2, 3))
+        self.assertIsNotNone(report.freed_bytes)
+        kept = {self.users['ajout récent'].pk, self.users['actif'].pk}
+        self.assertEqual(set(CartItem.objects.values_list('user_id', flat=True)), kept)
+        self.assertEqual(set(CartSummary.objects.values_list('user_id', flat=True)), kept)
+        archived = [json.loads(line) for line in archive.getvalue().splitlines()]
+        self.assertEqual(sorted(row['user_id'] for row in archived),
+                         sorted([self.users['abandonné'].pk] * 2 + [self.users['ancien'].pk]))
+
+    def test_ttl_overrides_setting(self):
+        self.assertEqual(purge_abandoned_carts(ttl=40 * 24 * 60 * 60).carts, 0)
+        self.assertEqual(CartItem.objects.count(), 6)
+
+@primary_only
+class ProductImageTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        seller = User.objects.create_user('vendeur')
+        buffer = io.BytesIO()
+        Image.new('RGB', (800, 600), 'red').save(buffer, 'JPEG')
+        self.product = create_product(seller)
+        self.product.image.save('chaise.jpg', ContentFile(buffer.getvalue()))
+
+    def test_shop_render_never_generates_variants(self):
+        for background in (False, True):
+            cache.clear()
+            with self.subTest(background=background), \
+                    override_settings(IMAGE_VARIANTS_IN_BACKGROUND=background), \
+                    mock.patch.object(images, '_run') as run, mock.patch.object(images, '_submit') as submit:
+                response = self.client.get(reverse('shop'))
+                self.assertContains(response, self.product.image.url)
+                run.assert_not_called()
+                self.assertEqual(submit.call_count, int(background))
+
+    def test_generated_variants_keep_catalog_version(self):
+        version = catalog_version()
+        self.assertTrue(images.generate_variants(self.product.pk))
+        self.assertEqual(catalog_version(), version)
+        self.product.refresh_from_db()
+        self.assertIsNotNone(images.variant_entry(self.product))
+
+
+class DefaultImageTests(SimpleTestCase):
+    """Images par défaut choisies sans requête, d'après l'id et la catégorie."""
+
+    def setUp(self):
+        self.addCleanup(images.resolve_placeholders)
+
+    def product(self, pk, slug=None):
+        category = Category(pk=1, name=slug, slug=slug) if slug else None
+        return Product(pk=pk, name='Chaise', category=category)
+
+    def test_choice_is_stable_per_product(self):
+        # crc32 de l'id : même image dans chaque processus, quel que soit PYTHONHASHSEED
+        self.assertEqual(images.default_image(self.product(1)), 'assets/img/shop/shop-4.jpg')
+        self.assertEqual(images.default_image(self.product(7)), 'assets/img/shop/shop-2.jpg')
+        self.assertEqual(len({images.default_image(self.product(pk)) for pk in range(1, 50)}), 5)
+
+    def test_category_placeholders(self):
+        self.assertEqual(images.default_image(self.product(7, 'maison-decoration')), 'assets/img/shop/armoir.jpeg')
+        self.assertEqual(images.default_image(self.product(7, 'mode-vetements')), 'assets/img/shop/shop-2.jpg')
+
+    def test_missing_category_files_fall_back_to_defaults(self):
+        with mock.patch.object(images, 'CATEGORY_PLACEHOLDERS', {'maison-decoration': ['absente.jpg']}):
+            images.resolve_placeholders()
+
+        self.assertEqual(images.default_image(self.product(7, 'maison-decoration')), 'assets/img/shop/shop-2.jpg')
+
+
+class AssetBundleTests(SimpleTestCase):
+
+    def test_build_css_minifies_and_hoists_at_rules(self):
+        css = assets.build_css([
+            '@charset "UTF-8";\n/* thème */\n.a  {\n  content: "x  /* y */";\n}\n',
+            '@import url("fonts.css");\n.b { background: url(../img/a b.png) ; }\n',
+        ])
+
+        self.assertTrue(css.startswith('@charset "UTF-8";@import url("fonts.css");'))
+        self.assertEqual((css.count('@charset'), css.count('@import')), (1, 1))
+        self.assertNotIn('thème', css)
+        self.assertIn('.a{content: "x  /* y */";}', css)
+        self.assertIn('.b{background: url(../img/a b.png);}', css)
+
+    def test_build_js_separates_files_and_drops_source_maps(self):
+        js = assets.build_js(['var a = 1\n//# sourceMappingURL=a.js.map', '(function () {})()'])
+
+        self.assertEqual(js, 'var a = 1\n\n;\n(function () {})()\n')
+
+    def test_collectstatic_builds_hashed_compressed_bundles(self):
+        source = tempfile.TemporaryDirectory()
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        files = {
+            'assets/css/a.css': ''.join(f'.c{i} {{ color: red; }}\n' for i in range(100)),
+            'assets/css/b.css': '.logo { background: url("../img/logo.png"); }\n',
+            'assets/img/logo.png': 'png',
+            'assets/js/a.js': 'var a = 1;\n',
+        }
+        for name, content in files.items():
+            path = os.path.join(source.name, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as fh:
+                fh.write(content)
+        bundles = {'site.css': ['assets/css/a.css', 'assets/css/b.css'], 'site.js': ['assets/js/a.js']}
+
+        with override_settings(STATICFILES_DIRS=[source.name], STATIC_ROOT=root.name,
+                               STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder']), \
+                mock.patch.object(assets, 'BUNDLES', bundles):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            hashed = staticfiles_storage.stored_name('assets/css/bundle-site.css')
+            css_tag = str(assets.bundle_tags('site.css'))
+            js_tag = str(assets.bundle_tags('site.js'))
+            with override_settings(DEBUG=True):
+                debug_tag = str(assets.bundle_tags('site.css'))
+
+        self.assertRegex(hashed, r'^assets/css/bundle-site\.[0-9a-f]{12}\.css$')
+        self.assertEqual(css_tag, f'<link rel="stylesheet" href="/static/{hashed}">')
+        self.assertIn('/static/assets/js/bundle-site.', js_tag)
+        with open(os.path.join(root.name, hashed), encoding='utf-8') as fh:
+            bundle = fh.read()
+        self.assertIn('.c99{color: red;}', bundle)
+        self.assertRegex(bundle, r'url\("\.\./img/logo\.[0-9a-f]{12}\.png"\)')
+        with open(os.path.join(root.name, hashed + '.gz'), 'rb') as fh:
+            self.assertEqual(gzip.decompress(fh.read()).decode(), bundle)
+        self.assertEqual(debug_tag.count('<link'), 2)
+
+@primary_only
+class SellerStatsSignalTests(TransactionTestCase):
+    """Recalculs après la transaction : transactions réelles."""
+
+    def setUp(self):
+        self.sellers = [User.objects.create_user(f'vendeur{i}') for i in range(2)]
+        buyer = User.objects.create_user('client')
+        self.order = Order.objects.create(user=buyer, total_price=6000)
+        for seller in self.sellers:
+            for name in ('Chaise', 'Table'):
+                OrderItem.objects.create(order=self.order, product=create_product(seller, name=name),
+                                         quantity=1, price=1500)
+
+    def test_order_delete_refreshes_each_seller_once(self):
+        with mock.patch.object(sellers, 'refresh_seller_stats', wraps=sellers.refresh_seller_stats) as refresh:
+            self.order.delete()
+
+        refresh.assert_called_once()
+        self.assertEqual(set(refresh.call_args.args[0]), {seller.pk for seller in self.sellers})
+        self.assertEqual(list(SellerStats.objects.values_list('order_count', 'units_sold').distinct()), [(0, 0)])
+
+    def test_rolled_back_delete_refreshes_nothing(self):
+        with mock.patch.object(sellers, 'refresh_seller_stats', wraps=sellers.refresh_seller_stats) as refresh:
+            with self.assertRaises(ZeroDivisionError), transaction.atomic():
+                self.order.items.first().delete()
+                1 / 0
+            refresh.assert_not_called()
+
+            self.order.delete()
+        refresh.assert_called_once()
+
+    def test_seller_delete_skips_refresh_of_deleted_seller(self):
+        self.sellers[0].delete()
+
+        self.assertEqual(list(SellerStats.objects.values_list('seller_id', 'order_count')),
+                         [(self.sellers[1].pk, 1)])
+
+
+@primary_only
+class SellerOrderHistoryTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('vendeur')
+        other_seller = User.objects.create_user('autre')
+        buyer = User.objects.create_user('client')
+        chair = create_product(cls.seller)
+        other = create_product(other_seller, name='Table')
+        cls.orders = []
+        # 10 mars 2025 : un lundi
+        for day, status, lines in [(10, 'pending', [(chair, 2, 10), (other, 1, 50)]),
+                                   (12, 'shipped', [(chair, 1, 5)]),
+                                   (12, 'cancelled', [(chair, 1, 100)]),
+                                   (17, 'pending', [(chair, 1, 7)])]:
+            order = Order.objects.create(user=buyer, total_price=0, status=status)
+            Order.objects.filter(pk=order.pk).update(
+                created_at=sellers.day_start(datetime.date(2025, 3, day)) + datetime.timedelta(hours=9))
+            for product, quantity, price in lines:
+                OrderItem.objects.create(order=order, product=product, quantity=quantity, price=price)
+            cls.orders.append(order)
+
+    def setUp(self):
+        cache.clear()
+
+    def series(self, period):
+        return [(point['start'].day, point['revenue'], point['units'], point['orders'])
+                for point in sellers.revenue_series(self.seller.pk, datetime.date(2025, 3, 10),
+                                                    datetime.date(2025, 3, 17), period)]
+
+    def test_revenue_series_by_day_and_week(self):
+        daily = self.series('day')
+        self.assertEqual(len(daily), 8)
+        self.assertEqual([point for point in daily if point[2]],
+                         [(10, 20, 2, 1), (12, 5, 1, 1), (17, 7, 1, 1)])
+        self.assertEqual(self.series('week'), [(10, 25, 3, 2), (17, 7, 1, 1)])
+
+    def test_past_months_are_cached_until_stats_refresh(self):
+        self.series('day')
+        with self.assertNumQueries(0):
+            self.series('day')
+
+        OrderItem.objects.filter(order=self.orders[3]).update(price=9)
+        self.assertEqual(self.series('day')[-1], (17, 7, 1, 1))
+        refresh_seller_stats([self.seller.pk])
+        self.assertEqual(self.series('day')[-1], (17, 9, 1, 1))
+
+    def test_seller_orders_filters_and_plans_agree(self):
+        start = sellers.day_start(datetime.date(2025, 3, 11))
+        for order_count in (0, sellers.LARGE_SELLER_ORDERS):
+            orders = sellers.seller_orders(self.seller, order_count=order_count)
+            self.assertEqual({order.pk for order in orders}, {order.pk for order in self.orders})
+            self.assertEqual(
+                {order.pk for order in sellers.seller_orders(self.seller, status='pending', start=start,
+                                                            order_count=order_count)},
+                {self.orders[3].pk})
+
+        first = sellers.seller_orders(self.seller).get(pk=self.orders[0].pk)
+        self.assertEqual([item.quantity for item in first.seller_items], [2])
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class RoutingTests(SimpleTestCase):
+    """Base choisie par le routeur et le middleware (aucune requête SQL)."""
+
+    router = PrimaryReplicaRouter()
+
+    def route(self, request, write=False):
+        """Bases des lectures de Product (avant, après l'éventuelle écriture) et réponse."""
+        routes = []
+
+        def view(request):
+            routes.append(self.router.db_for_read(Product))
+            if write:
+                self.router.db_for_write(Product)
+                routes.append(self.router.db_for_read(Product))
+            return HttpResponse()
+
+        response = StickyPrimaryMiddleware(view)(request)
+        return routes, response
+
+    def test_get_reads_from_replica(self):
+        routes, response = self.route(RequestFactory().get('/shop/'))
+        self.assertEqual(routes, ['replica1'])
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_models_outside_catalog_read_from_primary(self):
+        self.assertEqual(self.router.db_for_read(CartItem), 'default')
+
+    def test_post_reads_and_writes_on_primary(self):
+        routes, response = self.route(RequestFactory().post('/checkout/'), write=True)
+        self.assertEqual(routes, ['default', 'default'])
+        self.assertEqual(self.router.db_for_write(Product), 'default')
+
+    def test_write_pins_reads_and_sets_sticky_cookie(self):
+        routes, response = self.route(RequestFactory().get('/cart/add/1/'), write=True)
+        self.assertEqual(routes, ['replica1', 'default'])
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        request = RequestFactory().get('/shop/')
+        request.COOKIES[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+        routes, _ = self.route(request)
+        self.assertEqual(routes, ['default'])
+
+    def test_use_primary_forces_primary(self):
+        with use_primary():
+            self.assertEqual(self.router.db_for_read(Product), 'default')
+
+@primary_only
+class CatalogGeneratorTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+
+    def generate(self, seed):
+        """Données générées (sans ids ni dates), puis annulées."""
+        with transaction.atomic():
+            CatalogGenerator(random.Random(seed), batch_size=25).generate(
+                products=60, sellers=3, buyers=10, carts=4, orders=20)
+            data = (
+                list(Product.objects.order_by('name').values_list(
+                    'seller__username', 'category__slug', 'name', 'price', 'stock', 'is_active')),
+                sorted(OrderItem.objects.values_list(
+                    'order__user__username', 'order__status', 'product__name', 'quantity', 'price')),
+            )
+            transaction.set_rollback(True)
+        return data
+
+    def test_command_creates_requested_counts(self):
+        call_command('generate_catalog', products=60, sellers=3, buyers=10, carts=4, orders=20,
+                     batch_size=25, seed=1, stdout=io.StringIO())
+
+        self.assertEqual(Product.objects.count(), 60)
+        self.assertEqual(User.objects.filter(profile__role='vendeur').count(), 3)
+        self.assertEqual(User.objects.filter(profile__role='client').count(), 10)
+        self.assertEqual(CartSummary.objects.count(), 4)
+        self.assertEqual(CartItem.objects.values('user').distinct().count(), 4)
+        self.assertEqual(Order.objects.count(), 20)
+        self.assertEqual(SellerStats.objects.aggregate(total=Sum('product_count'))['total'], 60)
+
+    def test_same_seed_same_data(self):
+        first = self.generate(seed=42)
+
+        self.assertEqual(self.generate(seed=42), first)
+        self.assertNotEqual(self.generate(seed=43), first)
+
+@primary_only
+class ExportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('vendeur')
+        other_seller = User.objects.create_user('autre')
+        buyer = User.objects.create_user('client')
+        category = Category.objects.create(name='Maison', slug='maison')
+        cls.chair = create_product(cls.seller, category, sku='C-1', old_price=1200, discount_percentage=15)
+        cls.table = create_product(cls.seller, sku='T-1', name='Table; "ronde"', description='Deux\nlignes')
+        cls.lamp = create_product(other_seller, sku='L-1', name='Lampe')
+        cls.orders = []
+        for lines in ([(cls.chair, 2), (cls.lamp, 1)], [(cls.lamp, 3)], [(cls.table, 1)]):
+            order = Order.objects.create(user=buyer, total_price=0)
+            for product, quantity in lines:
+                OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+            cls.orders.append(order)
+
+    def catalog(self):
+        return list(Product.objects.filter(seller=self.seller).order_by('id').values(
+            'sku', 'name', 'category', 'description', 'price', 'old_price', 'discount_percentage',
+            'badge', 'stock', 'is_featured', 'is_active'))
+
+    def test_catalog_export_reimports_unchanged(self):
+        before = self.catalog()
+        for fmt in EXPORT_FORMATS:
+            with self.subTest(fmt=fmt):
+                data = ''.join(export_catalog(self.seller, fmt, chunk_size=1)).encode()
+                report = import_products(self.seller, io.BytesIO(data), fmt)
+
+                self.assertEqual((report.created, report.error_count), (0, 0))
+                self.assertEqual(self.catalog(), before)
+
+    def test_edited_catalog_export_updates_products(self):
+        data = ''.join(export_catalog(self.seller, 'csv')).replace('Table; ""ronde""', 'Table basse')
+        import_products(self.seller, io.BytesIO(data.encode()), 'csv')
+
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.name, 'Table basse')
+        self.assertEqual(Product.objects.filter(seller=self.seller).count(), 2)
+
+    def test_seller_order_export_lists_only_their_items(self):
+        rows = list(csv.DictReader(''.join(export_orders('csv', chunk_size=1, seller=self.seller))
+                                   .lstrip('\ufeff').splitlines()))
+        self.assertEqual([(int(row['order_id']), row['sku'], int(row['quantity'])) for row in rows],
+                         [(self.orders[0].pk, 'C-1', 2), (self.orders[2].pk, 'T-1', 1)])
+
+        orders = [json.loads(line) for line in export_orders('jsonl')]
+        self.assertEqual([[item['sku'] for item in order['items']] for order in orders],
+                         [['C-1', 'L-1'], ['L-1'], ['T-1']])
+
+@primary_only
+class ConditionalCatalogTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('vendeur')
+        cls.buyer = User.objects.create_user('client', password='secret')
+        cls.product = create_product(cls.seller)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeat_request_is_answered_without_rendering(self):
+        response = self.client.get(reverse('shop'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn('Cookie', response['Vary'])
+
+        with self.assertNumQueries(0):
+            repeat = self.client.get(reverse('shop'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat.templates, [])
+        since = self.client.get(reverse('shop'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(since.status_code, 304)
+
+    def test_catalog_change_gives_new_etag(self):
+        etag = self.client.get(reverse('shop'))['ETag']
+        self.product.price = 1500
+        self.product.save()
+
+        response = self.client.get(reverse('shop'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_cart_changes_personal_etag(self):
+        anonymous = self.client.get(reverse('shop'))['ETag']
+        self.client.force_login(self.buyer)
+        response = self.client.get(reverse('shop'))
+        self.assertNotEqual(response['ETag'], anonymous)
+        self.assertIn('private', response['Cache-Control'])
+
+        add_item(self.buyer, self.product)
+        response = self.client.get(reverse('shop'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+
+ASYNC_VIEWS = {'index': views.async_index, 'shop': views.async_shop, 'cart': views.async_cart}
+
+
+class AsyncUrls:
+    """Routes de app.urls avec les vues asynchrones (ASYNC_VIEWS=1), sans recharger le module."""
+    urlpatterns = [path(str(pattern.pattern), ASYNC_VIEWS.get(pattern.name, pattern.callback), name=pattern.name)
+                   for pattern in app_urls.urlpatterns]
+
+
+@primary_only
+class AsyncViewTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('vendeur')
+        cls.buyer = User.objects.create_user('client', password='secret')
+        category = Category.objects.create(name='Maison', slug='maison')
+        cls.products = [create_product(cls.seller, category, name=f'Produit {i}', price=10 + i)
+                        for i in range(3)]
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, name, **kwargs):
+        response = self.client.get(reverse(name), **kwargs)
+        with override_settings(ROOT_URLCONF=AsyncUrls):
+            self.assertIs(resolve(reverse(name)).func, ASYNC_VIEWS[name])
+            cache.clear()
+            async_response = async_to_sync(self.async_client.get)(reverse(name), **kwargs)
+        self.assertEqual((response.status_code, async_response.status_code), (200, 200))
+        return response, async_response
+
+    def test_pages_match_sync_views(self):
+        for name in ('index', 'shop'):
+            with self.subTest(name):
+                response, async_response = self.get(name)
+                self.assertEqual(async_response.content, response.content)
+
+        response, async_response = self.get('shop', data={'category': self.products[0].category_id})
+        self.assertEqual(async_response.content, response.content)
+        self.assertContains(async_response, 'Produit 2')
+
+    def test_async_shop_answers_conditional_requests(self):
+        with override_settings(ROOT_URLCONF=AsyncUrls):
+            response = async_to_sync(self.async_client.get)(reverse('shop'))
+            repeat = async_to_sync(self.async_client.get)(reverse('shop'),
+                                                          headers={'if-none-match': response['ETag']})
+
+        self.assertEqual(repeat.status_code, 304)
+
+    def test_cart_matches_sync_view(self):
+        for product in self.products[:2]:
+            add_item(self.buyer, product, 2)
+        self.client.force_login(self.buyer)
+        self.async_client.force_login(self.buyer)
+
+        response, async_response = self.get('cart')
+
+        for key in ('subtotal', 'is_authenticated'):
+            self.assertEqual(async_response.context[key], response.context[key])
+        self.assertEqual([(line.product, line.quantity) for line in async_response.context['items']],
+                         [(line.product, line.quantity) for line in response.context['items']])
+        self.assertEqual(async_response.context['cart_count'], 4)
+
+@primary_only
+class CheckoutIdempotencyTests(TransactionTestCase):
+    """Double envoi du formulaire : requêtes concurrentes de même clé."""
+
+    def test_concurrent_requests_with_same_key_create_one_order(self):
+        seller = User.objects.create_user('vendeur')
+        buyer = User.objects.create_user('client')
+        add_item(buyer, create_product(seller, stock=10))
+
+        results, errors = run_in_threads(lambda: checkout(buyer, idempotency_key='double-clic'),
+                                         [()] * 6)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(Order.objects.filter(user=buyer).count(), 1)
+        order = Order.objects.get(user=buyer)
+        self.assertEqual({result.order for result in results}, {order})
+        self.assertEqual(sum(not result.replayed for result in results), 1)
+        self.assertEqual(CheckoutRequest.objects.filter(user=buyer).count(), 1)
+
+
+@primary_only
+class CheckoutStockTests(TransactionTestCase):
+    """Commandes simultanées sur un produit presque épuisé : pas de survente."""
+
+    def test_concurrent_checkouts_never_oversell(self):
+        seller = User.objects.create_user('vendeur')
+        product = create_product(seller, stock=3)
+        buyers = [User.objects.create_user(f'client{i}') for i in range(8)]
+        for buyer in buyers:
+            add_item(buyer, product)
+
+        results, errors = run_in_threads(checkout, [(buyer,) for buyer in buyers])
+
+        self.assertEqual(errors, [])
+        product.refresh_from_db()
+        self.assertGreaterEqual(product.stock, 0)
+        self.assertEqual(Order.objects.count(), 3)
+        self.assertEqual(sum(result.order is not None for result in results), 3)
+        self.assertEqual(product.stock, 0)
+
+
+@primary_only
+class ConcurrentCartMergeTests(TransactionTestCase):
+
+    def test_concurrent_merges_add_up(self):
+        seller = User.objects.create_user('vendeur')
+        buyer = User.objects.create_user('client')
+        product = create_product(seller)
+        add_item(buyer, product)
+
+        _, errors = run_in_threads(merge_session_cart, [(buyer, {str(product.pk): 2})] * 4)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(CartItem.objects.get(user=buyer, product=product).quantity, 9)
+
+class TunedSQLiteTests(SimpleTestCase):
+    """Moteur app.db.sqlite3 : écrivains concurrents sur une base dans un fichier."""
+
+    WRITERS = 8
+    WRITES = 25
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.settings_dict = {**connection.settings_dict, 'ENGINE': 'app.db.sqlite3',
+                              'NAME': os.path.join(directory.name, 'tuned.sqlite3'), 'OPTIONS': {}}
+        with self.connect() as db, db.cursor() as cursor:
+            cursor.execute('CREATE TABLE counter (value INTEGER NOT NULL)')
+            cursor.execute('INSERT INTO counter (value) VALUES (0)')
+            cursor.execute('CREATE TABLE event (writer INTEGER NOT NULL)')
+
+    def connect(self):
+        return contextlib.closing(TunedDatabaseWrapper(dict(self.settings_dict), alias='tuned'))
+
+    def write(self, writer):
+        with self.connect() as db:
+            for _ in range(self.WRITES):
+                # Lecture puis écriture dans une transaction, ouverte comme
+                # par atomic() (BEGIN IMMEDIATE)
+                db.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+                with db.cursor() as cursor:
+                    cursor.execute('SELECT value FROM counter')
+                    value = cursor.fetchone()[0]
+                    cursor.execute('UPDATE counter SET value = %s', [value + 1])
+                db.commit()
+                db.set_autocommit(True)
+                # Instruction isolée, hors transaction
+                with db.cursor() as cursor:
+                    cursor.execute('INSERT INTO event (writer) VALUES (%s)', [writer])
+
+    def test_concurrent_writers_are_not_locked_out(self):
+        _, errors = run_in_threads(self.write, [(i,) for i in range(self.WRITERS)])
+
+        self.assertEqual([str(error) for error in errors], [])
+        with self.connect() as db, db.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('SELECT value FROM counter')
+            # Aucune mise à jour perdue : les lectures-écritures sont sérialisées
+            self.assertEqual(cursor.fetchone()[0], self.WRITERS * self.WRITES)
+            cursor.execute('SELECT COUNT(*) FROM event')
+            self.assertEqual(cursor.fetchone()[0], self.WRITERS * self.WRITES)
+
+@primary_only
+class ProductImportTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('vendeur')
+
+    def import_csv(self, text, **kwargs):
+        return import_products(self.seller, io.BytesIO(text.encode()), 'csv', **kwargs)
+
+    def test_stock_column_is_optional(self):
+        report = self.import_csv('sku,name,price\nT-1,Table,2500\n')
+
+        self.assertEqual((report.created, report.error_count), (1, 0))
+        self.assertEqual(Product.objects.get(sku='T-1').stock, 0)
+
+    def test_conflicting_row_rejects_only_itself(self):
+        first = create_product(self.seller, sku='A-1')
+        create_product(self.seller, sku='B-1')
+        # La ligne 3 donne à A-1 la référence de B-1 : seule elle est rejetée
+        report = self.import_csv(f'id,sku,name,price\n,C-1,Lampe,300\n{first.pk},B-1,Chaise,900\n'
+                                 f',D-1,Tapis,700\n')
+
+        self.assertEqual((report.created, report.updated, report.error_count), (2, 0, 1))
+        self.assertEqual(report.errors[0][0], 3)
+        self.assertQuerySetEqual(Product.objects.filter(seller=self.seller).order_by('sku')
+                                 .values_list('sku', flat=True), ['A-1', 'B-1', 'C-1', 'D-1'])
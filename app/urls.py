@@ -1,13 +1,20 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+# Déploiement ASGI (ASYNC_VIEWS) : variantes asynchrones des pages en lecture
+if settings.ASYNC_VIEWS:
+    index, shop, cart = views.async_index, views.async_shop, views.async_cart
+else:
+    index, shop, cart = views.index, views.shop, views.cart
+
 urlpatterns = [
-    path('', views.index, name='index'),
+    path('', index, name='index'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('inscription/', views.inscription, name='inscription'),
-    path('shop/', views.shop, name='shop'),
-    path('cart/', views.cart, name='cart'),
+    path('shop/', shop, name='shop'),
+    path('cart/', cart, name='cart'),
     path('cart/add/<int:product_id>/', views.add_to_cart, name='add_to_cart'),
     path('cart/remove/<int:item_id>/', views.remove_from_cart, name='remove_from_cart'),
     path('cart/update/<int:item_id>/', views.update_cart_item, name='update_cart_item'),
@@ -16,5 +23,10 @@ urlpatterns = [
     path('Apropos/', views.Apropos, name='Apropos'),
     path('add_product/', views.add_product, name='add_product'),
     path('vendeur_dashboard/', views.vendeur_dashboard, name='vendeur_dashboard'),
+    path('vendeur_dashboard/commandes/', views.vendeur_orders, name='vendeur_orders'),
+    path('vendeur_dashboard/import/', views.vendeur_import, name='vendeur_import'),
+    path('vendeur_dashboard/export/', views.vendeur_export_catalog, name='vendeur_export_catalog'),
+    path('vendeur_dashboard/chiffre-affaires/', views.vendeur_revenue, name='vendeur_revenue'),
+    path('exports/commandes/', views.export_orders_view, name='export_orders'),
     path('admin_dashboard/', views.admin_dashboard, name='admin_dashboard'),
 ]
@@ -1,21 +1,68 @@
+import datetime
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import login, logout
+from django.contrib.auth.models import User
 from django.contrib import messages
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 
 from .models import Product
 from .models import CartItem, Order, OrderItem
-from django.views.decorators.cache import cache_page
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django.db.models import F, Sum
-from .forms import RegistrationForm, LoginForm, ProductForm
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.functional import SimpleLazyObject
+from .forms import RegistrationForm, LoginForm, ProductForm, ProductImportForm
+from .cart import acart_lines, add_item, cart_lines, merge_session_cart, refresh_user_summary
+from .catalog import (acategory_counts, afacet_counts, catalog_modified, catalog_version, category_counts,
+                      facet_counts, local_timeout)
+from .checkout import checkout
+from .context_processors import aload_request_context
+from .db.routing import pin_primary_if_recent
+from .exports import CONTENT_TYPES, EXPORT_FORMATS, export_catalog, export_orders
+from .guest_cart import CartFull, get_guest_cart
+from .http_cache import catalog_page
+from .product_import import ImportFormatError, detect_format, import_products
+from .pagination import DEFAULT_SORT, SEARCH_SORT, SHOP_SORTS, keyset_page
+from .search import search_products
+from .sellers import (SERIES_MAX_DAYS, SERIES_PERIODS, day_start, get_seller_stats, revenue_series,
+                      seller_orders)
+
+# Durée de vie des fragments de la boutique : l'invalidation se fait par la
+# version du catalogue, la durée ne sert qu'à libérer la mémoire du cache
+# (ramenée à catalog.LOCAL_CACHE_TIMEOUT dans un cache propre au processus).
+SHOP_FRAGMENT_TIMEOUT = 60 * 60
+SHOP_PER_PAGE = 9
+
+# Commandes récentes listées sur le tableau de bord vendeur, puis
+# historique complet paginé par curseur
+DASHBOARD_RECENT_ORDERS = 20
+ORDER_HISTORY_PER_PAGE = 25
+ORDER_HISTORY_SORT = '-created_at'
+
+# Vues asynchrones (ASGI, settings.ASYNC_VIEWS) : les données sont lues par
+# l'ORM asynchrone, puis le rendu, synchrone, se fait dans le thread des vues
+# synchrones ; les fragments paresseux de la boutique y sont lus au besoin.
+_arender = sync_to_async(render)
 
 
 def index(request):
     return render(request, 'index.html')
 
 
+async def async_index(request):
+    # Pas de compteur du panier sur l'accueil
+    await aload_request_context(request, cart_summary=False)
+    return await _arender(request, 'index.html')
+
+
 def login_view(request):
     """Vue de connexion. Redirige selon le rôle après login."""
     if request.user.is_authenticated:
@@ -29,33 +76,17 @@ def login_view(request):
         if form.is_valid():
             user = form.cleaned_data['user']
             
-            # AVANT de connecter : récupérer le panier session
-            session_cart = request.session.get('cart', {})
+            # AVANT de connecter : récupérer le panier visiteur
+            guest_cart = get_guest_cart(request)
             
             login(request, user)
             
-            # APRÈS connexion : transférer le panier session vers la BD
-            if session_cart:
-                for product_id, quantity in session_cart.items():
-                    try:
-                        product = Product.objects.get(pk=int(product_id), is_active=True)
-                        cart_item, created = CartItem.objects.get_or_create(
-                            user=user,
-                            product=product
-                        )
-                        if not created:
-                            # Additionner les quantités
-                            cart_item.quantity = F('quantity') + quantity
-                            cart_item.save(update_fields=['quantity'])
-                        else:
-                            cart_item.quantity = quantity
-                            cart_item.save(update_fields=['quantity'])
-                    except Product.DoesNotExist:
-                        pass
+            # APRÈS connexion : transférer le panier visiteur vers la BD
+            if guest_cart.items:
+                merge_session_cart(user, guest_cart.items)
                 
-                # Vider le panier session
-                request.session['cart'] = {}
-                request.session.modified = True
+                # Vider le panier visiteur
+                guest_cart.clear()
                 messages.info(request, "Votre panier a été transféré avec succès.")
             
             # Créer un profil si n'existe pas (cas superuser)
@@ -85,120 +116,155 @@ def logout_view(request):
     return redirect('index')
 
 
-@cache_page(60)
+@catalog_page
 def shop(request):
-    """Affiche tous les produits actifs dans la boutique, avec pagination."""
-    from django.core.paginator import Paginator
-    from .models import Category
+    """
+    Affiche tous les produits actifs dans la boutique, paginés par curseur.
+
+    La grille, la pagination et les catégories sont des fragments mis en
+    cache (voir shop.html) sous la version du catalogue : les parties propres
+    à l'utilisateur (panier, messages, connexion) sont rendues à chaque
+    requête, et toute écriture de Product/Category périme les fragments.
+    Les requêtes produits et catégories sont paresseuses : elles ne partent
+    que si le fragment correspondant n'est pas en cache. Une page déjà vue
+    et inchangée est confirmée par un 304 sans rendu (app.http_cache).
+    """
+    # Fragments mis en cache sous une version toute neuve : lus sur la base
+    # principale tant que les réplicas peuvent être en retard
+    pin_primary_if_recent(catalog_modified())
+
+    qs = _shop_products()
+    query, sort_by, category_id = _shop_filters(request)
+
+    # Compteurs par catégorie en une requête groupée : globaux (en cache,
+    # ajustés par signaux) ou, pendant une recherche, restreints aux résultats
+    version = catalog_version()
+    if query:
+        counts = facet_counts(search_products(qs, query), _facet_key(version, query))
+    else:
+        counts = category_counts()
 
-    qs = Product.objects.filter(is_active=True).select_related('seller', 'category').order_by('-created_at')
+    context = _shop_context(request, qs, query, sort_by, category_id, counts, version)
+    return render(request, 'shop.html', context)
 
-    # Filtrer par catégorie si spécifié
-    category_id = request.GET.get('category')
-    if category_id:
-        qs = qs.filter(category_id=category_id)
 
-    # Tri
-    sort_by = request.GET.get('sort', '-created_at')
-    if sort_by == 'price_asc':
-        qs = qs.order_by('price')
-    elif sort_by == 'price_desc':
-        qs = qs.order_by('-price')
-    elif sort_by == 'name':
-        qs = qs.order_by('name')
-    elif sort_by == 'rating':
-        qs = qs.order_by('-rating')
+@catalog_page
+async def async_shop(request):
+    """shop() sous ASGI : compteurs lus en asynchrone, grille et catégories toujours paresseuses."""
+    pin_primary_if_recent(catalog_modified())
+
+    qs = _shop_products()
+    query, sort_by, category_id = _shop_filters(request)
+    version = catalog_version()
+    if query:
+        counts = await afacet_counts(search_products(qs, query), _facet_key(version, query))
     else:
-        qs = qs.order_by('-created_at')
+        counts = await acategory_counts()
+
+    context = _shop_context(request, qs, query, sort_by, category_id, counts, version)
+    return await _arender(request, 'shop.html', context)
+
+
+def _shop_products():
+    return Product.objects.filter(is_active=True).select_related('seller', 'category')
 
-    # Pagination (9 produits par page)
-    page_number = request.GET.get('page', 1)
-    paginator = Paginator(qs, 9)
-    products = paginator.get_page(page_number)
 
-    # Récupérer toutes les catégories actives
-    categories = Category.objects.filter(is_active=True).order_by('name')
+def _shop_filters(request):
+    """Recherche, tri et catégorie demandés ; valeurs invalides ignorées."""
+    # Recherche plein texte (FTS5), combinable avec la catégorie et les tris
+    query = request.GET.get('q', '').strip()
+    sort_by = request.GET.get('sort') or (SEARCH_SORT if query else DEFAULT_SORT)
+    if sort_by not in SHOP_SORTS or (sort_by == SEARCH_SORT and not query):
+        sort_by = DEFAULT_SORT
 
-    context = {
-        'products': products,  # Page object
-        'paginator': paginator,
-        'total_count': paginator.count,
-        'categories': categories,
+    category_id = request.GET.get('category', '')
+    if not category_id.isdigit():
+        category_id = ''
+    return query, sort_by, category_id
+
+
+def _facet_key(version, query):
+    return f"shop:facets:{version}:" + hashlib.md5(query.lower().encode()).hexdigest()
+
+
+def _shop_context(request, qs, query, sort_by, category_id, counts, version):
+    from .models import Category
+
+    # Filtrer par catégorie si spécifié
+    if category_id:
+        qs = qs.filter(category_id=category_id)
+        total_count = counts.get(int(category_id), 0)
+    else:
+        total_count = sum(counts.values())
+
+    # Tri + pagination par curseur (9 produits par page) : pas d'OFFSET,
+    # chaque page est un parcours d'index à partir du curseur.
+    if query:
+        qs = search_products(qs, query, ranked=(sort_by == SEARCH_SORT))
+    cursor = request.GET.get('cursor', '')
+    products = keyset_page(qs, sort_by, cursor, per_page=SHOP_PER_PAGE)
+
+    # Récupérer toutes les catégories actives, avec leur nombre de produits
+    def active_categories():
+        categories = list(Category.objects.filter(is_active=True).order_by('name'))
+        for category in categories:
+            category.active_product_count = counts.get(category.id, 0)
+        return categories
+
+    return {
+        'products': products,  # KeysetPage
+        'total_count': total_count,
+        'categories': SimpleLazyObject(active_categories),
         'current_category': category_id,
         'current_sort': sort_by,
+        'current_query': query,
+        'current_cursor': cursor,
+        'catalog_version': version,
+        'fragment_timeout': local_timeout(SHOP_FRAGMENT_TIMEOUT),
     }
-    return render(request, 'shop.html', context)
+
 
 def cart(request):
-    """Affiche le panier - base de données pour utilisateurs connectés, session pour les autres"""
-    items = []
-    subtotal = 0
-    
-    if request.user.is_authenticated:
-        # Utilisateur connecté : récupérer depuis la base de données
-        items = (CartItem.objects
-                 .filter(user=request.user)
-                 .select_related('product'))
-        subtotal = sum([item.get_total_price() for item in items])
-    else:
-        # Utilisateur non connecté : utiliser la session temporairement
-        cart_data = request.session.get('cart', {})
-        for product_id, quantity in cart_data.items():
-            try:
-                product = Product.objects.get(pk=product_id, is_active=True)
-                # Créer un objet temporaire (non sauvegardé en BD)
-                # Utiliser product.id comme identifiant temporaire
-                class TempCartItem:
-                    def __init__(self, prod, qty):
-                        self.id = prod.id  # ID du produit pour les formulaires
-                        self.product = prod
-                        self.quantity = qty
-                    
-                    def get_total_price(self):
-                        return self.product.price * self.quantity
-                
-                temp_item = TempCartItem(product, quantity)
-                items.append(temp_item)
-                subtotal += product.price * quantity
-            except Product.DoesNotExist:
-                pass
-    
-    context = {
+    """Affiche le panier - base de données pour utilisateurs connectés, panier visiteur pour les autres"""
+    # Une requête quel que soit le nombre de lignes, en base comme pour un visiteur
+    items, subtotal = cart_lines(request)
+    return render(request, 'cart.html', _cart_context(request, items, subtotal))
+
+
+async def async_cart(request):
+    """cart() sous ASGI : lignes du panier lues par l'ORM asynchrone."""
+    await aload_request_context(request, cart_summary=False)
+    items, subtotal = await acart_lines(request)
+    return await _arender(request, 'cart.html', _cart_context(request, items, subtotal))
+
+
+def _cart_context(request, items, subtotal):
+    return {
         'items': items,
         'subtotal': subtotal,
         'is_authenticated': request.user.is_authenticated,
+        # Clé d'idempotence du formulaire de commande : un double envoi
+        # (double clic, rechargement) ne crée qu'une seule commande
+        'checkout_key': uuid.uuid4().hex,
     }
-    return render(request, 'cart.html', context)
 
 
 def add_to_cart(request, product_id: int):
-    """Ajoute un produit au panier - BD pour connectés, session sinon"""
+    """Ajoute un produit au panier - BD pour connectés, panier visiteur sinon"""
     product = get_object_or_404(Product, pk=product_id, is_active=True)
     
     if request.user.is_authenticated:
         # Utilisateur connecté : enregistrer directement dans la base de données
-        cart_item, created = CartItem.objects.get_or_create(
-            user=request.user, 
-            product=product
-        )
-        if not created:
-            cart_item.quantity = F('quantity') + 1
-            cart_item.save(update_fields=['quantity'])
-            cart_item.refresh_from_db()
+        add_item(request.user, product)
         messages.success(request, f"'{product.name}' ajouté au panier (BD).")
     else:
-        # Utilisateur non connecté : stocker dans la session
-        cart = request.session.get('cart', {})
-        product_id_str = str(product_id)
-        
-        if product_id_str in cart:
-            cart[product_id_str] += 1
-        else:
-            cart[product_id_str] = 1
-        
-        request.session['cart'] = cart
-        request.session.modified = True
-        messages.success(request, f"'{product.name}' ajouté au panier (session). Connectez-vous pour sauvegarder.")
+        # Utilisateur non connecté : panier visiteur (session ou cookie)
+        try:
+            get_guest_cart(request).add(product)
+        except CartFull:
+            messages.error(request, "Votre panier est plein. Connectez-vous pour ajouter d'autres articles.")
+            return redirect('cart')
+        messages.success(request, f"'{product.name}' ajouté au panier. Connectez-vous pour sauvegarder.")
     
     return redirect('cart')
 
@@ -208,16 +274,13 @@ def remove_from_cart(request, item_id: int):
     if request.user.is_authenticated:
         # Utilisateur connecté : supprimer de la BD
         item = get_object_or_404(CartItem, pk=item_id, user=request.user)
-        item.delete()
+        with transaction.atomic():
+            item.delete()
+            refresh_user_summary(request.user)
         messages.success(request, "Article retiré du panier.")
     else:
-        # Utilisateur non connecté : retirer de la session
-        cart = request.session.get('cart', {})
-        product_id_str = str(item_id)
-        if product_id_str in cart:
-            del cart[product_id_str]
-            request.session['cart'] = cart
-            request.session.modified = True
+        # Utilisateur non connecté : retirer du panier visiteur
+        if get_guest_cart(request).remove(item_id):
             messages.success(request, "Article retiré du panier.")
     
     return redirect('cart')
@@ -232,57 +295,53 @@ def update_cart_item(request, item_id: int):
         # Utilisateur connecté : mise à jour BD
         item = get_object_or_404(CartItem, pk=item_id, user=request.user)
         
-        if action == 'inc':
-            item.quantity = F('quantity') + 1
-            item.save(update_fields=['quantity'])
-            item.refresh_from_db()
-        elif action == 'dec':
-            if item.quantity > 1:
-                item.quantity = F('quantity') - 1
+        with transaction.atomic():
+            if action == 'inc':
+                item.quantity = F('quantity') + 1
                 item.save(update_fields=['quantity'])
-                item.refresh_from_db()
-            else:
-                item.delete()
-                messages.info(request, "Article retiré (quantité 0).")
-                return redirect('cart')
-        elif qty is not None:
-            try:
-                q = int(qty)
-                if q <= 0:
+            elif action == 'dec':
+                if item.quantity > 1:
+                    item.quantity = F('quantity') - 1
+                    item.save(update_fields=['quantity'])
+                else:
                     item.delete()
                     messages.info(request, "Article retiré (quantité 0).")
-                    return redirect('cart')
-                item.quantity = q
-                item.save(update_fields=['quantity'])
-            except ValueError:
-                messages.error(request, "Quantité invalide.")
+            elif qty is not None:
+                try:
+                    q = int(qty)
+                    if q <= 0:
+                        item.delete()
+                        messages.info(request, "Article retiré (quantité 0).")
+                    else:
+                        item.quantity = q
+                        item.save(update_fields=['quantity'])
+                except ValueError:
+                    messages.error(request, "Quantité invalide.")
+            refresh_user_summary(request.user)
     else:
-        # Utilisateur non connecté : mise à jour session
-        cart = request.session.get('cart', {})
-        product_id_str = str(item_id)
+        # Utilisateur non connecté : mise à jour du panier visiteur
+        cart = get_guest_cart(request)
+        quantity = cart.items.get(str(item_id))
         
-        if product_id_str in cart:
+        if quantity is not None:
             if action == 'inc':
-                cart[product_id_str] += 1
+                cart.set_quantity(item_id, quantity + 1)
             elif action == 'dec':
-                if cart[product_id_str] > 1:
-                    cart[product_id_str] -= 1
+                if quantity > 1:
+                    cart.set_quantity(item_id, quantity - 1)
                 else:
-                    del cart[product_id_str]
+                    cart.remove(item_id)
                     messages.info(request, "Article retiré (quantité 0).")
             elif qty is not None:
                 try:
                     q = int(qty)
                     if q <= 0:
-                        del cart[product_id_str]
+                        cart.remove(item_id)
                         messages.info(request, "Article retiré (quantité 0).")
                     else:
-                        cart[product_id_str] = q
+                        cart.set_quantity(item_id, q)
                 except ValueError:
                     messages.error(request, "Quantité invalide.")
-            
-            request.session['cart'] = cart
-            request.session.modified = True
     
     return redirect('cart')
 
@@ -314,15 +373,8 @@ def chechkout(request):
 
 @login_required
 def checkout_now(request):
-    # Crée une commande à partir du panier courant, puis vide le panier.
-    items = (CartItem.objects
-             .filter(user=request.user)
-             .select_related('product'))
-    if not items.exists():
-        messages.info(request, "Votre panier est vide.")
-        return redirect('cart')
-
-    subtotal = sum([item.get_total_price() for item in items])
+    # Crée une commande à partir du panier courant (transaction unique avec
+    # réservation du stock), puis retire du panier les lignes servies.
 
     # Récupérer des infos d'adresse basiques (si disponibles)
     shipping_address = ""
@@ -332,29 +384,22 @@ def checkout_now(request):
         shipping_address = p.address or ""
         phone = p.phone or ""
 
-    order = Order.objects.create(
-        user=request.user,
-        total_price=subtotal,
-        shipping_address=shipping_address,
-        phone=phone,
-    )
+    key = request.POST.get('idempotency_key') or request.headers.get('Idempotency-Key', '')
+    result = checkout(request.user, shipping_address=shipping_address, phone=phone,
+                      idempotency_key=key)
+    if result.replayed:
+        messages.info(request, f"Commande #{result.order.id} déjà enregistrée.")
+        return redirect('index')
 
-    bulk_items = []
-    for ci in items:
-        bulk_items.append(OrderItem(
-            order=order,
-            product=ci.product,
-            quantity=ci.quantity,
-            price=ci.product.price,
-        ))
-        # Optionnel: décrémenter le stock si nécessaire
-        # ci.product.stock = F('stock') - ci.quantity
-        # ci.product.save(update_fields=['stock'])
-
-    OrderItem.objects.bulk_create(bulk_items)
-    items.delete()
-
-    messages.success(request, f"Commande #{order.id} créée avec succès.")
+    for line in result.rejected:
+        messages.warning(request, f"'{line.product.name}' x {line.quantity} : {line.reason}. "
+                                  "L'article reste dans votre panier.")
+    if result.order is None:
+        if not result.lines:
+            messages.info(request, "Votre panier est vide.")
+        return redirect('cart')
+
+    messages.success(request, f"Commande #{result.order.id} créée avec succès.")
     return redirect('index')
 
 
@@ -396,14 +441,177 @@ def vendeur_dashboard(request):
         return redirect('index')
 
     products = Product.objects.filter(seller=request.user).order_by('-created_at')
-    
-    # Récupérer les commandes liées aux produits du vendeur
-    from .models import Order
-    orders = Order.objects.filter(items__product__seller=request.user).distinct().order_by('-created_at')
-    
+
+    # Totaux lus dans SellerStats (une recherche par clé primaire)
+    stats = get_seller_stats(request.user)
+
+    # Dernières commandes contenant ses produits : une requête pour les
+    # commandes, une pour leurs articles (les siens seulement) et produits ;
+    # l'historique complet est paginé dans vendeur_orders
+    orders = (seller_orders(request.user, order_count=stats.order_count)
+              .order_by('-created_at', '-id')[:DASHBOARD_RECENT_ORDERS])
+
     return render(request, 'vendeur_dashboard.html', {
         'products': products,
-        'orders': orders
+        'orders': orders,
+        'stats': stats,
+    })
+
+
+def _date_param(request, name):
+    """Date AAAA-MM-JJ lue dans la query string, ou None si absente/invalide."""
+    try:
+        return parse_date(request.GET.get(name, ''))
+    except ValueError:
+        return None
+
+
+@login_required
+def vendeur_orders(request):
+    """Historique des commandes du vendeur : pagination par curseur, filtres statut/dates"""
+    if not hasattr(request.user, 'profile') or request.user.profile.role != 'vendeur':
+        messages.error(request, "Vous n'êtes pas un vendeur.")
+        return redirect('index')
+
+    status = request.GET.get('status', '')
+    if status not in dict(Order.STATUS_CHOICES):
+        status = ''
+    date_from = _date_param(request, 'date_from')
+    date_to = _date_param(request, 'date_to')
+
+    orders = seller_orders(
+        request.user,
+        order_count=get_seller_stats(request.user).order_count,
+        status=status,
+        start=day_start(date_from) if date_from else None,
+        end=day_start(date_to + datetime.timedelta(days=1)) if date_to else None,
+    )
+    page_obj = keyset_page(orders, ORDER_HISTORY_SORT, request.GET.get('cursor'),
+                           per_page=ORDER_HISTORY_PER_PAGE)
+
+    filters = {'status': status,
+               'date_from': date_from.isoformat() if date_from else '',
+               'date_to': date_to.isoformat() if date_to else ''}
+    return render(request, 'vendeur_orders.html', {
+        'page_obj': page_obj,
+        'orders': page_obj,
+        'status_choices': Order.STATUS_CHOICES,
+        'filters': filters,
+        'filter_query': urlencode({key: value for key, value in filters.items() if value}),
+    })
+
+
+@login_required
+def vendeur_import(request):
+    """Import en masse (CSV / JSONL) dans le catalogue du vendeur, avec rapport ligne à ligne"""
+    if not hasattr(request.user, 'profile') or request.user.profile.role != 'vendeur':
+        messages.error(request, "Vous devez être vendeur pour accéder à cette page.")
+        return redirect('index')
+
+    report = None
+    if request.method == 'POST':
+        form = ProductImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                report = import_products(request.user, upload.file, detect_format(upload.name))
+            except ImportFormatError as exc:
+                messages.error(request, f"Import interrompu : {exc}")
+            else:
+                level = messages.warning if report.error_count else messages.success
+                level(request, f"Import terminé : {report.created} produit(s) créé(s), "
+                               f"{report.updated} mis à jour, {report.error_count} ligne(s) en erreur.")
+        else:
+            messages.error(request, "Veuillez choisir un fichier .csv ou .jsonl.")
+    else:
+        form = ProductImportForm()
+
+    return render(request, 'vendeur_import.html', {'form': form, 'report': report})
+
+
+def _export_response(chunks, fmt, name):
+    response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[fmt])
+    filename = f"{name}-{timezone.localdate():%Y%m%d}.{fmt}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_required
+def vendeur_export_catalog(request):
+    """Catalogue du vendeur en CSV / JSONL (colonnes de l'import), envoyé en flux"""
+    if not hasattr(request.user, 'profile') or request.user.profile.role != 'vendeur':
+        messages.error(request, "Vous devez être vendeur pour accéder à cette page.")
+        return redirect('index')
+
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    return _export_response(export_catalog(request.user, fmt), fmt, f"catalogue-{request.user.username}")
+
+
+@login_required
+def export_orders_view(request):
+    """
+    Export des commandes et de leurs articles (staff), envoyé en flux.
+
+    ?format=csv|jsonl&status=…&date_from=AAAA-MM-JJ&date_to=AAAA-MM-JJ&seller=<nom d'utilisateur>
+    """
+    if not request.user.is_staff:
+        messages.error(request, "Accès non autorisé.")
+        return redirect('index')
+
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        fmt = 'csv'
+    status = request.GET.get('status', '')
+    if status not in dict(Order.STATUS_CHOICES):
+        status = ''
+    date_from = _date_param(request, 'date_from')
+    date_to = _date_param(request, 'date_to')
+    seller = None
+    if request.GET.get('seller'):
+        seller = get_object_or_404(User, username=request.GET['seller'])
+
+    chunks = export_orders(
+        fmt,
+        seller=seller,
+        status=status,
+        start=day_start(date_from) if date_from else None,
+        end=day_start(date_to + datetime.timedelta(days=1)) if date_to else None,
+    )
+    return _export_response(chunks, fmt, f"commandes-{seller.username}" if seller else "commandes")
+
+
+@login_required
+def vendeur_revenue(request):
+    """
+    Série du chiffre d'affaires du vendeur (JSON) pour les graphiques.
+
+    ?period=day|week&date_from=AAAA-MM-JJ&date_to=AAAA-MM-JJ ; par défaut
+    les 30 derniers jours (day) ou les 52 dernières semaines (week).
+    """
+    if not hasattr(request.user, 'profile') or request.user.profile.role != 'vendeur':
+        return JsonResponse({'error': "Vous n'êtes pas un vendeur."}, status=403)
+
+    period = request.GET.get('period', 'day')
+    if period not in SERIES_PERIODS:
+        period = 'day'
+    date_to = _date_param(request, 'date_to') or timezone.localdate()
+    default_span = 30 if period == 'day' else 52 * 7
+    date_from = _date_param(request, 'date_from') or date_to - datetime.timedelta(days=default_span - 1)
+    # Fenêtre bornée : au plus SERIES_MAX_DAYS jours
+    date_from = max(date_from, date_to - datetime.timedelta(days=SERIES_MAX_DAYS - 1))
+
+    points = revenue_series(request.user.pk, date_from, date_to, period)
+    return JsonResponse({
+        'period': period,
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'points': [
+            {'start': point['start'].isoformat(), 'revenue': str(point['revenue']),
+             'units': point['units'], 'orders': point['orders']}
+            for point in points
+        ],
     })
 
 
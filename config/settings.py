@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -52,8 +53,14 @@ STATICFILES_DIRS = [
     BASE_DIR / "app" / "static",
 ]
 MIDDLEWARE = [
+    # Opt-in (QUERY_INSTRUMENTATION) ; en tête pour tout compter
+    'app.instrumentation.QueryBudgetMiddleware',
+    # Base des lectures (réplicas / principale) de chaque requête
+    'app.db.routing.StickyPrimaryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    # Enregistre le panier des visiteurs (session ou cookie) ; après les sessions
+    'app.guest_cart.GuestCartMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -66,6 +73,12 @@ ROOT_URLCONF = 'config.urls'
 
 
 WSGI_APPLICATION = 'config.wsgi.application'
+# Variantes asynchrones des pages en lecture (accueil, boutique, panier),
+# pour un déploiement ASGI : ASYNC_VIEWS=1 dans l'environnement. Mesurer
+# d'abord avec la commande benchmark_asgi : sur SQLite, l'ORM asynchrone
+# passe par un seul thread et WSGI reste plus rapide. Sous WSGI, chaque vue
+# asynchrone coûterait une boucle d'événements par requête.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS') == '1'
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -89,9 +102,30 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Base de test dans un fichier : les tests de concurrence (app.tests)
+        # ouvrent une connexion par thread, impossible sur une base en mémoire
+        'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
     }
 }
 
+# Moteur SQLite de production (app.db.sqlite3) : journal WAL, pragmas par
+# connexion, BEGIN IMMEDIATE et réessais sur verrou. Activé avec
+# SQLITE_TUNED=1 dans l'environnement (voir la commande stress_sqlite).
+if os.environ.get('SQLITE_TUNED') == '1':
+    DATABASES['default']['ENGINE'] = 'app.db.sqlite3'
+
+# Réplicas en lecture du catalogue (app.db.routing) : chemins de copies de
+# la base, séparés par des virgules dans DATABASE_REPLICAS (environnement)
+DATABASE_REPLICAS = []
+for _index, _path in enumerate(filter(None, os.environ.get('DATABASE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica{_index}'] = {**DATABASES['default'], 'NAME': _path.strip(),
+                                     'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{_index}')
+DATABASE_ROUTERS = ['app.db.routing.PrimaryReplicaRouter']
+# Après une écriture, lectures sur la base principale pendant ce délai
+# (retard maximal attendu des réplicas)
+REPLICA_STICKY_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,6 +162,14 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+# Cible de collectstatic : bundles CSS/JS, noms hachés et versions
+# précompressées (app.assets), à servir par le serveur web avec un cache long
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'app.assets.BundledManifestStorage'},
+}
 
 # Media files (Uploaded by users)
 MEDIA_URL = '/media/'
@@ -143,7 +185,10 @@ LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 
-# Simple cache en mémoire (développement) pour accélérer les vues fréquemment consultées
+# Simple cache en mémoire (développement) pour accélérer les vues fréquemment consultées.
+# Propre à chaque processus : en production, un cache partagé (Redis,
+# Memcached, FileBasedCache) pour que version du catalogue et fragments
+# soient les mêmes pour tous les workers (vérifié par check --deploy).
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
@@ -151,6 +196,19 @@ CACHES = {
     }
 }
 
+# Sessions lues depuis le cache (et écrites aussi en base) : plus de
+# lecture de django_session à chaque requête
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+# Panier des visiteurs (app.guest_cart) : 'session', ou 'cookie' (cookie
+# signé : ni session ni écriture en base). GUEST_CART_STORAGE dans l'environnement.
+GUEST_CART_STORAGE = os.environ.get('GUEST_CART_STORAGE', 'session')
+# Panier de visiteur abandonné après cette inactivité (secondes) : cookie
+# expiré, session purgée par la commande purge_carts
+GUEST_CART_TTL = 7 * 24 * 60 * 60
+# Panier en base abandonné quand son dernier ajout date de plus de ce
+# délai (secondes) : supprimé par la commande purge_carts
+CART_ITEM_TTL = 30 * 24 * 60 * 60
+
 # Messages framework - Tags Bootstrap
 from django.contrib.messages import constants as messages
 MESSAGE_TAGS = {
@@ -160,3 +218,43 @@ MESSAGE_TAGS = {
     messages.WARNING: 'warning',
     messages.ERROR: 'danger',
 }
+
+# Instrumentation SQL par requête (app.instrumentation) : désactivée par
+# défaut, activée avec QUERY_INSTRUMENTATION=1 dans l'environnement.
+QUERY_INSTRUMENTATION = os.environ.get('QUERY_INSTRUMENTATION') == '1'
+# Lever une exception (plutôt qu'avertir) au dépassement d'un budget
+QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT') == '1'
+# Nombre maximal de requêtes SQL par vue (nom d'URL), session et
+# authentification comprises
+QUERY_BUDGETS = {
+    'index': 3,
+    'shop': 5,
+    'cart': 4,
+    'add_to_cart': 10,
+    'remove_from_cart': 7,
+    'update_cart_item': 7,
+    'login': 17,
+    'checkout': 21,  # dont un UPDATE de statistiques par vendeur de la commande
+    'vendeur_dashboard': 7,
+    'vendeur_orders': 6,
+    'vendeur_revenue': 4,
+}
+
+# Déclinaisons des images produit (app.images) générées dans un thread
+# plutôt que dans la requête qui envoie l'image
+IMAGE_VARIANTS_IN_BACKGROUND = os.environ.get('IMAGE_VARIANTS_IN_BACKGROUND') == '1'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'app.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}